@@ -0,0 +1,181 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import overload
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.entities import KeyValueEntity
+
+"""This module implements columnar containers for bulk entity sets."""
+
+
+class EntityBatch(Sequence[KeyValueEntity]):
+    """Key-value entities stored as parallel uuid and value columns.
+
+    Rows are materialized as KeyValueEntity only when accessed. Slices with step one
+    share the columns of the batch they were taken from, so columns must not be
+    changed once handed to a batch.
+    """
+
+    __slots__ = ["_uuids", "_values", "_start", "_stop"]
+
+    def __init__(
+        self,
+        uuids: Sequence[str] = (),
+        values: Sequence[Any] = (),
+    ):
+        """Class constructor."""
+        if len(uuids) != len(values):
+            raise ValueError("uuids and values must have the same length")
+
+        self._uuids = uuids
+        self._values = values
+        self._start = 0
+        self._stop = len(uuids)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[str, Any]]) -> "EntityBatch":
+        """Build batch from (uuid, value) pairs."""
+        uuids: List[str] = []
+        values: List[Any] = []
+        for uuid, value in items:
+            uuids.append(uuid)
+            values.append(value)
+
+        return cls(uuids, values)
+
+    @classmethod
+    def from_entities(cls, entities: Iterable[BaseUniqueEntity]) -> "EntityBatch":
+        """Build batch from entities; entities without value become the value."""
+        if isinstance(entities, EntityBatch):
+            return entities
+
+        return cls.from_items(
+            (entity.uuid, getattr(entity, "value", entity)) for entity in entities
+        )
+
+    def _view(self, start: int, stop: int) -> "EntityBatch":
+        batch = EntityBatch.__new__(EntityBatch)
+        batch._uuids = self._uuids
+        batch._values = self._values
+        batch._start = start
+        batch._stop = stop
+        return batch
+
+    def _slice(self, column: Sequence[Any]) -> Sequence[Any]:
+        start, stop = self._start, self._stop
+        return column[start:stop]
+
+    @property
+    def uuids(self) -> List[str]:
+        """Property copy of uuid column getter."""
+        return list(self._slice(self._uuids))
+
+    @property
+    def values(self) -> List[Any]:
+        """Property copy of value column getter."""
+        return list(self._slice(self._values))
+
+    def __len__(self) -> int:
+        """Return number of rows."""
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> KeyValueEntity: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "EntityBatch": ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[KeyValueEntity, "EntityBatch"]:
+        """Return row view, or batch for slices sharing columns when step is one."""
+        size = self._stop - self._start
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step == 1:
+                return self._view(self._start + start, self._start + max(start, stop))
+
+            rows = range(self._start + start, self._start + stop, step)
+            return EntityBatch(
+                [self._uuids[i] for i in rows], [self._values[i] for i in rows]
+            )
+
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("batch index out of range")
+
+        i = self._start + index
+        return KeyValueEntity.loaded(uuid=self._uuids[i], val=self._values[i])
+
+    def __contains__(self, item: object) -> bool:
+        """Return whether a row has the uuid and value of the entity."""
+        if not isinstance(item, KeyValueEntity):
+            return False
+
+        uuid, value = item.uuid, item.value
+        return any(u == uuid and (v is value or v == value) for u, v in self.items())
+
+    def __iter__(self) -> Iterator[KeyValueEntity]:
+        """Iterate over row views."""
+        for uuid, value in self.items():
+            yield KeyValueEntity.loaded(uuid=uuid, val=value)
+
+    def __repr__(self) -> str:
+        """Return debug representation."""
+        return f"EntityBatch({len(self)} rows)"
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over (uuid, value) pairs without building entities."""
+        rows = range(self._start, self._stop)
+        uuids, values = self._uuids, self._values
+        return ((uuids[i], values[i]) for i in rows)
+
+    def filter(self, predicate: Callable[[str, Any], bool]) -> "EntityBatch":
+        """Return batch of rows for which predicate(uuid, value) holds."""
+        return EntityBatch.from_items(
+            (uuid, value) for uuid, value in self.items() if predicate(uuid, value)
+        )
+
+    def map(self, function: Callable[[Any], Any]) -> "EntityBatch":
+        """Return batch with function applied to every value, sharing uuids."""
+        values = [function(value) for value in self._slice(self._values)]
+        uuids = self._uuids
+        if self._start or self._stop != len(uuids):
+            uuids = self._slice(uuids)
+
+        return EntityBatch(uuids, values)
+
+    def to_numpy(self, dtype: Any = None) -> Tuple[Any, Any]:  # dead: disable
+        """Export (uuids, values) NumPy arrays; requires NumPy to be installed."""
+        import numpy
+
+        uuids = numpy.asarray(self._slice(self._uuids), dtype=object)
+        values = numpy.asarray(self._slice(self._values), dtype=dtype)
+        return uuids, values
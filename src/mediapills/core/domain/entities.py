@@ -22,6 +22,9 @@
 from datetime import datetime
 from enum import Enum
 from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import List
 from typing import Optional
 
 # Logging level constants with clear, professional docstrings.
@@ -71,13 +74,55 @@ class LoggingLevel(Enum):
 class BaseEntity(metaclass=abc.ABCMeta):
     """Abstract base class representing a domain entity encapsulating business rules."""
 
-    pass
+    __slots__: List[str] = []
+
+
+_CLEAN: FrozenSet[str] = frozenset()
+_NEW_MUTABLE: FrozenSet[str] = frozenset(["value", "updated_at"])
+_NEW_KEY_VALUE: FrozenSet[str] = frozenset(["value"])
+
+
+class ChangeTracker(metaclass=abc.ABCMeta):
+    """
+    Mixin recording which fields were assigned since the entity was loaded.
+
+    Subclasses declare a ``_dirty`` slot. Constructed instances start with every field
+    dirty and only load paths mark them clean; both states share module level
+    frozensets, so tracking costs a single pointer until a field is actually modified.
+    """
+
+    __slots__: List[str] = []
+
+    _dirty: FrozenSet[str]
+
+    def _mark_dirty(self, field: str) -> None:
+        """Remember field as modified."""
+        if field not in self._dirty:
+            self._dirty = self._dirty | {field}  # type: ignore[misc]
+
+    @property
+    def dirty(self) -> bool:
+        """Property whether any field was modified since load getter."""
+        return bool(self._dirty)
+
+    @property
+    def dirty_fields(self) -> FrozenSet[str]:
+        """Property names of fields modified since load getter."""
+        return self._dirty
+
+    def changes(self) -> Dict[str, Any]:
+        """Return current values of the modified fields."""
+        return {field: getattr(self, field) for field in self._dirty}
+
+    def mark_clean(self) -> None:
+        """Forget modifications, e.g. after the entity was persisted."""
+        self._dirty = _CLEAN  # type: ignore[misc]
 
 
 class BaseUniqueEntity(BaseEntity, metaclass=abc.ABCMeta):
     """Abstract base class for entities with a unique UUID property."""
 
-    __slots__ = ["_uuid"]
+    __slots__ = ["_uuid", "__weakref__"]
 
     def __init__(self, uuid: str):
         """
@@ -114,26 +159,87 @@ class BaseImmutableEntity(BaseUniqueEntity, metaclass=abc.ABCMeta):
 
     __slots__ = ["_created_at"]
 
-    def __init__(self, uuid: str):
+    def __init__(self, uuid: str, created_at: Optional[datetime] = None):
         """Initialize the immutable entity."""
         super().__init__(uuid=uuid)
+        self._created_at = created_at
+
+    @property
+    def created_at(self) -> Optional[datetime]:
+        """
+        Get the timestamp when the entity was created.
+
+        Returns:
+            Optional[datetime]: The creation time, if available.
+        """
+        return self._created_at
 
 
-class BaseMutableEntity(BaseImmutableEntity, metaclass=abc.ABCMeta):
+class BaseMutableEntity(BaseImmutableEntity, ChangeTracker, metaclass=abc.ABCMeta):
     """Abstract base class for mutable entities with a unique identifier."""
 
-    __slots__ = ["_created_at", "_updated_at"]
+    __slots__ = ["_value", "_updated_at", "_dirty"]
 
-    def __init__(self, uuid: str, val: Any):
+    def __init__(
+        self,
+        uuid: str,
+        val: Any,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+    ):
         """Initialize the mutable entity."""
-        super().__init__(uuid=uuid)
+        super().__init__(uuid=uuid, created_at=created_at)
+        self._value = val
+        self._updated_at = updated_at
+        self._dirty = _NEW_MUTABLE
+
+    @property
+    def value(self) -> Any:
+        """
+        Get the value held by the entity.
+
+        Returns:
+            Any: The value.
+        """
+        return self._value
+
+    @value.setter
+    def value(self, val: Any) -> None:
+        """
+        Set the value held by the entity.
+
+        Args:
+            val (Any): The new value.
+        """
         self._value = val
+        self._mark_dirty("value")
+
+    @property
+    def updated_at(self) -> Optional[datetime]:
+        """
+        Get the timestamp when the entity was last updated.
+
+        Returns:
+            Optional[datetime]: The update time, if available.
+        """
+        return self._updated_at
 
+    @updated_at.setter
+    def updated_at(self, updated_at: Optional[datetime]) -> None:
+        """
+        Set the timestamp when the entity was last updated.
 
-class KeyValueEntity(BaseUniqueEntity):
+        Args:
+            updated_at (Optional[datetime]): The update time.
+        """
+        self._updated_at = updated_at
+        self._mark_dirty("updated_at")
+
+
+class KeyValueEntity(BaseUniqueEntity, ChangeTracker):
     """Entity representing a key-value pair, suitable for key-value storage systems."""
 
-    __slots__ = ["_uuid", "_value"]
+    __slots__ = ["_value", "_dirty"]
 
     def __init__(self, uuid: str, val: Any):
         """
@@ -145,6 +251,14 @@ def __init__(self, uuid: str, val: Any):
         """
         super().__init__(uuid=uuid)
         self._value = val
+        self._dirty = _NEW_KEY_VALUE
+
+    @classmethod
+    def loaded(cls, uuid: str, val: Any) -> "KeyValueEntity":
+        """Build clean entity for a row read from storage."""
+        entity = cls(uuid=uuid, val=val)
+        entity._dirty = _CLEAN
+        return entity
 
     @property
     def value(self) -> Any:
@@ -165,6 +279,7 @@ def value(self, val: Any) -> None:
             val (Any): The new value.
         """
         self._value = val
+        self._mark_dirty("value")
 
 
 class LogRecordEntity(BaseEntity):  # dead: disable
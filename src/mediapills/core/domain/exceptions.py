@@ -24,3 +24,12 @@ class BaseMediapillsException(Exception):  # dead: disable
     """Common base class for all core exceptions."""
 
     pass
+
+
+class ResyncRequiredException(BaseMediapillsException):
+    """Change feed consumer fell behind events that are no longer retained."""
+
+    def __init__(self, sequence: int):
+        """Class constructor."""
+        super().__init__(f"events are no longer retained, resync from {sequence}")
+        self.sequence = sequence
@@ -20,11 +20,19 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from abc import ABCMeta
 from abc import abstractmethod
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Mapping
 
 from mediapills.core.domain.entities import BaseImmutableEntity
 from mediapills.core.domain.entities import BaseMutableEntity
 from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.entities import ChangeTracker
+from mediapills.core.domain.repositories import BasePartialUpdate
 from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BulkWriteResult
 
 
 class ImmutableEntityManager(metaclass=ABCMeta):
@@ -57,3 +65,85 @@ class PersistentEntityManager(MutableEntityManager, metaclass=ABCMeta):  # dead:
     def delete(self, uuid: str) -> bool:  # dead: disable
         """Delete an entity by its unique identifier."""
         raise NotImplementedError()
+
+
+class RepositoryEntityManager(PersistentEntityManager):  # dead: disable
+    """
+    Manager persisting entities through a repository, writing only what changed.
+
+    Entities tracking their modifications are skipped while clean; dirty ones are sent
+    as changed fields when the repository supports partial updates.
+    """
+
+    def __init__(self, repository: BaseRepository):
+        """Class constructor."""
+        self._repository = repository
+        self._skipped = 0
+
+    def repository(self) -> BaseRepository:  # dead: disable
+        """Get the repository instance associated with this manager."""
+        return self._repository
+
+    @property
+    def skipped(self) -> int:  # dead: disable
+        """Property number of clean entities not written getter."""
+        return self._skipped
+
+    def insert(self, entity: BaseImmutableEntity) -> BaseUniqueEntity:  # dead: disable
+        """Insert a new entity."""
+        self._repository.insert(entity)
+        if isinstance(entity, ChangeTracker):
+            entity.mark_clean()
+        return entity
+
+    def update(self, entity: BaseUniqueEntity) -> BaseUniqueEntity:  # dead: disable
+        """Update an existing entity; clean entities are not written."""
+        result = self.update_many([entity])
+        if entity.uuid in result.failed:
+            raise result.failed[entity.uuid]
+        return entity
+
+    def update_many(  # dead: disable
+        self, entities: Iterable[BaseUniqueEntity]
+    ) -> BulkWriteResult:
+        """Write dirty entities in one batch, collecting missing rows."""
+        dirty: Dict[str, BaseUniqueEntity] = {}
+        for entity in entities:
+            if isinstance(entity, ChangeTracker) and not entity.dirty:
+                self._skipped += 1
+            else:
+                dirty[entity.uuid] = entity
+
+        if not dirty:
+            return BulkWriteResult()
+
+        if isinstance(self._repository, BasePartialUpdate):
+            result = self._repository.update_fields_many(self._changes(dirty.values()))
+        else:
+            result = self._repository.update_many(dirty.values())
+
+        for uuid in result.applied:
+            entity = dirty[uuid]
+            if isinstance(entity, ChangeTracker):
+                entity.mark_clean()
+        return result
+
+    @staticmethod
+    def _changes(
+        entities: Iterable[BaseUniqueEntity],
+    ) -> Mapping[str, Mapping[str, Any]]:
+        changes: Dict[str, Mapping[str, Any]] = {}
+        for entity in entities:
+            if isinstance(entity, ChangeTracker):
+                changes[entity.uuid] = entity.changes()
+            else:
+                changes[entity.uuid] = {"value": getattr(entity, "value", entity)}
+        return changes
+
+    def delete(self, uuid: str) -> bool:  # dead: disable
+        """Delete an entity by its unique identifier."""
+        return self._repository.delete(uuid)
+
+    def delete_many(self, uuids: Iterable[str]) -> List[str]:  # dead: disable
+        """Delete entities by their unique identifiers, returning deleted ones."""
+        return self._repository.delete_many(uuids).applied
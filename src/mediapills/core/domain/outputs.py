@@ -20,22 +20,26 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 import typing as t
 
+from mediapills.core.domain.batches import EntityBatch
 from mediapills.core.domain.entities import BaseEntity
 
+"""Entities held by use case output, as a list or a columnar batch."""
+OutputData = t.Union[t.List[BaseEntity], EntityBatch]
+
 
 class BaseOutput:
     """Use case output class."""
 
     def __init__(self) -> None:
         """Class constructor."""
-        self._data: t.List[BaseEntity] = []
+        self._data: OutputData = []
 
     @property
-    def data(self) -> t.List[BaseEntity]:
+    def data(self) -> OutputData:
         """Property output data getter."""
         return self._data
 
     @data.setter
-    def data(self, data: t.List[BaseEntity]) -> None:
+    def data(self, data: OutputData) -> None:
         """Property output data setter."""
         self._data = data
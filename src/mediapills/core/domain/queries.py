@@ -0,0 +1,187 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import heapq
+import sys
+from itertools import islice
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+R = TypeVar("R")
+
+Predicate = Callable[[Any], bool]
+Projection = Callable[[Any], Any]
+SortKey = Callable[[str, Any], Any]
+
+
+def by_key(uuid: str, value: Any) -> str:
+    """Sort key ordering rows by unique key, recognised by adapters natively."""
+    return uuid
+
+
+class Query:
+    """Row selection that repositories able to evaluate it natively receive as is.
+
+    Key conditions (prefix and half-open start/stop range) are checked before the
+    value predicate, the projection is applied last, after ordering and limit.
+    """
+
+    __slots__ = [
+        "_prefix",
+        "_start",
+        "_stop",
+        "_where",
+        "_select",
+        "_order_by",
+        "_reverse",
+        "_limit",
+    ]
+
+    def __init__(
+        self,
+        prefix: Optional[str] = None,
+        start: Optional[str] = None,
+        stop: Optional[str] = None,
+        where: Optional[Predicate] = None,
+        select: Optional[Projection] = None,
+        order_by: Optional[SortKey] = None,
+        reverse: bool = False,
+        limit: Optional[int] = None,
+    ):
+        """
+        Initialize the query.
+
+        Args:
+            prefix (Optional[str]): Keep keys starting with the prefix.
+            start (Optional[str]): Keep keys greater than or equal to start.
+            stop (Optional[str]): Keep keys lower than stop.
+            where (Optional[Predicate]): Keep rows whose value satisfies predicate.
+            select (Optional[Projection]): Replace row value with its projection.
+            order_by (Optional[SortKey]): Sort rows by key computed from key and value.
+            reverse (bool): Sort rows in descending order.
+            limit (Optional[int]): Maximum number of rows.
+        """
+        self._prefix = prefix
+        self._start = start
+        self._stop = stop
+        self._where = where
+        self._select = select
+        self._order_by = order_by
+        self._reverse = reverse
+        self._limit = limit
+
+    @property
+    def prefix(self) -> Optional[str]:
+        """Property key prefix getter."""
+        return self._prefix
+
+    @property
+    def start(self) -> Optional[str]:
+        """Property inclusive lower key bound getter."""
+        return self._start
+
+    @property
+    def stop(self) -> Optional[str]:
+        """Property exclusive upper key bound getter."""
+        return self._stop
+
+    @property
+    def where(self) -> Optional[Predicate]:
+        """Property value predicate getter."""
+        return self._where
+
+    @property
+    def select(self) -> Optional[Projection]:
+        """Property value projection getter."""
+        return self._select
+
+    @property
+    def order_by(self) -> Optional[SortKey]:
+        """Property sort key getter."""
+        return self._order_by
+
+    @property
+    def reverse(self) -> bool:
+        """Property descending order flag getter."""
+        return self._reverse
+
+    @property
+    def limit(self) -> Optional[int]:
+        """Property maximum number of rows getter."""
+        return self._limit
+
+    def key_range(self) -> Tuple[Optional[str], Optional[str]]:
+        """Return half-open key range covering both prefix and start/stop bounds."""
+        start, stop = self._start, self._stop
+        if self._prefix:
+            start = self._prefix if start is None else max(start, self._prefix)
+            head = self._prefix.rstrip(chr(sys.maxunicode))
+            if head:
+                upper = head[:-1] + chr(ord(head[-1]) + 1)
+                stop = upper if stop is None else min(stop, upper)
+
+        return start, stop
+
+    def match_key(self, uuid: str) -> bool:
+        """Check key against prefix and range conditions."""
+        if self._prefix is not None and not uuid.startswith(self._prefix):
+            return False
+        if self._start is not None and uuid < self._start:
+            return False
+
+        return self._stop is None or uuid < self._stop
+
+    def match_value(self, value: Any) -> bool:
+        """Check value against predicate."""
+        return self._where is None or self._where(value)
+
+    def project(self, value: Any) -> Any:
+        """Apply projection to value."""
+        return value if self._select is None else self._select(value)
+
+    def run(
+        self,
+        rows: Iterable[R],
+        key: Callable[[R], str],
+        value: Callable[[R], Any],
+    ) -> Iterator[R]:
+        """Filter, order and limit rows read through key and value accessors."""
+        selected: Iterator[R] = (
+            row
+            for row in rows
+            if self.match_key(key(row)) and self.match_value(value(row))
+        )
+        order_by = self._order_by
+        if order_by is None:
+            return islice(selected, self._limit)
+
+        def sort_key(row: R) -> Any:
+            return order_by(key(row), value(row))
+
+        if self._limit is None:
+            return iter(sorted(selected, key=sort_key, reverse=self._reverse))
+
+        top = heapq.nlargest if self._reverse else heapq.nsmallest
+        return iter(top(self._limit, selected, key=sort_key))
@@ -18,12 +18,137 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import base64
+import heapq
 from abc import ABCMeta
 from abc import abstractmethod
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Mapping
 from typing import Optional
 
+from mediapills.core.domain.batches import EntityBatch
 from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.queries import by_key
+from mediapills.core.domain.queries import Query
+
+
+def _uuid_of(entity: BaseUniqueEntity) -> str:
+    return entity.uuid
+
+
+def _value_of(entity: BaseUniqueEntity) -> Any:
+    return getattr(entity, "value", entity)
+
+
+def encode_cursor(uuid: str) -> str:
+    """Encode key of the last row on a page into an opaque cursor."""
+    return base64.urlsafe_b64encode(uuid.encode()).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Decode key of the last row on a page from an opaque cursor."""
+    return base64.urlsafe_b64decode(cursor.encode("ascii")).decode()
+
+
+class Page:
+    """Rows in key order with a cursor to fetch the rows after them."""
+
+    __slots__ = ["_entities", "_cursor"]
+
+    def __init__(self, entities: List[BaseUniqueEntity], cursor: Optional[str] = None):
+        """Class constructor."""
+        self._entities = entities
+        self._cursor = cursor
+
+    @property
+    def entities(self) -> List[BaseUniqueEntity]:
+        """Property page rows getter."""
+        return self._entities
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """Property cursor of the next page or None on the last page getter."""
+        return self._cursor
+
+
+def paginated(entities: List[BaseUniqueEntity], limit: int) -> Page:
+    """Build page from up to limit + 1 rows in key order, the extra row means more."""
+    if len(entities) <= limit:
+        return Page(entities)
+
+    del entities[limit:]
+    return Page(entities, encode_cursor(entities[-1].uuid) if entities else None)
+
+
+class BulkWriteResult:
+    """Outcome of a bulk mutation with applied keys and per-key failures."""
+
+    __slots__ = ["_applied", "_failed"]
+
+    def __init__(
+        self,
+        applied: Optional[List[str]] = None,
+        failed: Optional[Dict[str, Exception]] = None,
+    ):
+        """Class constructor."""
+        self._applied = applied if applied is not None else []
+        self._failed = failed if failed is not None else {}
+
+    @property
+    def applied(self) -> List[str]:
+        """Property keys written by the batch getter."""
+        return self._applied
+
+    @property
+    def failed(self) -> Dict[str, Exception]:
+        """Property keys rejected by the batch with their errors getter."""
+        return self._failed
+
+
+class BaseKeyLookup(metaclass=ABCMeta):
+    """Describe data source able to resolve rows directly by unique key."""
+
+    @abstractmethod
+    def lookup(self, uuid: str) -> Optional[BaseUniqueEntity]:
+        """Retrieve row by unique key without scanning the data source."""
+        raise NotImplementedError()
+
+    def lookup_many(self, uuids: Iterable[str]) -> Dict[str, BaseUniqueEntity]:
+        """Retrieve rows by unique keys without scanning the data source."""
+        found = {}
+        for uuid in uuids:
+            entity = self.lookup(uuid)
+            if entity is not None:
+                found[uuid] = entity
+
+        return found
+
+
+class BasePartialUpdate(metaclass=ABCMeta):
+    """Describe data source able to update selected fields of existing rows."""
+
+    @abstractmethod
+    def update_fields(self, uuid: str, fields: Mapping[str, Any]) -> bool:
+        """Write changed fields of row; return False if the row does not exist."""
+        raise NotImplementedError()
+
+    def update_fields_many(
+        self, changes: Mapping[str, Mapping[str, Any]]
+    ) -> BulkWriteResult:
+        """Write changed fields of rows, collecting missing rows instead of aborting."""
+        result = BulkWriteResult()
+        for uuid, fields in changes.items():
+            if self.update_fields(uuid, fields):
+                result.applied.append(uuid)
+            else:
+                result.failed[uuid] = KeyError(uuid)
+
+        return result
 
 
 class BaseViewRepository(metaclass=ABCMeta):
@@ -31,9 +156,32 @@ class BaseViewRepository(metaclass=ABCMeta):
 
     def get_one(self, uuid: str) -> Optional[BaseUniqueEntity]:  # dead: disable
         """Retrieve row selected from one or more tables."""
-        filtered = filter(lambda entity: entity.uuid == uuid, self.get_all())
+        if isinstance(self, BaseKeyLookup):
+            return self.lookup(uuid)
+
+        filtered = filter(lambda entity: entity.uuid == uuid, self.iter_all())
         return next(filtered, None)
 
+    def get_many(  # dead: disable
+        self, uuids: Iterable[str]
+    ) -> Dict[str, BaseUniqueEntity]:
+        """Retrieve rows selected by unique keys, resolving the whole set at once."""
+        if isinstance(self, BaseKeyLookup):
+            return self.lookup_many(uuids)
+
+        wanted = set(uuids)
+        found: Dict[str, BaseUniqueEntity] = {}
+        if not wanted:
+            return found
+
+        for entity in self.iter_all():
+            if entity.uuid in wanted:
+                found[entity.uuid] = entity
+                if len(found) == len(wanted):
+                    break
+
+        return found
+
     @abstractmethod
     def get_all(
         self, limit: Optional[int] = None, offset: Optional[int] = None
@@ -41,6 +189,71 @@ def get_all(
         """Retrieve rows selected from one or more tables."""
         raise NotImplementedError()
 
+    def iter_all(
+        self, limit: Optional[int] = None, offset: Optional[int] = None
+    ) -> Iterator[BaseUniqueEntity]:
+        """Iterate over rows selected from one or more tables one at a time."""
+        return iter(self.get_all(limit=limit, offset=offset))
+
+    def get_batch(  # dead: disable
+        self, limit: Optional[int] = None, offset: Optional[int] = None
+    ) -> EntityBatch:
+        """Retrieve rows as a columnar batch."""
+        return EntityBatch.from_entities(self.iter_all(limit=limit, offset=offset))
+
+    def get_page(  # dead: disable
+        self, after: Optional[str] = None, limit: int = 100
+    ) -> Page:
+        """Retrieve rows in key order that follow the cursor.
+
+        This fallback selects the page in one scan keeping only limit rows in memory;
+        adapters with ordered keys seek to the cursor directly.
+        """
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        rows = self.iter_all()
+        if after is not None:
+            last = decode_cursor(after)
+            rows = (entity for entity in rows if entity.uuid > last)
+
+        selected = heapq.nsmallest(limit + 1, rows, key=_uuid_of)
+        return paginated(selected, limit)
+
+    def get_range(
+        self,
+        start: Optional[str] = None,
+        stop: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[BaseUniqueEntity]:
+        """Retrieve rows with key in half-open range [start, stop) in key order.
+
+        This fallback goes through find, so adapters pushing key ranges down in find
+        scan only the range; adapters with ordered keys seek to start directly.
+        """
+        query = Query(start=start, stop=stop, order_by=by_key, limit=limit)
+        return list(self.find(query))
+
+    def get_prefix(  # dead: disable
+        self, prefix: str, limit: Optional[int] = None
+    ) -> List[BaseUniqueEntity]:
+        """Retrieve rows whose key starts with prefix in key order."""
+        start, stop = Query(prefix=prefix).key_range()
+        return self.get_range(start, stop, limit=limit)
+
+    def find(self, query: Query) -> Iterator[BaseUniqueEntity]:  # dead: disable
+        """Stream rows selected by query, filtering all rows one at a time.
+
+        Entities without value are matched and projected as a whole.
+        """
+        for entity in query.run(self.iter_all(), key=_uuid_of, value=_value_of):
+            if query.select is None:
+                yield entity
+            else:
+                yield KeyValueEntity.loaded(
+                    entity.uuid, query.project(_value_of(entity))
+                )
+
 
 class BaseRepository(BaseViewRepository, metaclass=ABCMeta):
     """Well documented way of working with manageable data source."""
@@ -63,3 +276,44 @@ def update(  # dead: disable
     def delete(self, uuid: str) -> bool:  # dead: disable
         """Delete row from table that satisfy the condition where uuid equal value."""
         raise NotImplementedError()
+
+    def insert_many(  # dead: disable
+        self, entities: Iterable[BaseUniqueEntity]
+    ) -> BulkWriteResult:
+        """Insert rows into table, collecting conflicts instead of aborting."""
+        result = BulkWriteResult()
+        for entity in entities:
+            try:
+                self.insert(entity)
+            except KeyError as e:
+                result.failed[entity.uuid] = e
+            else:
+                result.applied.append(entity.uuid)
+
+        return result
+
+    def update_many(  # dead: disable
+        self, entities: Iterable[BaseUniqueEntity]
+    ) -> BulkWriteResult:
+        """Update rows in table, collecting missing rows instead of aborting."""
+        result = BulkWriteResult()
+        for entity in entities:
+            try:
+                self.update(entity)
+            except KeyError as e:
+                result.failed[entity.uuid] = e
+            else:
+                result.applied.append(entity.uuid)
+
+        return result
+
+    def delete_many(self, uuids: Iterable[str]) -> BulkWriteResult:  # dead: disable
+        """Delete rows from table, collecting missing rows instead of aborting."""
+        result = BulkWriteResult()
+        for uuid in uuids:
+            if self.delete(uuid):
+                result.applied.append(uuid)
+            else:
+                result.failed[uuid] = KeyError(uuid)
+
+        return result
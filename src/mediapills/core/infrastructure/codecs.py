@@ -0,0 +1,315 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import operator
+import struct
+import types
+import typing as t
+from datetime import datetime
+from enum import Enum
+
+from mediapills.core.domain.entities import BaseEntity
+from mediapills.core.domain.entities import ChangeTracker
+
+"""This module implements per class entity codecs for JSON and compact binary formats.
+
+Entity classes are inspected once: every slot backed by a public property becomes a
+field, and the property return annotation selects a converter for values JSON can not
+carry (datetime, Enum). Encoders read all slots with one attrgetter and decoders fill
+slot descriptors directly, so no per call reflection is involved.
+"""
+
+E = t.TypeVar("E", bound=BaseEntity)
+
+Converter = t.Callable[[t.Any], t.Any]
+
+"""Origins of Optional annotations, typing.Union and PEP 604 unions like X | None."""
+_UNIONS: t.FrozenSet[t.Any] = frozenset([t.Union, getattr(types, "UnionType", t.Union)])
+
+_SKIPPED_SLOTS = frozenset(["__weakref__", "__dict__", "_dirty"])
+
+_JSON = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+_LENGTH = struct.Struct("<I")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+
+_NONE, _TRUE, _FALSE, _INT_TAG, _BIGINT, _FLOAT_TAG = b"NTFiId"
+_STR, _BYTES, _LIST, _DICT = b"sblm"
+
+
+def _optional(converter: Converter) -> Converter:
+    def convert(value: t.Any) -> t.Any:
+        return None if value is None else converter(value)
+
+    return convert
+
+
+def _converters(hint: t.Any) -> t.Tuple[t.Optional[Converter], t.Optional[Converter]]:
+    """Pick (encode, decode) converters for annotated type; None keeps value as is."""
+    args = t.get_args(hint)
+    if t.get_origin(hint) in _UNIONS and type(None) in args:
+        rest = [arg for arg in args if arg is not type(None)]
+        if len(rest) == 1:
+            hint = rest[0]
+
+    if isinstance(hint, type) and issubclass(hint, datetime):
+        return _optional(datetime.isoformat), _optional(hint.fromisoformat)
+    if isinstance(hint, type) and issubclass(hint, Enum):
+        return _optional(operator.attrgetter("value")), _optional(hint)
+    return None, None
+
+
+def _write(value: t.Any, out: bytearray) -> None:
+    kind = type(value)
+    if value is None:
+        out.append(_NONE)
+    elif kind is bool:
+        out.append(_TRUE if value else _FALSE)
+    elif kind is int:
+        if -(2**63) <= value < 2**63:
+            out.append(_INT_TAG)
+            out += _INT.pack(value)
+        else:
+            _write_blob(_BIGINT, str(value).encode(), out)
+    elif kind is float:
+        out.append(_FLOAT_TAG)
+        out += _FLOAT.pack(value)
+    elif kind is str:
+        _write_blob(_STR, value.encode(), out)
+    elif kind is bytes or kind is bytearray:
+        _write_blob(_BYTES, value, out)
+    elif kind is list or kind is tuple:
+        out.append(_LIST)
+        out += _LENGTH.pack(len(value))
+        for item in value:
+            _write(item, out)
+    elif kind is dict:
+        out.append(_DICT)
+        out += _LENGTH.pack(len(value))
+        for key, item in value.items():
+            _write(key, out)
+            _write(item, out)
+    else:
+        raise TypeError("Type %s is not binary serializable" % kind.__name__)
+
+
+def _write_blob(tag: int, blob: bytes, out: bytearray) -> None:
+    out.append(tag)
+    out += _LENGTH.pack(len(blob))
+    out += blob
+
+
+def _read(data: bytes, offset: int) -> t.Tuple[t.Any, int]:
+    tag = data[offset]
+    offset += 1
+    if tag == _NONE:
+        return None, offset
+    if tag == _TRUE or tag == _FALSE:
+        return tag == _TRUE, offset
+    if tag == _INT_TAG:
+        return _INT.unpack_from(data, offset)[0], offset + _INT.size
+    if tag == _FLOAT_TAG:
+        return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+
+    (size,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    if tag == _LIST:
+        items = []
+        for _ in range(size):
+            item, offset = _read(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == _DICT:
+        mapping = {}
+        for _ in range(size):
+            key, offset = _read(data, offset)
+            mapping[key], offset = _read(data, offset)
+        return mapping, offset
+
+    stop = offset + size
+    if stop > len(data):
+        raise ValueError("Truncated binary value at offset %d" % offset)
+
+    blob = data[offset:stop]
+    if tag == _STR:
+        return str(blob, "utf-8"), stop
+    if tag == _BYTES:
+        return blob if type(blob) is bytes else bytes(blob), stop
+    if tag == _BIGINT:
+        return int(str(blob, "ascii")), stop
+    raise ValueError("Unknown binary tag %r" % chr(tag))
+
+
+def _has_dict(cls: type) -> bool:
+    return any("__dict__" in vars(klass) for klass in cls.__mro__[:-1])
+
+
+def _slots(cls: type) -> t.Iterator[t.Tuple[str, t.Any]]:
+    """Yield (slot, descriptor) pairs of class hierarchy, base classes first."""
+    for klass in reversed(cls.__mro__):
+        slots = vars(klass).get("__slots__", ())
+        for slot in [slots] if isinstance(slots, str) else slots:
+            if slot not in _SKIPPED_SLOTS and not slot.startswith("__"):
+                yield slot, vars(klass)[slot]
+
+
+def _return_hint(prop: property) -> t.Any:
+    try:
+        return t.get_type_hints(prop.fget).get("return")
+    except Exception:  # unresolvable annotations leave the value unconverted
+        return None
+
+
+class EntityCodec(t.Generic[E]):
+    """Encoder and decoder of one entity class compiled from its slots."""
+
+    def __init__(self, cls: t.Type[E]):
+        """Class constructor."""
+        if _has_dict(cls):
+            raise TypeError("Entity class %s must declare __slots__" % cls.__name__)
+
+        names: t.List[str] = []
+        slots: t.List[str] = []
+        setters: t.List[t.Callable[[t.Any, t.Any], None]] = []
+        encoders: t.List[t.Tuple[int, Converter]] = []
+        decoders: t.List[t.Tuple[int, Converter]] = []
+        for slot, descriptor in _slots(cls):
+            name = slot[1:] if slot.startswith("_") else slot
+            prop = getattr(cls, name, None)
+            if slot != name and not isinstance(prop, property):
+                continue
+
+            encode, decode = _converters(
+                _return_hint(prop) if isinstance(prop, property) else None
+            )
+            if encode is not None and decode is not None:
+                encoders.append((len(names), encode))
+                decoders.append((len(names), decode))
+            names.append(name)
+            slots.append(slot)
+            setters.append(descriptor.__set__)
+
+        self._cls = cls
+        self._names = tuple(names)
+        self._setters = tuple(setters)
+        self._encoders = tuple(encoders)
+        self._decoders = tuple(decoders)
+        self._tracked = issubclass(cls, ChangeTracker)
+        self._header = _LENGTH.pack(len(names))
+        if len(slots) > 1:
+            self._get: t.Callable[[t.Any], t.Tuple[t.Any, ...]] = operator.attrgetter(
+                *slots
+            )
+        elif slots:
+            get = operator.attrgetter(slots[0])
+            self._get = lambda entity: (get(entity),)
+        else:
+            self._get = lambda entity: ()
+
+    @property
+    def fields(self) -> t.Tuple[str, ...]:
+        """Property names of encoded fields in binary order getter."""
+        return self._names
+
+    def _values(self, entity: E) -> t.Sequence[t.Any]:
+        values = self._get(entity)
+        if not self._encoders:
+            return values
+
+        converted = list(values)
+        for i, encode in self._encoders:
+            converted[i] = encode(converted[i])
+        return converted
+
+    def _build(self, values: t.Sequence[t.Any]) -> E:
+        if self._decoders:
+            values = list(values)
+            for i, decode in self._decoders:
+                values[i] = decode(values[i])
+
+        entity = self._cls.__new__(self._cls)
+        for set_, value in zip(self._setters, values):
+            set_(entity, value)
+        if self._tracked:
+            entity.mark_clean()  # type: ignore[attr-defined]
+        return entity
+
+    def to_dict(self, entity: E) -> t.Dict[str, t.Any]:
+        """Convert entity into dictionary of JSON compatible field values."""
+        return dict(zip(self._names, self._values(entity)))
+
+    def from_dict(self, data: t.Mapping[str, t.Any]) -> E:
+        """Build clean entity from dictionary produced by to_dict."""
+        return self._build([data[name] for name in self._names])
+
+    def to_json(self, entity: E) -> str:
+        """Encode entity as compact JSON object."""
+        return _JSON.encode(dict(zip(self._names, self._values(entity))))
+
+    def from_json(self, data: t.Union[str, bytes]) -> E:
+        """Decode entity from JSON object."""
+        return self.from_dict(json.loads(data))
+
+    def to_bytes(self, entity: E) -> bytes:
+        """Encode entity as field count followed by tagged field values."""
+        out = bytearray(self._header)
+        for value in self._values(entity):
+            _write(value, out)
+        return bytes(out)
+
+    def from_bytes(self, data: bytes) -> E:
+        """Decode entity from bytes produced by to_bytes.
+
+        Raises ValueError for truncated, corrupt or trailing input.
+        """
+        try:
+            (count,) = _LENGTH.unpack_from(data)
+            if count != len(self._names):
+                raise ValueError(
+                    "Expected %d fields of %s, got %d"
+                    % (len(self._names), self._cls.__name__, count)
+                )
+
+            values = []
+            offset = _LENGTH.size
+            for _ in range(count):
+                value, offset = _read(data, offset)
+                values.append(value)
+        except (struct.error, IndexError) as e:
+            raise ValueError("Corrupt binary %s: %s" % (self._cls.__name__, e)) from e
+
+        if offset != len(data):
+            raise ValueError(
+                "Trailing %d bytes after %s" % (len(data) - offset, self._cls.__name__)
+            )
+        return self._build(values)
+
+
+_CODECS: t.Dict[type, EntityCodec[t.Any]] = {}
+
+
+def codec_for(cls: t.Type[E]) -> EntityCodec[E]:  # dead: disable
+    """Return codec of entity class, compiling it on first use."""
+    codec = _CODECS.get(cls)
+    if codec is None:
+        codec = _CODECS.setdefault(cls, EntityCodec(cls))
+    return codec
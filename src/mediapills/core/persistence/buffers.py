@@ -0,0 +1,311 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import contextlib
+import threading
+import typing as t
+
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.persistence.repositories import paginate
+
+"""This module implements repository decorators that buffer writes in memory."""
+
+_INSERT = "insert"
+_UPDATE = "update"
+_DELETE = "delete"
+
+_RETRY_DELAY = 1.0
+
+_Pending = t.Dict[str, t.Tuple[str, t.Optional[BaseUniqueEntity]]]
+
+
+class WriteBehindRepository(BaseRepository):  # dead: disable
+    """Write-behind buffer in front of a manageable repository.
+
+    Writes are validated and kept in memory, repeated writes to one key collapse into
+    the last one, and a background thread flushes them to the wrapped repository in
+    bulk once max_pending keys are buffered or every interval seconds. Reads see
+    buffered writes. The wrapped repository is called from the flush thread; when it
+    raises, unflushed writes go back to the buffer and the thread retries later. Keys
+    it rejects are collected in failed. Writes are refused once the buffer is closed.
+    """
+
+    def __init__(
+        self,
+        repository: BaseRepository,
+        max_pending: t.Optional[int] = 1000,
+        interval: t.Optional[float] = 1.0,
+    ):
+        """Class constructor."""
+        super().__init__()
+        self._repository = repository
+        self._max_pending = max_pending
+        self._interval = interval
+        self._pending: _Pending = {}
+        self._flushing: _Pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._flushes = 0
+        self._error: t.Optional[Exception] = None
+        self._failed: t.Dict[str, Exception] = {}
+        self._thread: t.Optional[threading.Thread] = None
+        if max_pending is not None or interval is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    @property
+    def repository(self) -> BaseRepository:  # dead: disable
+        """Property wrapped repository getter."""
+        return self._repository
+
+    @property
+    def pending(self) -> int:
+        """Property number of keys waiting to be flushed getter."""
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def error(self) -> t.Optional[Exception]:  # dead: disable
+        """Property last error raised by the wrapped repository in background getter."""
+        return self._error
+
+    @property
+    def failed(self) -> t.Dict[str, Exception]:
+        """Property keys rejected by the wrapped repository on flush getter."""
+        with self._lock:
+            return dict(self._failed)
+
+    def _run(self) -> None:
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(self._should_flush, timeout=self._interval)
+                if self._closed:
+                    return
+
+            try:
+                self.flush()
+            except Exception as e:
+                self._error = e
+                with self._wakeup:
+                    self._wakeup.wait_for(
+                        lambda: self._closed, timeout=self._interval or _RETRY_DELAY
+                    )
+
+    def _should_flush(self) -> bool:
+        if self._closed:
+            return True
+
+        return self._max_pending is not None and len(self._pending) >= self._max_pending
+
+    def flush(self) -> BulkWriteResult:
+        """Write buffered changes to the wrapped repository with bulk calls."""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+                batch = self._flushing
+
+            groups: t.Dict[str, t.List[t.Any]] = {_INSERT: [], _UPDATE: [], _DELETE: []}
+            for uuid, (op, entity) in batch.items():
+                groups[op].append(uuid if entity is None else entity)
+
+            writes: t.List[t.Tuple[str, t.Callable[[t.Any], BulkWriteResult]]] = [
+                (_INSERT, self._repository.insert_many),
+                (_UPDATE, self._repository.update_many),
+                (_DELETE, self._repository.delete_many),
+            ]
+            result = BulkWriteResult()
+            done = set()
+            try:
+                for op, write in writes:
+                    if groups[op]:
+                        partial = write(groups[op])
+                        result.applied.extend(partial.applied)
+                        result.failed.update(partial.failed)
+                    done.add(op)
+            finally:
+                with self._lock:
+                    if len(done) < len(writes):
+                        self._requeue(
+                            {k: v for k, v in batch.items() if v[0] not in done}
+                        )
+                    self._flushing = {}
+                    self._flushes += 1
+                    self._failed.update(result.failed)
+
+        return result
+
+    def _requeue(self, unflushed: _Pending) -> None:
+        """Put back writes of a failed flush; writes buffered meanwhile stay newer."""
+        newer, self._pending = self._pending, {}
+        for uuid, (op, entity) in unflushed.items():
+            later = newer.pop(uuid, None)
+            if later is None:
+                self._pending[uuid] = (op, entity)
+            elif op == _INSERT:
+                if later[0] != _DELETE:
+                    self._pending[uuid] = (_INSERT, later[1])
+            elif op == _DELETE and later[0] == _INSERT:
+                self._pending[uuid] = (_UPDATE, later[1])
+            else:
+                self._pending[uuid] = later
+
+        self._pending.update(newer)
+
+    def close(self) -> None:
+        """Stop background flushing and write remaining changes."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _buffered(
+        self, uuid: str
+    ) -> t.Optional[t.Tuple[str, t.Optional[BaseUniqueEntity]]]:
+        return self._pending.get(uuid) or self._flushing.get(uuid)
+
+    @contextlib.contextmanager
+    def _writing(self, uuid: str) -> t.Iterator[bool]:
+        """Hold the lock yielding whether uuid exists, reading the backend unlocked."""
+        stored: t.Optional[t.Tuple[bool, int]] = None
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("write-behind repository is closed")
+
+                buffered = self._buffered(uuid)
+                if buffered is not None:
+                    yield buffered[0] != _DELETE
+                    return
+                # A flush finished since the backend read may have written uuid.
+                if stored is not None and stored[1] == self._flushes:
+                    yield stored[0]
+                    return
+                flushes = self._flushes
+
+            stored = self._repository.get_one(uuid) is not None, flushes
+
+    def _buffer(self, uuid: str, op: str, entity: t.Optional[BaseUniqueEntity]) -> None:
+        self._pending[uuid] = (op, entity)
+        if self._max_pending is not None and len(self._pending) >= self._max_pending:
+            self._wakeup.notify()
+
+    def get_one(self, uuid: str) -> t.Optional[BaseUniqueEntity]:
+        """Retrieve row from write buffer or wrapped repository."""
+        with self._lock:
+            buffered = self._buffered(uuid)
+
+        if buffered is not None:
+            return buffered[1]
+
+        return self._repository.get_one(uuid)
+
+    def get_many(self, uuids: t.Iterable[str]) -> t.Dict[str, BaseUniqueEntity]:
+        """Retrieve rows from write buffer, loading the rest in one batch."""
+        found: t.Dict[str, BaseUniqueEntity] = {}
+        missing = []
+        with self._lock:
+            for uuid in uuids:
+                buffered = self._buffered(uuid)
+                if buffered is None:
+                    missing.append(uuid)
+                elif buffered[1] is not None:
+                    found[uuid] = buffered[1]
+
+        if missing:
+            found.update(self._repository.get_many(missing))
+
+        return found
+
+    def get_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve rows of wrapped repository merged with buffered writes."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.Iterator[BaseUniqueEntity]:
+        """Stream rows of wrapped repository, then rows inserted into the buffer."""
+        with self._lock:
+            overlay = {**self._flushing, **self._pending}
+
+        return paginate(self._merge(overlay), limit, offset)
+
+    def _merge(self, overlay: _Pending) -> t.Iterator[BaseUniqueEntity]:
+        seen = set()
+        for entity in self._repository.iter_all():
+            if entity.uuid not in overlay:
+                yield entity
+                continue
+
+            seen.add(entity.uuid)
+            buffered = overlay[entity.uuid][1]
+            if buffered is not None:
+                yield buffered
+
+        for uuid, (_, buffered) in overlay.items():
+            if buffered is not None and uuid not in seen:
+                yield buffered
+
+    def insert(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Buffer row insert, turning an unflushed delete into an update."""
+        with self._writing(entity.uuid) as exists:
+            pending = self._pending.get(entity.uuid)
+            if pending is not None and pending[0] == _DELETE:
+                self._buffer(entity.uuid, _UPDATE, entity)
+            elif exists:
+                raise KeyError(entity.uuid)
+            else:
+                self._buffer(entity.uuid, _INSERT, entity)
+
+        return entity
+
+    def update(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Buffer row update, keeping an unflushed insert an insert."""
+        with self._writing(entity.uuid) as exists:
+            if not exists:
+                raise KeyError(entity.uuid)
+
+            pending = self._pending.get(entity.uuid)
+            op = _INSERT if pending is not None and pending[0] == _INSERT else _UPDATE
+            self._buffer(entity.uuid, op, entity)
+
+        return entity
+
+    def delete(self, uuid: str) -> bool:
+        """Buffer row delete, dropping an unflushed insert altogether."""
+        with self._writing(uuid) as exists:
+            if not exists:
+                return False
+
+            pending = self._pending.get(uuid)
+            if pending is not None and pending[0] == _INSERT:
+                del self._pending[uuid]
+            else:
+                self._buffer(uuid, _DELETE, None)
+
+        return True
@@ -0,0 +1,408 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import copy
+import math
+import time
+import typing as t
+import weakref
+from collections import OrderedDict
+
+from mediapills.core.domain.batches import EntityBatch
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.entities import ChangeTracker
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.queries import Query
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BaseViewRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.domain.repositories import Page
+from mediapills.core.persistence.decorators import DelegatingViewRepository
+
+"""This module implements repository decorators that cache rows in memory."""
+
+
+def _detached(entity: BaseUniqueEntity) -> BaseUniqueEntity:
+    """Return clean copy of entity, so callers never share cached instances."""
+    if type(entity) is KeyValueEntity:
+        return KeyValueEntity.loaded(entity.uuid, entity.value)
+
+    entity = copy.copy(entity)
+    if isinstance(entity, ChangeTracker):
+        entity.mark_clean()
+    return entity
+
+
+class CachingViewRepository(DelegatingViewRepository):  # dead: disable
+    """Read-through LRU/TTL cache in front of a read only repository.
+
+    The cache keeps its own copies of entities and hands out a fresh one on every
+    read, so mutating a returned entity without writing it back changes nothing.
+    Scans bypass the cache.
+    """
+
+    def __init__(
+        self,
+        repository: BaseViewRepository,
+        maxsize: int = 1024,
+        ttl: t.Optional[float] = None,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        """Class constructor."""
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+
+        super().__init__(repository)
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._cache: "OrderedDict[str, t.Tuple[float, BaseUniqueEntity]]" = (
+            OrderedDict()
+        )
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def hits(self) -> int:
+        """Property number of reads served from cache getter."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Property number of reads passed to wrapped repository getter."""
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        """Property number of rows dropped by LRU or TTL eviction getter."""
+        return self._evictions
+
+    @property
+    def hit_rate(self) -> float:  # dead: disable
+        """Property share of reads served from cache getter."""
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        """Return number of cached rows."""
+        return len(self._cache)
+
+    def _get_cached(self, uuid: str) -> t.Optional[BaseUniqueEntity]:
+        item = self._cache.get(uuid)
+        if item is None:
+            return None
+
+        expires_at, entity = item
+        if expires_at <= self._clock():
+            del self._cache[uuid]
+            self._evictions += 1
+            return None
+
+        self._cache.move_to_end(uuid)
+        return _detached(entity)
+
+    def _put(self, entity: BaseUniqueEntity) -> None:
+        expires_at = math.inf if self._ttl is None else self._clock() + self._ttl
+        self._cache[entity.uuid] = (expires_at, _detached(entity))
+        self._cache.move_to_end(entity.uuid)
+
+        while len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, uuid: t.Optional[str] = None) -> None:
+        """Drop one cached row or the whole cache when uuid is omitted."""
+        if uuid is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(uuid, None)
+
+    def get_one(self, uuid: str) -> t.Optional[BaseUniqueEntity]:
+        """Retrieve row from cache, loading it from wrapped repository on miss."""
+        entity = self._get_cached(uuid)
+        if entity is not None:
+            self._hits += 1
+            return entity
+
+        self._misses += 1
+        entity = self._repository.get_one(uuid)
+        if entity is not None:
+            self._put(entity)
+
+        return entity
+
+    def get_many(self, uuids: t.Iterable[str]) -> t.Dict[str, BaseUniqueEntity]:
+        """Retrieve rows from cache, loading all misses in one batch."""
+        found: t.Dict[str, BaseUniqueEntity] = {}
+        missing: t.List[str] = []
+        for uuid in uuids:
+            entity = self._get_cached(uuid)
+            if entity is None:
+                missing.append(uuid)
+            else:
+                found[uuid] = entity
+
+        self._hits += len(found)
+        self._misses += len(missing)
+        if missing:
+            loaded = self._repository.get_many(missing)
+            for entity in loaded.values():
+                self._put(entity)
+            found.update(loaded)
+
+        return found
+
+
+class CachingRepository(CachingViewRepository, BaseRepository):  # dead: disable
+    """Write-through LRU/TTL cache in front of a manageable repository."""
+
+    _repository: BaseRepository
+
+    def __init__(
+        self,
+        repository: BaseRepository,
+        maxsize: int = 1024,
+        ttl: t.Optional[float] = None,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        """Class constructor."""
+        super().__init__(repository, maxsize=maxsize, ttl=ttl, clock=clock)
+
+    def insert(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Insert row into wrapped repository and cache it."""
+        inserted = self._repository.insert(entity)
+        self._refresh(entity.uuid, inserted)
+        return inserted
+
+    def update(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Update row in wrapped repository and refresh cached copy."""
+        updated = self._repository.update(entity)
+        self._refresh(entity.uuid, updated)
+        return updated
+
+    def delete(self, uuid: str) -> bool:
+        """Delete row from wrapped repository and drop cached copy."""
+        self.invalidate(uuid)
+        return self._repository.delete(uuid)
+
+    def insert_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Insert rows into wrapped repository invalidating written keys."""
+        return self._invalidate_applied(self._repository.insert_many(entities))
+
+    def update_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Update rows in wrapped repository invalidating written keys."""
+        return self._invalidate_applied(self._repository.update_many(entities))
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows from wrapped repository invalidating deleted keys."""
+        return self._invalidate_applied(self._repository.delete_many(uuids))
+
+    def _refresh(self, uuid: str, entity: t.Optional[BaseUniqueEntity]) -> None:
+        if entity is None:
+            self.invalidate(uuid)
+        else:
+            self._put(entity)
+
+    def _invalidate_applied(self, result: BulkWriteResult) -> BulkWriteResult:
+        for uuid in result.applied:
+            self.invalidate(uuid)
+
+        return result
+
+
+class IdentityMapViewRepository(DelegatingViewRepository):  # dead: disable
+    """Identity map resolving each uuid to one entity instance in a unit of work.
+
+    Entities are held weakly, so rows nobody references any more are loaded again.
+    Scans still read the wrapped repository but return instances already mapped;
+    batches hold no entity instances and are passed through unmapped.
+    """
+
+    def __init__(self, repository: BaseViewRepository):
+        """Class constructor."""
+        super().__init__(repository)
+        self._entities: "weakref.WeakValueDictionary[str, BaseUniqueEntity]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        """Property number of keyed reads served from the map getter."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Property number of keyed reads passed to wrapped repository getter."""
+        return self._misses
+
+    def __len__(self) -> int:
+        """Return number of mapped entities."""
+        return len(self._entities)
+
+    def clear(self) -> None:  # dead: disable
+        """Forget all mapped entities, e.g. when a unit of work ends."""
+        self._entities.clear()
+
+    def _resolve(self, entity: BaseUniqueEntity) -> BaseUniqueEntity:
+        return self._entities.setdefault(entity.uuid, entity)
+
+    def get_one(self, uuid: str) -> t.Optional[BaseUniqueEntity]:
+        """Retrieve mapped entity, loading it from wrapped repository on miss."""
+        entity = self._entities.get(uuid)
+        if entity is not None:
+            self._hits += 1
+            return entity
+
+        self._misses += 1
+        entity = self._repository.get_one(uuid)
+        return None if entity is None else self._resolve(entity)
+
+    def get_many(self, uuids: t.Iterable[str]) -> t.Dict[str, BaseUniqueEntity]:
+        """Retrieve mapped entities, loading all misses in one batch."""
+        found: t.Dict[str, BaseUniqueEntity] = {}
+        missing: t.List[str] = []
+        for uuid in uuids:
+            entity = self._entities.get(uuid)
+            if entity is None:
+                missing.append(uuid)
+            else:
+                found[uuid] = entity
+
+        self._hits += len(found)
+        self._misses += len(missing)
+        if missing:
+            for uuid, entity in self._repository.get_many(missing).items():
+                found[uuid] = self._resolve(entity)
+
+        return found
+
+    def get_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve rows from wrapped repository as mapped instances."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.Iterator[BaseUniqueEntity]:
+        """Stream rows from wrapped repository as mapped instances."""
+        for entity in self._repository.iter_all(limit=limit, offset=offset):
+            yield self._resolve(entity)
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve page from wrapped repository as mapped instances."""
+        page = self._repository.get_page(after=after, limit=limit)
+        return Page([self._resolve(e) for e in page.entities], page.cursor)
+
+    def get_range(
+        self,
+        start: t.Optional[str] = None,
+        stop: t.Optional[str] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve key range from wrapped repository as mapped instances."""
+        rows = self._repository.get_range(start, stop, limit=limit)
+        return [self._resolve(entity) for entity in rows]
+
+    def get_prefix(
+        self, prefix: str, limit: t.Optional[int] = None
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve keys with prefix from wrapped repository as mapped instances."""
+        rows = self._repository.get_prefix(prefix, limit=limit)
+        return [self._resolve(entity) for entity in rows]
+
+    def find(self, query: Query) -> t.Iterator[BaseUniqueEntity]:
+        """Stream rows selected by query as mapped instances unless projected."""
+        if query.select is not None:
+            return self._repository.find(query)
+
+        return (self._resolve(entity) for entity in self._repository.find(query))
+
+
+class IdentityMapRepository(IdentityMapViewRepository, BaseRepository):  # dead: disable
+    """Identity map in front of a manageable repository mapping written entities.
+
+    Rows written from an EntityBatch are unmapped instead, as batches hold no
+    entity instances.
+    """
+
+    _repository: BaseRepository
+
+    def __init__(self, repository: BaseRepository):
+        """Class constructor."""
+        super().__init__(repository)
+
+    def insert(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Insert row into wrapped repository and map the entity."""
+        inserted = self._repository.insert(entity)
+        if inserted is not None:
+            self._entities[entity.uuid] = inserted
+
+        return inserted
+
+    def update(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Update row in wrapped repository and map the entity."""
+        updated = self._repository.update(entity)
+        if updated is not None:
+            self._entities[entity.uuid] = updated
+
+        return updated
+
+    def delete(self, uuid: str) -> bool:
+        """Delete row from wrapped repository and unmap it."""
+        self._entities.pop(uuid, None)
+        return self._repository.delete(uuid)
+
+    def insert_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Insert rows into wrapped repository mapping inserted entities."""
+        return self._write_many(self._repository.insert_many, entities)
+
+    def update_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Update rows in wrapped repository mapping updated entities."""
+        return self._write_many(self._repository.update_many, entities)
+
+    def _write_many(
+        self,
+        write: t.Callable[[t.Iterable[BaseUniqueEntity]], BulkWriteResult],
+        entities: t.Iterable[BaseUniqueEntity],
+    ) -> BulkWriteResult:
+        if isinstance(entities, EntityBatch):
+            return self._unmap_applied(write(entities))
+
+        entities = list(entities)
+        result = write(entities)
+        written = {entity.uuid: entity for entity in entities}
+        for uuid in result.applied:
+            self._entities[uuid] = written[uuid]
+
+        return result
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows from wrapped repository unmapping deleted keys."""
+        return self._unmap_applied(self._repository.delete_many(uuids))
+
+    def _unmap_applied(self, result: BulkWriteResult) -> BulkWriteResult:
+        for uuid in result.applied:
+            self._entities.pop(uuid, None)
+
+        return result
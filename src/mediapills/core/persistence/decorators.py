@@ -0,0 +1,95 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import typing as t
+
+from mediapills.core.domain.batches import EntityBatch
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.queries import Query
+from mediapills.core.domain.repositories import BaseViewRepository
+from mediapills.core.domain.repositories import Page
+
+"""This module implements base class for repository decorators."""
+
+
+class DelegatingViewRepository(BaseViewRepository):
+    """Read only repository forwarding every read to the repository it wraps.
+
+    Decorators subclass it and override only the reads they change.
+    """
+
+    def __init__(self, repository: BaseViewRepository):
+        """Class constructor."""
+        super().__init__()
+        self._repository = repository
+
+    @property
+    def repository(self) -> BaseViewRepository:  # dead: disable
+        """Property wrapped repository getter."""
+        return self._repository
+
+    def get_one(self, uuid: str) -> t.Optional[BaseUniqueEntity]:
+        """Retrieve row from wrapped repository."""
+        return self._repository.get_one(uuid)
+
+    def get_many(self, uuids: t.Iterable[str]) -> t.Dict[str, BaseUniqueEntity]:
+        """Retrieve rows from wrapped repository."""
+        return self._repository.get_many(uuids)
+
+    def get_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve rows from wrapped repository."""
+        return self._repository.get_all(limit=limit, offset=offset)
+
+    def iter_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.Iterator[BaseUniqueEntity]:
+        """Stream rows from wrapped repository."""
+        return self._repository.iter_all(limit=limit, offset=offset)
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve page from wrapped repository."""
+        return self._repository.get_page(after=after, limit=limit)
+
+    def get_batch(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> EntityBatch:
+        """Retrieve batch from wrapped repository."""
+        return self._repository.get_batch(limit=limit, offset=offset)
+
+    def get_range(
+        self,
+        start: t.Optional[str] = None,
+        stop: t.Optional[str] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve key range from wrapped repository."""
+        return self._repository.get_range(start, stop, limit=limit)
+
+    def get_prefix(
+        self, prefix: str, limit: t.Optional[int] = None
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve keys with prefix from wrapped repository."""
+        return self._repository.get_prefix(prefix, limit=limit)
+
+    def find(self, query: Query) -> t.Iterator[BaseUniqueEntity]:
+        """Stream rows selected by query from wrapped repository."""
+        return self._repository.find(query)
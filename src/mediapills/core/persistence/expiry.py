@@ -0,0 +1,351 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import math
+import time
+import typing as t
+
+from mediapills.core.domain.batches import EntityBatch
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.domain.repositories import Page
+from mediapills.core.persistence.indexes import BaseValueIndex
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+
+"""This module implements time based expiry of repository rows."""
+
+
+class TimingWheel:
+    """Hierarchical timing wheel scheduling keys for expiry in amortized O(1).
+
+    Level L holds deadlines up to slots ** (L + 1) ticks ahead; its slots are moved
+    down a level when the wheel reaches them, so every deadline is touched at most
+    once per level. Deadlines beyond the top level wait in an overflow list. Advancing
+    jumps over ticks at which no level holds work instead of stepping through them.
+    """
+
+    __slots__ = [
+        "_tick",
+        "_slots",
+        "_wheels",
+        "_sizes",
+        "_overflow",
+        "_current",
+        "_count",
+    ]
+
+    def __init__(
+        self, tick: float = 1.0, slots: int = 64, levels: int = 4, start: float = 0.0
+    ):
+        """Class constructor."""
+        if tick <= 0:
+            raise ValueError("tick must be positive")
+        if slots < 2 or levels < 1:
+            raise ValueError("wheel needs at least two slots and one level")
+
+        self._tick = tick
+        self._slots = slots
+        self._wheels: t.List[t.List[t.List[t.Tuple[str, float]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._sizes = [0] * levels
+        self._overflow: t.List[t.Tuple[str, float]] = []
+        self._current = math.floor(start / tick)
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return number of scheduled deadlines."""
+        return self._count
+
+    def schedule(self, key: str, deadline: float) -> None:
+        """Schedule key to be returned once the wheel reaches deadline."""
+        target = max(math.ceil(deadline / self._tick), self._current + 1)
+        self._place((key, deadline), target)
+        self._count += 1
+
+    def _place(self, item: t.Tuple[str, float], target: int) -> None:
+        delta = target - self._current
+        span = 1
+        for level, wheel in enumerate(self._wheels):
+            if delta < span * self._slots:
+                wheel[(target // span) % self._slots].append(item)
+                self._sizes[level] += 1
+                return
+            span *= self._slots
+
+        self._overflow.append(item)
+
+    def _cascade(self) -> None:
+        levels = len(self._wheels)
+        span = self._slots ** (levels - 1)
+        if self._current % span == 0 and self._overflow:
+            overflow, self._overflow = self._overflow, []
+            for item in overflow:
+                self._place(item, max(math.ceil(item[1] / self._tick), self._current))
+
+        for level in range(levels - 1, 0, -1):
+            if self._current % span == 0:
+                slot = self._wheels[level][(self._current // span) % self._slots]
+                items = slot[:]
+                slot.clear()
+                self._sizes[level] -= len(items)
+                for item in items:
+                    target = max(math.ceil(item[1] / self._tick), self._current)
+                    self._place(item, target)
+            span //= self._slots
+
+    def _next_tick(self, stop: int) -> int:
+        """Return next tick up to stop at which a slot is due or cascades."""
+        span = 1
+        for size in self._sizes[:-1]:
+            if size:
+                break
+            span *= self._slots
+
+        return min((self._current // span + 1) * span, stop)
+
+    def advance(self, now: float) -> t.List[t.Tuple[str, float]]:
+        """Move wheel to now returning (key, deadline) pairs that became due."""
+        due: t.List[t.Tuple[str, float]] = []
+        stop = math.floor(now / self._tick)
+        if not self._count:
+            self._current = max(self._current, stop)
+            return due
+
+        while self._current < stop and self._count:
+            self._current = self._next_tick(stop)
+            self._cascade()
+            slot = self._wheels[0][self._current % self._slots]
+            due.extend(slot)
+            self._count -= len(slot)
+            self._sizes[0] -= len(slot)
+            slot.clear()
+
+        self._current = max(self._current, stop)
+        return due
+
+
+class ExpiringDictRepositoryAdapter(DictRepositoryAdapter):  # dead: disable
+    """Dictionary repository adapter whose rows expire after a time to live.
+
+    Inserts set the row TTL, falling back to the adapter default, and updates restart
+    the TTL the row already has unless given a new one; rows without a TTL never
+    expire. Expired rows are hidden from reads immediately and dropped
+    lazily when read or eagerly by the timing wheel, which every call advances.
+    """
+
+    def __init__(
+        self,
+        data: t.Optional[t.Dict[str, t.Any]] = None,
+        ttl: t.Optional[float] = None,
+        tick: float = 1.0,
+        clock: t.Callable[[], float] = time.monotonic,
+        indexes: t.Optional[t.Mapping[str, BaseValueIndex]] = None,
+    ):
+        """Class constructor."""
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+
+        super().__init__(data, indexes)
+        self._ttl = ttl
+        self._clock = clock
+        now = clock()
+        self._wheel = TimingWheel(tick=tick, start=now)
+        self._deadlines: t.Dict[str, float] = {}
+        self._ttls: t.Dict[str, float] = {}
+        self._expirations = 0
+        self._evictions = 0
+        for uuid in self._data:
+            self._expire_after(uuid, ttl, now)
+
+    @property
+    def expirations(self) -> int:
+        """Property number of expired rows dropped on access getter."""
+        return self._expirations
+
+    @property
+    def evictions(self) -> int:
+        """Property number of expired rows dropped by the timing wheel getter."""
+        return self._evictions
+
+    @staticmethod
+    def _check(ttl: t.Optional[float]) -> None:
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+
+    def _expire_after(self, uuid: str, ttl: t.Optional[float], now: float) -> None:
+        """Arm row deadline remembering its ttl, so later writes restart the same ttl."""
+        if ttl is None:
+            self._forget(uuid)
+        else:
+            deadline = now + ttl
+            self._ttls[uuid] = ttl
+            self._deadlines[uuid] = deadline
+            self._wheel.schedule(uuid, deadline)
+
+    def _forget(self, uuid: str) -> None:
+        self._deadlines.pop(uuid, None)
+        self._ttls.pop(uuid, None)
+
+    def _drop(self, uuid: str) -> None:
+        self._forget(uuid)
+        DictRepositoryAdapter.delete(self, uuid)
+
+    def _expired(self, uuid: str, now: float) -> bool:
+        deadline = self._deadlines.get(uuid)
+        return deadline is not None and deadline <= now
+
+    def _purge(self, uuids: t.Iterable[str], now: float) -> None:
+        for uuid in uuids:
+            if self._expired(uuid, now):
+                self._drop(uuid)
+                self._expirations += 1
+
+    def _now(self) -> float:
+        now = self._clock()
+        for uuid, deadline in self._wheel.advance(now):
+            if self._deadlines.get(uuid) == deadline:
+                self._drop(uuid)
+                self._evictions += 1
+
+        return now
+
+    def evict(self) -> None:  # dead: disable
+        """Drop rows whose deadline the timing wheel has passed."""
+        self._now()
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve dict element if exists and has not expired."""
+        self._purge((uuid,), self._now())
+        return super().lookup(uuid)
+
+    def lookup_many(  # type: ignore[override]
+        self, uuids: t.Iterable[str]
+    ) -> t.Dict[str, KeyValueEntity]:
+        """Retrieve existing and not expired dict elements for requested keys."""
+        uuids = list(uuids)
+        self._purge(uuids, self._now())
+        return super().lookup_many(uuids)
+
+    def _rows(self) -> t.Iterable[t.Tuple[str, t.Any]]:
+        now = self._now()
+        return ((k, v) for k, v in self._data.items() if not self._expired(k, now))
+
+    def _range_rows(
+        self, start: t.Optional[str], stop: t.Optional[str], limit: t.Optional[int]
+    ) -> t.List[t.Tuple[str, t.Any]]:
+        now = self._now()
+        while True:
+            rows = super()._range_rows(start, stop, limit)
+            expired = [k for k, _ in rows if self._expired(k, now)]
+            if not expired:
+                return rows
+
+            # Dropping the expired rows lets the next scan fill up to limit live rows.
+            self._purge(expired, now)
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve full page of rows in key order dropping rows expired on the way."""
+        now = self._now()
+        while True:
+            page = super().get_page(after=after, limit=limit)
+            expired = [e.uuid for e in page.entities if self._expired(e.uuid, now)]
+            if not expired:
+                return page
+
+            self._purge(expired, now)
+
+    def _index_search(
+        self, index: str, search: t.Callable[[BaseValueIndex], t.List[str]]
+    ) -> t.List[KeyValueEntity]:
+        self._now()
+        return super()._index_search(index, search)
+
+    def insert(  # type: ignore[override]
+        self, entity: KeyValueEntity, ttl: t.Optional[float] = None
+    ) -> t.Optional[KeyValueEntity]:
+        """Insert row into table expiring it after ttl."""
+        self._check(ttl)
+        now = self._now()
+        self._purge((entity.uuid,), now)
+        inserted = super().insert(entity)
+        self._expire_after(entity.uuid, self._ttl if ttl is None else ttl, now)
+        return inserted
+
+    def update(  # type: ignore[override]
+        self, entity: KeyValueEntity, ttl: t.Optional[float] = None
+    ) -> t.Optional[KeyValueEntity]:
+        """Update row in table restarting its ttl, or the given new ttl."""
+        self._check(ttl)
+        now = self._now()
+        self._purge((entity.uuid,), now)
+        updated = super().update(entity)
+        if ttl is None:
+            ttl = self._ttls.get(entity.uuid)
+        self._expire_after(entity.uuid, ttl, now)
+        return updated
+
+    def delete(self, uuid: str) -> bool:
+        """Delete row from table that satisfy the condition where uuid equal value."""
+        self._purge((uuid,), self._now())
+        self._forget(uuid)
+        return super().delete(uuid)
+
+    def insert_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity], ttl: t.Optional[float] = None
+    ) -> BulkWriteResult:
+        """Insert rows skipping existing keys and expiring them after ttl."""
+        return self._write_many(super().insert_many, entities, ttl, False)
+
+    def update_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity], ttl: t.Optional[float] = None
+    ) -> BulkWriteResult:
+        """Update rows skipping missing keys and restarting their ttl, or the new ttl."""
+        return self._write_many(super().update_many, entities, ttl, True)
+
+    def _write_many(
+        self,
+        write: t.Callable[[EntityBatch], BulkWriteResult],
+        entities: t.Iterable[KeyValueEntity],
+        ttl: t.Optional[float],
+        rearm: bool,
+    ) -> BulkWriteResult:
+        self._check(ttl)
+        batch = EntityBatch.from_entities(entities)
+        now = self._now()
+        self._purge(set(batch.uuids), now)
+        result = write(batch)
+        for uuid in result.applied:
+            row_ttl = ttl
+            if row_ttl is None:
+                row_ttl = self._ttls.get(uuid) if rearm else self._ttl
+            self._expire_after(uuid, row_ttl, now)
+
+        return result
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows skipping missing and expired keys."""
+        uuids = list(uuids)
+        self._purge(set(uuids), self._now())
+        result = super().delete_many(uuids)
+        for uuid in result.applied:
+            self._forget(uuid)
+
+        return result
@@ -0,0 +1,280 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import asyncio
+import collections
+import contextlib
+import threading
+import typing as t
+from enum import Enum
+
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.exceptions import ResyncRequiredException
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.persistence.decorators import DelegatingViewRepository
+
+"""This module implements ordered change streams of repository mutations."""
+
+
+class ChangeType(Enum):
+    """Enumerated kinds of repository mutations."""
+
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class ChangeEvent:
+    """One applied repository mutation; entity is None for deletes."""
+
+    __slots__ = ["_sequence", "_change", "_uuid", "_entity"]
+
+    def __init__(
+        self,
+        sequence: int,
+        change: ChangeType,
+        uuid: str,
+        entity: t.Optional[BaseUniqueEntity] = None,
+    ):
+        """Class constructor."""
+        self._sequence = sequence
+        self._change = change
+        self._uuid = uuid
+        self._entity = entity
+
+    @property
+    def sequence(self) -> int:
+        """Property monotonically increasing event number getter."""
+        return self._sequence
+
+    @property
+    def change(self) -> ChangeType:
+        """Property mutation kind getter."""
+        return self._change
+
+    @property
+    def uuid(self) -> str:
+        """Property changed row key getter."""
+        return self._uuid
+
+    @property
+    def entity(self) -> t.Optional[BaseUniqueEntity]:
+        """Property written row getter."""
+        return self._entity
+
+    def __repr__(self) -> str:
+        """Return debug representation."""
+        return f"ChangeEvent({self._sequence}, {self._change.value}, {self._uuid!r})"
+
+
+class ChangeFeed:
+    """Bounded ring buffer of change events numbered from 1.
+
+    Publishers never block: the oldest events are dropped once capacity is reached,
+    and consumers asking for dropped events get ResyncRequiredException carrying the
+    sequence to resume from after re-reading the repository.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """Class constructor."""
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self._events: t.Deque[ChangeEvent] = collections.deque(maxlen=capacity)
+        self._sequence = 0
+        self._changed = threading.Condition()
+        self._async_waiters: t.List[t.Tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+        self._async_waiters = []
+
+    @property
+    def sequence(self) -> int:
+        """Property sequence number of the last published event getter."""
+        return self._sequence
+
+    def publish(
+        self, change: ChangeType, uuid: str, entity: t.Optional[BaseUniqueEntity] = None
+    ) -> ChangeEvent:
+        """Append event and wake up waiting consumers."""
+        with self._changed:
+            self._sequence += 1
+            event = ChangeEvent(self._sequence, change, uuid, entity)
+            self._events.append(event)
+            self._changed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+
+        for loop, ready in waiters:
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(ready.set)
+
+        return event
+
+    def read(self, since: int, limit: t.Optional[int] = None) -> t.List[ChangeEvent]:
+        """Return retained events after since without waiting."""
+        with self._changed:
+            if since >= self._sequence:
+                return []
+
+            first = self._sequence - len(self._events) + 1
+            if since + 1 < first:
+                raise ResyncRequiredException(self._sequence)
+
+            start = since + 1 - first
+            stop = len(self._events) if limit is None else start + limit
+            return [self._events[i] for i in range(start, min(stop, len(self._events)))]
+
+    def wait(self, since: int, timeout: t.Optional[float] = None) -> bool:
+        """Block until an event after since is published or timeout expires."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self._sequence > since, timeout)
+
+    async def wait_async(self, since: int, timeout: t.Optional[float] = None) -> bool:
+        """Wait in the running event loop until an event after since is published."""
+        ready = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), ready)
+        with self._changed:
+            if self._sequence > since:
+                return True
+            self._async_waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._changed:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+
+    def watch(
+        self, since: t.Optional[int] = None, timeout: t.Optional[float] = None
+    ) -> t.Iterator[ChangeEvent]:
+        """Yield events after since, or new events only, until none come in timeout."""
+        since = self._sequence if since is None else since
+        while True:
+            events = self.read(since)
+            if not events:
+                if not self.wait(since, timeout):
+                    return
+                continue
+
+            for event in events:
+                yield event
+            since = events[-1].sequence
+
+    async def watch_async(
+        self, since: t.Optional[int] = None, timeout: t.Optional[float] = None
+    ) -> t.AsyncIterator[ChangeEvent]:
+        """Asynchronously yield events after since until none come in timeout."""
+        since = self._sequence if since is None else since
+        while True:
+            events = self.read(since)
+            if not events:
+                if not await self.wait_async(since, timeout):
+                    return
+                continue
+
+            for event in events:
+                yield event
+            since = events[-1].sequence
+
+
+class ObservableRepository(DelegatingViewRepository, BaseRepository):  # dead: disable
+    """Manageable repository decorator publishing applied writes to a change feed.
+
+    Writes are serialized so that event order matches the order they were applied.
+    """
+
+    _repository: BaseRepository
+
+    def __init__(self, repository: BaseRepository, capacity: int = 1024):
+        """Class constructor."""
+        super().__init__(repository)
+        self._feed = ChangeFeed(capacity)
+        self._lock = threading.Lock()
+
+    @property
+    def feed(self) -> ChangeFeed:
+        """Property change feed getter."""
+        return self._feed
+
+    def insert(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Insert row into wrapped repository publishing an insert event."""
+        with self._lock:
+            inserted = self._repository.insert(entity)
+            if inserted is not None:
+                self._feed.publish(ChangeType.INSERT, entity.uuid, inserted)
+
+        return inserted
+
+    def update(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Update row in wrapped repository publishing an update event."""
+        with self._lock:
+            updated = self._repository.update(entity)
+            if updated is not None:
+                self._feed.publish(ChangeType.UPDATE, entity.uuid, updated)
+
+        return updated
+
+    def delete(self, uuid: str) -> bool:
+        """Delete row from wrapped repository publishing a delete event."""
+        with self._lock:
+            deleted = self._repository.delete(uuid)
+            if deleted:
+                self._feed.publish(ChangeType.DELETE, uuid)
+
+        return deleted
+
+    def insert_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Insert rows into wrapped repository publishing one event per applied row."""
+        return self._write_many(
+            ChangeType.INSERT, self._repository.insert_many, entities
+        )
+
+    def update_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Update rows in wrapped repository publishing one event per applied row."""
+        return self._write_many(
+            ChangeType.UPDATE, self._repository.update_many, entities
+        )
+
+    def _write_many(
+        self,
+        change: ChangeType,
+        write: t.Callable[[t.List[BaseUniqueEntity]], BulkWriteResult],
+        entities: t.Iterable[BaseUniqueEntity],
+    ) -> BulkWriteResult:
+        entities = list(entities)
+        batch = {entity.uuid: entity for entity in entities}
+        with self._lock:
+            result = write(entities)
+            for uuid in result.applied:
+                self._feed.publish(change, uuid, batch[uuid])
+
+        return result
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows from wrapped repository publishing one event per applied row."""
+        with self._lock:
+            result = self._repository.delete_many(uuids)
+            for uuid in result.applied:
+                self._feed.publish(ChangeType.DELETE, uuid)
+
+        return result
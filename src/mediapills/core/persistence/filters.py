@@ -0,0 +1,230 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import hashlib
+import math
+import typing as t
+
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BaseViewRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.persistence.decorators import DelegatingViewRepository
+
+"""This module implements probabilistic key filters answering definite misses."""
+
+
+class CountingBloomFilter:
+    """Bloom filter with byte counters so that keys can be removed again.
+
+    Counters saturate at 255 and are never decremented afterwards, which keeps the
+    filter free of false negatives at the cost of a few stuck positions.
+    """
+
+    __slots__ = ["_counters", "_hashes", "_error_rate", "_count"]
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+        """Class constructor."""
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self._counters = bytearray(size)
+        self._hashes = max(1, round(size / capacity * math.log(2)))
+        self._error_rate = error_rate
+        self._count = 0
+
+    @property
+    def size(self) -> int:
+        """Property number of counters, one byte each, getter."""
+        return len(self._counters)
+
+    @property
+    def hashes(self) -> int:  # dead: disable
+        """Property number of counters set per key getter."""
+        return self._hashes
+
+    @property
+    def error_rate(self) -> float:  # dead: disable
+        """Property configured false positive rate at capacity getter."""
+        return self._error_rate
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Property false positive rate expected for the current key count getter."""
+        fill = 1 - math.exp(-self._hashes * self._count / len(self._counters))
+        return float(fill**self._hashes)
+
+    def __len__(self) -> int:
+        """Return number of keys added and not removed."""
+        return self._count
+
+    def _positions(self, key: str) -> t.List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        size = len(self._counters)
+        return [(h1 + i * h2) % size for i in range(self._hashes)]
+
+    def __contains__(self, key: object) -> bool:
+        """Return False if key was definitely never added."""
+        if not isinstance(key, str):
+            return False
+
+        counters = self._counters
+        return all(counters[i] for i in self._positions(key))
+
+    def add(self, key: str) -> None:
+        """Add key to filter."""
+        counters = self._counters
+        for i in self._positions(key):
+            if counters[i] < 255:
+                counters[i] += 1
+        self._count += 1
+
+    def remove(self, key: str) -> None:
+        """Remove key previously added to filter."""
+        counters = self._counters
+        for i in self._positions(key):
+            if 0 < counters[i] < 255:
+                counters[i] -= 1
+        self._count = max(0, self._count - 1)
+
+
+class BloomFilterViewRepository(DelegatingViewRepository):  # dead: disable
+    """Read only repository decorator answering lookups of absent keys from a filter.
+
+    The filter is filled from the wrapped repository keys on construction, so rows
+    written to the wrapped repository directly afterwards are not visible.
+    """
+
+    def __init__(
+        self,
+        repository: BaseViewRepository,
+        capacity: int = 100_000,
+        error_rate: float = 0.01,
+    ):
+        """Class constructor."""
+        super().__init__(repository)
+        self._filter = CountingBloomFilter(capacity=capacity, error_rate=error_rate)
+        self._negatives = 0
+        self._false_positives = 0
+        for entity in repository.iter_all():
+            self._filter.add(entity.uuid)
+
+    @property
+    def filter(self) -> CountingBloomFilter:  # dead: disable
+        """Property key filter getter."""
+        return self._filter
+
+    @property
+    def negatives(self) -> int:
+        """Property number of lookups answered by the filter alone getter."""
+        return self._negatives
+
+    @property
+    def false_positives(self) -> int:
+        """Property number of filter passes not found in wrapped repository getter."""
+        return self._false_positives
+
+    def get_one(self, uuid: str) -> t.Optional[BaseUniqueEntity]:
+        """Retrieve row from wrapped repository unless filter rules it out."""
+        if uuid not in self._filter:
+            self._negatives += 1
+            return None
+
+        entity = self._repository.get_one(uuid)
+        if entity is None:
+            self._false_positives += 1
+
+        return entity
+
+    def get_many(self, uuids: t.Iterable[str]) -> t.Dict[str, BaseUniqueEntity]:
+        """Retrieve rows from wrapped repository for keys passing the filter."""
+        candidates = []
+        for uuid in uuids:
+            if uuid in self._filter:
+                candidates.append(uuid)
+            else:
+                self._negatives += 1
+
+        if not candidates:
+            return {}
+
+        found = self._repository.get_many(candidates)
+        self._false_positives += len(set(candidates) - found.keys())
+        return found
+
+
+class BloomFilterRepository(BloomFilterViewRepository, BaseRepository):  # dead: disable
+    """Manageable repository decorator keeping its key filter in sync with writes."""
+
+    _repository: BaseRepository
+
+    def __init__(
+        self,
+        repository: BaseRepository,
+        capacity: int = 100_000,
+        error_rate: float = 0.01,
+    ):
+        """Class constructor."""
+        super().__init__(repository, capacity=capacity, error_rate=error_rate)
+
+    def insert(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Insert row into wrapped repository and add its key to the filter."""
+        inserted = self._repository.insert(entity)
+        if inserted is not None:
+            self._filter.add(entity.uuid)
+
+        return inserted
+
+    def update(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Update row in wrapped repository."""
+        return self._repository.update(entity)
+
+    def delete(self, uuid: str) -> bool:
+        """Delete row from wrapped repository and remove its key from the filter."""
+        deleted = self._repository.delete(uuid)
+        if deleted:
+            self._filter.remove(uuid)
+
+        return deleted
+
+    def insert_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Insert rows into wrapped repository adding inserted keys to the filter."""
+        result = self._repository.insert_many(entities)
+        for uuid in result.applied:
+            self._filter.add(uuid)
+
+        return result
+
+    def update_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Update rows in wrapped repository."""
+        return self._repository.update_many(entities)
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows from wrapped repository removing deleted keys from the filter."""
+        result = self._repository.delete_many(uuids)
+        for uuid in result.applied:
+            self._filter.remove(uuid)
+
+        return result
@@ -0,0 +1,188 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import abc
+import bisect
+import typing as t
+
+"""This module implements in-memory indexes for repository adapters."""
+
+
+class SortedKeyIndex:
+    """Keys kept in lexicographic order for seeks and range scans."""
+
+    __slots__ = ["_keys"]
+
+    """Batch size above which bulk changes rebuild the index instead of bisecting."""
+    _REBUILD_THRESHOLD = 64
+
+    def __init__(self, keys: t.Iterable[str] = ()):
+        """Class constructor."""
+        self._keys = sorted(keys)
+
+    def __len__(self) -> int:
+        """Return number of indexed keys."""
+        return len(self._keys)
+
+    def add(self, key: str) -> None:
+        """Index key unless already indexed."""
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            self._keys.insert(i, key)
+
+    def discard(self, key: str) -> None:
+        """Remove key from index if indexed."""
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def update(self, keys: t.Collection[str]) -> None:
+        """Index new keys."""
+        if len(keys) < self._REBUILD_THRESHOLD:
+            for key in keys:
+                self.add(key)
+        else:
+            self._keys = sorted(set(self._keys).union(keys))
+
+    def difference_update(self, keys: t.Collection[str]) -> None:
+        """Remove keys from index."""
+        if len(keys) < self._REBUILD_THRESHOLD:
+            for key in keys:
+                self.discard(key)
+        else:
+            removed = set(keys)
+            self._keys = [key for key in self._keys if key not in removed]
+
+    def after(self, key: t.Optional[str], limit: int) -> t.List[str]:
+        """Return up to limit keys following key, or the first keys if key is None."""
+        start = 0 if key is None else bisect.bisect_right(self._keys, key)
+        stop = start + limit
+        return self._keys[start:stop]
+
+    def range(
+        self,
+        start: t.Optional[str] = None,
+        stop: t.Optional[str] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[str]:
+        """Return keys in half-open range [start, stop), at most limit of them."""
+        lo = 0 if start is None else bisect.bisect_left(self._keys, start)
+        hi = len(self._keys) if stop is None else bisect.bisect_left(self._keys, stop)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+
+        return self._keys[lo:hi]
+
+
+class BaseValueIndex(metaclass=abc.ABCMeta):
+    """Secondary index mapping keys extracted from row values to row keys.
+
+    Rows whose extracted key is None are not indexed.
+    """
+
+    def __init__(self, key: t.Callable[[t.Any], t.Any]):
+        """Class constructor."""
+        self._key = key
+
+    def add(self, uuid: str, value: t.Any) -> None:
+        """Index row."""
+        index_key = self._key(value)
+        if index_key is not None:
+            self._add(index_key, uuid)
+
+    def remove(self, uuid: str, value: t.Any) -> None:
+        """Remove row from index."""
+        index_key = self._key(value)
+        if index_key is not None:
+            self._remove(index_key, uuid)
+
+    @abc.abstractmethod
+    def _add(self, index_key: t.Any, uuid: str) -> None:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def _remove(self, index_key: t.Any, uuid: str) -> None:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def lookup(self, index_key: t.Any) -> t.List[str]:
+        """Return keys of rows whose value has the index key."""
+        raise NotImplementedError()
+
+
+class HashIndex(BaseValueIndex):
+    """Value index answering equality lookups in constant time."""
+
+    def __init__(self, key: t.Callable[[t.Any], t.Hashable]):
+        """Class constructor."""
+        super().__init__(key)
+        self._rows: t.Dict[t.Hashable, t.Dict[str, None]] = {}
+
+    def _add(self, index_key: t.Any, uuid: str) -> None:
+        self._rows.setdefault(index_key, {})[uuid] = None
+
+    def _remove(self, index_key: t.Any, uuid: str) -> None:
+        rows = self._rows.get(index_key)
+        if rows is not None:
+            rows.pop(uuid, None)
+            if not rows:
+                del self._rows[index_key]
+
+    def lookup(self, index_key: t.Any) -> t.List[str]:
+        """Return keys of rows whose value has the index key."""
+        return list(self._rows.get(index_key, ()))
+
+
+class SortedIndex(BaseValueIndex):
+    """Value index answering equality and range lookups in logarithmic time."""
+
+    def __init__(self, key: t.Callable[[t.Any], t.Any]):
+        """Class constructor."""
+        super().__init__(key)
+        self._entries: t.List[t.Tuple[t.Any, str]] = []
+
+    def _add(self, index_key: t.Any, uuid: str) -> None:
+        bisect.insort(self._entries, (index_key, uuid))
+
+    def _remove(self, index_key: t.Any, uuid: str) -> None:
+        i = bisect.bisect_left(self._entries, (index_key, uuid))
+        if i < len(self._entries) and self._entries[i] == (index_key, uuid):
+            del self._entries[i]
+
+    def lookup(self, index_key: t.Any) -> t.List[str]:
+        """Return keys of rows whose value has the index key."""
+        i = bisect.bisect_left(self._entries, (index_key,))
+        found = []
+        while i < len(self._entries) and self._entries[i][0] == index_key:
+            found.append(self._entries[i][1])
+            i += 1
+
+        return found
+
+    def range(
+        self, start: t.Optional[t.Any] = None, stop: t.Optional[t.Any] = None
+    ) -> t.List[str]:
+        """Return keys of rows with index key in half-open range, ordered by it."""
+        lo = 0 if start is None else bisect.bisect_left(self._entries, (start,))
+        hi = len(self._entries)
+        if stop is not None:
+            hi = bisect.bisect_left(self._entries, (stop,), lo)
+
+        return [uuid for _, uuid in self._entries[lo:hi]]
@@ -18,29 +18,173 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import contextlib
+import itertools
+import operator
 import os
+import pickle
+import re
+import sqlite3
 import sys
+import threading
 import typing as t
+from types import MappingProxyType
 
+from mediapills.core.domain.batches import EntityBatch
 from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.queries import by_key
+from mediapills.core.domain.queries import Query
+from mediapills.core.domain.repositories import BaseKeyLookup
+from mediapills.core.domain.repositories import BasePartialUpdate
 from mediapills.core.domain.repositories import BaseRepository
 from mediapills.core.domain.repositories import BaseViewRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.domain.repositories import decode_cursor
+from mediapills.core.domain.repositories import Page
+from mediapills.core.domain.repositories import paginated
+from mediapills.core.persistence.indexes import BaseValueIndex
+from mediapills.core.persistence.indexes import SortedIndex
+from mediapills.core.persistence.indexes import SortedKeyIndex
 
+T = t.TypeVar("T")
 
-class DictRepositoryAdapter(BaseRepository):  # dead: disable
-    """Dictionary variables repository adapter."""
+_MISSING = object()
 
-    def __init__(self, data: t.Optional[t.Dict[str, t.Any]] = None):
+_first = operator.itemgetter(0)
+_second = operator.itemgetter(1)
+
+
+def paginate(
+    items: t.Iterable[T], limit: t.Optional[int] = None, offset: t.Optional[int] = None
+) -> t.Iterator[T]:
+    """Lazily skip offset items and stop after limit items."""
+    start = offset or 0
+    stop = None if limit is None else start + limit
+
+    return itertools.islice(items, start, stop)
+
+
+def entity_items(entities: t.Iterable[KeyValueEntity]) -> t.Dict[str, t.Any]:
+    """Map uuids to values of entities or batch rows; repeated keys keep the last."""
+    if isinstance(entities, EntityBatch):
+        return dict(entities.items())
+
+    return {entity.uuid: entity.value for entity in entities}
+
+
+class DictRepositoryAdapter(  # dead: disable
+    BaseRepository, BaseKeyLookup, BasePartialUpdate
+):
+    """Dictionary variables repository adapter.
+
+    The sorted key index used by get_page is built on first use and then kept in sync
+    by the adapter writes, so the wrapped dict must not be changed directly afterwards.
+    The same holds for the secondary value indexes, which are given empty by name and
+    filled from the initial data.
+    """
+
+    def __init__(
+        self,
+        data: t.Optional[t.Dict[str, t.Any]] = None,
+        indexes: t.Optional[t.Mapping[str, BaseValueIndex]] = None,
+    ):
         """Class constructor."""
         super().__init__()
         self._data = data or {}
+        self._keys: t.Optional[SortedKeyIndex] = None
+        self._indexes = dict(indexes or {})
+        for index in self._indexes.values():
+            for k, v in self._data.items():
+                index.add(k, v)
+
+    def _keys_added(self, keys: t.Collection[str]) -> None:
+        if self._keys is not None:
+            self._keys.update(keys)
+
+    def _keys_removed(self, keys: t.Collection[str]) -> None:
+        if self._keys is not None:
+            self._keys.difference_update(keys)
+
+    def _values_changed(
+        self,
+        removed: t.Iterable[t.Tuple[str, t.Any]],
+        added: t.Iterable[t.Tuple[str, t.Any]],
+    ) -> None:
+        for index in self._indexes.values():
+            for k, v in removed:
+                index.remove(k, v)
+            for k, v in added:
+                index.add(k, v)
+
+    def _index_search(
+        self, index: str, search: t.Callable[[BaseValueIndex], t.List[str]]
+    ) -> t.List[KeyValueEntity]:
+        uuids = search(self._indexes[index])
+        found = self.lookup_many(uuids)
+        return [found[k] for k in uuids if k in found]
+
+    def find_by(self, index: str, value: t.Any) -> t.List[KeyValueEntity]:
+        """Retrieve rows whose value has the given key in the named index."""
+        return self._index_search(index, lambda idx: idx.lookup(value))
+
+    def find_range(  # dead: disable
+        self, index: str, start: t.Any = None, stop: t.Any = None
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve rows with key in [start, stop) of the named sorted index."""
+        if not isinstance(self._indexes[index], SortedIndex):
+            raise TypeError(f"Index {index!r} does not support range lookups")
+
+        return self._index_search(
+            index, lambda idx: t.cast(SortedIndex, idx).range(start, stop)
+        )
 
-    def get_one(self, uuid: str) -> t.Optional[KeyValueEntity]:  # dead: disable
+    def _key_index(self) -> SortedKeyIndex:
+        if self._keys is None:
+            self._keys = SortedKeyIndex(self._data)
+
+        return self._keys
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve rows in key order seeking to the cursor in the sorted key index."""
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        last = None if after is None else decode_cursor(after)
+        keys = self._key_index().after(last, limit + 1)
+        return paginated([KeyValueEntity.loaded(k, self._data[k]) for k in keys], limit)
+
+    def _range_rows(
+        self, start: t.Optional[str], stop: t.Optional[str], limit: t.Optional[int]
+    ) -> t.List[t.Tuple[str, t.Any]]:
+        data = self._data
+        return [(k, data[k]) for k in self._key_index().range(start, stop, limit)]
+
+    def get_range(  # type: ignore[override]
+        self,
+        start: t.Optional[str] = None,
+        stop: t.Optional[str] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve rows in key range seeking in the sorted key index."""
+        return [
+            KeyValueEntity.loaded(k, v) for k, v in self._range_rows(start, stop, limit)
+        ]
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
         """Retrieve dict element if exists."""
         if uuid not in self._data:
             return None
 
-        return KeyValueEntity(uuid=uuid, val=self._data.get(uuid, None))
+        return KeyValueEntity.loaded(uuid=uuid, val=self._data.get(uuid, None))
+
+    def lookup_many(  # type: ignore[override]
+        self, uuids: t.Iterable[str]
+    ) -> t.Dict[str, KeyValueEntity]:
+        """Retrieve existing dict elements for all requested keys."""
+        data = self._data
+        return {
+            k: KeyValueEntity.loaded(uuid=k, val=data[k]) for k in uuids if k in data
+        }
 
     def get_all(  # type: ignore[override]
         self,
@@ -48,7 +192,45 @@ def get_all(  # type: ignore[override]
         offset: t.Optional[int] = None,
     ) -> t.List[KeyValueEntity]:
         """Retrieve all dict data."""
-        return [KeyValueEntity(uuid=k, val=v) for k, v in self._data.items()]
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream dict data building entities only for the requested page."""
+        for k, v in paginate(self._rows(), limit=limit, offset=offset):
+            yield KeyValueEntity.loaded(uuid=k, val=v)
+
+    def get_batch(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> EntityBatch:
+        """Retrieve dict data as a columnar batch without building entities."""
+        return EntityBatch.from_items(
+            paginate(self._rows(), limit=limit, offset=offset)
+        )
+
+    def _rows(self) -> t.Iterable[t.Tuple[str, t.Any]]:
+        return self._data.items()
+
+    def find(self, query: Query) -> t.Iterator[KeyValueEntity]:
+        """Stream dict elements selected by query building entities only for matches.
+
+        Queries bounded by key prefix or range scan only that range of the sorted key
+        index.
+        """
+        rows: t.Iterable[t.Tuple[str, t.Any]]
+        if query.prefix or query.start is not None or query.stop is not None:
+            start, stop = query.key_range()
+            rows = self._range_rows(start, stop, None)
+        else:
+            rows = self._rows()
+
+        for k, v in query.run(rows, key=_first, value=_second):
+            yield KeyValueEntity.loaded(uuid=k, val=query.project(v))
 
     def insert(  # dead: disable
         self, entity: KeyValueEntity  # type: ignore[override]
@@ -58,6 +240,9 @@ def insert(  # dead: disable
             raise KeyError()
 
         self._data[entity.uuid] = entity.value
+        self._keys_added((entity.uuid,))
+        if self._indexes:
+            self._values_changed((), ((entity.uuid, entity.value),))
         return entity
 
     def update(  # dead: disable
@@ -67,7 +252,10 @@ def update(  # dead: disable
         if entity.uuid not in self._data:
             raise KeyError()
 
+        old = self._data[entity.uuid]
         self._data[entity.uuid] = entity.value
+        if self._indexes:
+            self._values_changed(((entity.uuid, old),), ((entity.uuid, entity.value),))
         return entity
 
     def delete(self, uuid: str) -> bool:  # dead: disable
@@ -75,20 +263,417 @@ def delete(self, uuid: str) -> bool:  # dead: disable
         if uuid not in self._data:
             return False
 
-        del self._data[uuid]
+        old = self._data.pop(uuid)
+        self._keys_removed((uuid,))
+        if self._indexes:
+            self._values_changed(((uuid, old),), ())
+        return True
+
+    def insert_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Insert rows skipping existing keys; repeated keys keep the last value."""
+        batch = entity_items(entities)
+        conflicts = batch.keys() & self._data.keys()
+        for uuid in conflicts:
+            del batch[uuid]
+
+        self._data.update(batch)
+        self._keys_added(batch.keys())
+        if self._indexes:
+            self._values_changed((), batch.items())
+        return BulkWriteResult(
+            applied=list(batch), failed={uuid: KeyError(uuid) for uuid in conflicts}
+        )
+
+    def update_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Update rows skipping missing keys; repeated keys keep the last value."""
+        batch = entity_items(entities)
+        missing = batch.keys() - self._data.keys()
+        for uuid in missing:
+            del batch[uuid]
+
+        if self._indexes:
+            old = [(uuid, self._data[uuid]) for uuid in batch]
+            self._values_changed(old, batch.items())
+        self._data.update(batch)
+        return BulkWriteResult(
+            applied=list(batch), failed={uuid: KeyError(uuid) for uuid in missing}
+        )
+
+    def update_fields(self, uuid: str, fields: t.Mapping[str, t.Any]) -> bool:
+        """Write value field of row; other fields are not stored by the adapter."""
+        result = self.update_fields_many({uuid: fields})
+        return bool(result.applied)
+
+    def update_fields_many(
+        self, changes: t.Mapping[str, t.Mapping[str, t.Any]]
+    ) -> BulkWriteResult:
+        """Write value fields of rows; rows without a changed value are not touched."""
+        batch = {u: f["value"] for u, f in changes.items() if "value" in f}
+        result = self.update_many(EntityBatch.from_items(batch.items()))
+        untouched = [uuid for uuid in changes if uuid not in batch]
+        if untouched:
+            found = self.lookup_many(untouched)
+            for uuid in untouched:
+                if uuid in found:
+                    result.applied.append(uuid)
+                else:
+                    result.failed[uuid] = KeyError(uuid)
+
+        return result
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows skipping missing keys."""
+        batch = dict.fromkeys(uuids)
+        missing = batch.keys() - self._data.keys()
+        for uuid in missing:
+            del batch[uuid]
+
+        for uuid in batch:
+            batch[uuid] = self._data.pop(uuid)
+
+        self._keys_removed(batch.keys())
+        if self._indexes:
+            self._values_changed(batch.items(), ())
+        return BulkWriteResult(
+            applied=list(batch), failed={uuid: KeyError(uuid) for uuid in missing}
+        )
+
+
+class ConcurrentDictRepositoryAdapter(DictRepositoryAdapter):  # dead: disable
+    """Thread-safe dictionary variables repository adapter.
+
+    Writers lock only the stripe that owns the key, chosen by key hash, so writes to
+    different stripes run in parallel. Single key reads never lock, they are one atomic
+    dict access; scans iterate over a dict copy taken without locking, so writers
+    never wait for them. The copy sees every row as of some single write, but may
+    hold part of a multi-stripe batch that was being applied meanwhile.
+    """
+
+    def __init__(
+        self,
+        data: t.Optional[t.Dict[str, t.Any]] = None,
+        stripes: int = 16,
+        indexes: t.Optional[t.Mapping[str, BaseValueIndex]] = None,
+    ):
+        """Class constructor."""
+        if stripes <= 0:
+            raise ValueError("stripes must be positive")
+
+        super().__init__(data, indexes)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._index_lock = threading.Lock()
+
+    def _keys_added(self, keys: t.Collection[str]) -> None:
+        with self._index_lock:
+            super()._keys_added(keys)
+
+    def _keys_removed(self, keys: t.Collection[str]) -> None:
+        with self._index_lock:
+            super()._keys_removed(keys)
+
+    def _values_changed(
+        self,
+        removed: t.Iterable[t.Tuple[str, t.Any]],
+        added: t.Iterable[t.Tuple[str, t.Any]],
+    ) -> None:
+        with self._index_lock:
+            super()._values_changed(removed, added)
+
+    def _index_search(
+        self, index: str, search: t.Callable[[BaseValueIndex], t.List[str]]
+    ) -> t.List[KeyValueEntity]:
+        with self._index_lock:
+            uuids = search(self._indexes[index])
+        found = self.lookup_many(uuids)
+        return [found[k] for k in uuids if k in found]
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve rows in key order seeking to the cursor in the sorted key index."""
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        last = None if after is None else decode_cursor(after)
+        with self._index_lock:
+            keys = self._key_index().after(last, limit + 1)
+
+        found = self.lookup_many(keys)
+        return paginated([found[k] for k in keys if k in found], limit)
+
+    def _key_index(self) -> SortedKeyIndex:
+        if self._keys is None:
+            self._keys = SortedKeyIndex(self._data.copy())
+
+        return self._keys
+
+    def _range_rows(
+        self, start: t.Optional[str], stop: t.Optional[str], limit: t.Optional[int]
+    ) -> t.List[t.Tuple[str, t.Any]]:
+        with self._index_lock:
+            keys = self._key_index().range(start, stop, limit)
+
+        rows = []
+        for k in keys:
+            v = self._data.get(k, _MISSING)
+            if v is not _MISSING:
+                rows.append((k, v))
+
+        return rows
+
+    def _rows(self) -> t.Iterable[t.Tuple[str, t.Any]]:
+        # dict.copy() runs without releasing the GIL, so no write lands midway.
+        return self._data.copy().items()
+
+    def _stripe(self, uuid: str) -> threading.Lock:
+        return self._locks[hash(uuid) % len(self._locks)]
+
+    @contextlib.contextmanager
+    def _stripes(self, uuids: t.Iterable[str]) -> t.Iterator[None]:
+        stripes = len(self._locks)
+        locks = [self._locks[i] for i in sorted({hash(k) % stripes for k in uuids})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve dict element if exists."""
+        val = self._data.get(uuid, _MISSING)
+
+        return None if val is _MISSING else KeyValueEntity.loaded(uuid=uuid, val=val)
+
+    def lookup_many(  # type: ignore[override]
+        self, uuids: t.Iterable[str]
+    ) -> t.Dict[str, KeyValueEntity]:
+        """Retrieve existing dict elements for all requested keys."""
+        found = {}
+        for uuid in uuids:
+            val = self._data.get(uuid, _MISSING)
+            if val is not _MISSING:
+                found[uuid] = KeyValueEntity.loaded(uuid=uuid, val=val)
+
+        return found
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream dict data from a snapshot taken without blocking writers."""
+        return (
+            KeyValueEntity.loaded(uuid=k, val=v)
+            for k, v in paginate(self._rows(), limit, offset)
+        )
+
+    def insert(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Insert row into table."""
+        with self._stripe(entity.uuid):
+            return super().insert(entity)
+
+    def update(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Update row in table."""
+        with self._stripe(entity.uuid):
+            return super().update(entity)
+
+    def delete(self, uuid: str) -> bool:  # dead: disable
+        """Delete row from table that satisfy the condition where uuid equal value."""
+        with self._stripe(uuid):
+            return super().delete(uuid)
+
+    def insert_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Insert rows holding the stripes of all keys in the batch."""
+        batch = EntityBatch.from_entities(entities)
+        with self._stripes(batch.uuids):
+            return super().insert_many(batch)
+
+    def update_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Update rows holding the stripes of all keys in the batch."""
+        batch = EntityBatch.from_entities(entities)
+        with self._stripes(batch.uuids):
+            return super().update_many(batch)
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows holding the stripes of all keys in the batch."""
+        uuids = list(uuids)
+        with self._stripes(uuids):
+            return super().delete_many(uuids)
+
+
+_TRUE = frozenset(["true", "yes", "on"])
+_FALSE = frozenset(["false", "no", "off"])
+_NUMBER = re.compile(r"[+-]?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)?")
+
+
+def parse_env_value(text: str) -> t.Any:
+    """Convert environment variable text to bool, int or float, else keep it.
+
+    Only plain decimal numbers are converted, so values such as "007", "1_000" or
+    "nan" are kept as text.
+    """
+    lowered = text.strip().lower()
+    if lowered in _TRUE:
         return True
+    if lowered in _FALSE:
+        return False
+    match = _NUMBER.fullmatch(text)
+    if match is None:
+        return text
+
+    return float(text) if match.group(2) or match.group(3) else int(text)
+
 
+def _environ_fingerprint() -> int:
+    """Return hash of os.environ contents that changes whenever a variable does."""
+    environ = os.environ
+    return hash((len(environ), tuple(environ.items())))
 
-class EnvironRepository(BaseViewRepository):  # dead: disable
-    """Environment variables read only repository."""
 
-    def get_one(self, uuid: str) -> t.Optional[KeyValueEntity]:  # dead: disable
+class _EnvironSnapshot:
+    """Copy of os.environ with indexes and views derived from it."""
+
+    __slots__ = ["fingerprint", "environ", "keys", "views"]
+
+    def __init__(self, fingerprint: int):
+        self.fingerprint = fingerprint
+        self.environ = dict(os.environ)
+        self.keys: t.Optional[SortedKeyIndex] = None
+        self.views: t.Dict[str, "EnvironView"] = {}
+
+
+class EnvironView(BaseViewRepository, BaseKeyLookup):
+    """Frozen typed view of environment variables sharing a name prefix.
+
+    Values are converted once on creation and keyed by name without the prefix.
+    Variables without a converter in types are passed to convert, which keeps them
+    as text unless given, e.g. parse_env_value.
+    """
+
+    def __init__(
+        self,
+        environ: t.Mapping[str, str],
+        prefix: str,
+        types: t.Optional[t.Mapping[str, t.Callable[[str], t.Any]]] = None,
+        convert: t.Callable[[str], t.Any] = str,
+    ):
+        """Class constructor."""
+        super().__init__()
+        types = types or {}
+        size = len(prefix)
+        values = {}
+        for name, text in environ.items():
+            if name.startswith(prefix):
+                key = name[size:]
+                values[key] = types.get(key, convert)(text)
+
+        self._prefix = prefix
+        self._values: t.Mapping[str, t.Any] = MappingProxyType(values)
+
+    @property
+    def prefix(self) -> str:  # dead: disable
+        """Property variable name prefix getter."""
+        return self._prefix
+
+    @property
+    def values(self) -> t.Mapping[str, t.Any]:
+        """Property read only mapping of converted values getter."""
+        return self._values
+
+    def __getitem__(self, key: str) -> t.Any:
+        """Return converted value of variable named prefix + key."""
+        return self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if variable named prefix + key is set."""
+        return key in self._values
+
+    def __len__(self) -> int:
+        """Return number of variables in view."""
+        return len(self._values)
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve converted variable by name without prefix."""
+        val = self._values.get(uuid, _MISSING)
+
+        return None if val is _MISSING else KeyValueEntity.loaded(uuid=uuid, val=val)
+
+    def get_all(  # type: ignore[override]
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve all converted variables."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream converted variables."""
+        for k, v in paginate(self._values.items(), limit=limit, offset=offset):
+            yield KeyValueEntity.loaded(uuid=k, val=v)
+
+
+class EnvironRepository(BaseViewRepository, BaseKeyLookup):  # dead: disable
+    """Environment variables read only repository.
+
+    Scans are served from a snapshot of os.environ that is taken again only after
+    os.environ changed. Changes are detected from a fingerprint of the variables,
+    which is cheaper than rebuilding the entities, name index and views each scan.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        super().__init__()
+        self._snapshot = _EnvironSnapshot(_environ_fingerprint())
+
+    def _current(self) -> _EnvironSnapshot:
+        snapshot = self._snapshot
+        fingerprint = _environ_fingerprint()
+        if fingerprint != snapshot.fingerprint:
+            snapshot = self._snapshot = _EnvironSnapshot(fingerprint)
+
+        return snapshot
+
+    def _environ(self) -> t.Dict[str, str]:
+        return self._current().environ
+
+    def view(
+        self,
+        prefix: str,
+        types: t.Optional[t.Mapping[str, t.Callable[[str], t.Any]]] = None,
+        convert: t.Optional[t.Callable[[str], t.Any]] = None,
+    ) -> EnvironView:
+        """Return typed view of variables named prefix + key, reused until changes."""
+        snapshot = self._current()
+        if types is not None or convert is not None:
+            return EnvironView(snapshot.environ, prefix, types, convert or str)
+        if prefix not in snapshot.views:
+            snapshot.views[prefix] = EnvironView(snapshot.environ, prefix)
+
+        return snapshot.views[prefix]
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
         """Retrieve environment variable by name."""
         if sys.platform == "win32":
             uuid = uuid.upper()  # pragma: no cover
         val = os.getenv(uuid)
 
-        return None if val is None else KeyValueEntity(uuid=uuid, val=val)
+        return None if val is None else KeyValueEntity.loaded(uuid=uuid, val=val)
 
     def get_all(  # type: ignore[override]
         self,
@@ -96,5 +681,293 @@ def get_all(  # type: ignore[override]
         offset: t.Optional[int] = None,
     ) -> t.List[KeyValueEntity]:
         """Retrieve all environment variables."""
-        items = dict(os.environ).items()
-        return [KeyValueEntity(uuid=k, val=v) for k, v in items]
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream environment variables building entities only for the requested page."""
+        for k, v in paginate(self._environ().items(), limit=limit, offset=offset):
+            yield KeyValueEntity.loaded(uuid=k, val=v)
+
+    def get_range(  # type: ignore[override]
+        self,
+        start: t.Optional[str] = None,
+        stop: t.Optional[str] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve environment variables in name range from a sorted name index."""
+        snapshot = self._current()
+        if snapshot.keys is None:
+            snapshot.keys = SortedKeyIndex(snapshot.environ)
+        keys = snapshot.keys.range(start, stop, limit)
+
+        return [KeyValueEntity.loaded(uuid=k, val=snapshot.environ[k]) for k in keys]
+
+    def find(self, query: Query) -> t.Iterator[KeyValueEntity]:
+        """Stream environment variables selected by query."""
+        for k, v in query.run(self._environ().items(), key=_first, value=_second):
+            yield KeyValueEntity.loaded(uuid=k, val=query.project(v))
+
+
+class SQLiteRepositoryAdapter(BaseRepository, BaseKeyLookup):  # dead: disable
+    """SQLite database key-value repository adapter.
+
+    Each thread gets its own pooled connection, statements are reused through the
+    connection statement cache and file databases are switched to WAL journal mode so
+    readers do not block the writer. Values are pickled by default. An in-memory
+    database is private to one connection, so use a file path to share data between
+    threads.
+    """
+
+    _CHUNK_SIZE = 500
+
+    def __init__(
+        self,
+        database: str,
+        table: str = "entities",
+        dumps: t.Callable[[t.Any], bytes] = pickle.dumps,
+        loads: t.Callable[[bytes], t.Any] = pickle.loads,
+        cached_statements: int = 128,
+    ):
+        """Class constructor."""
+        if not table.isidentifier():
+            raise ValueError("Invalid table name: %r" % table)
+
+        super().__init__()
+        self._database = database
+        self._dumps = dumps
+        self._loads = loads
+        self._cached_statements = cached_statements
+        self._table = table
+        self._local = threading.local()
+        self._connections: t.List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        self._sql_select_one = "SELECT value FROM %s WHERE uuid = ?" % table
+        self._sql_select_in = "SELECT uuid, value FROM %s WHERE uuid IN (%%s)" % table
+        self._sql_select_all = (
+            "SELECT uuid, value FROM %s ORDER BY uuid LIMIT ? OFFSET ?" % table
+        )
+        self._sql_select_page = (
+            "SELECT uuid, value FROM %s WHERE uuid > ? ORDER BY uuid LIMIT ?" % table
+        )
+        self._sql_insert = "INSERT INTO %s (uuid, value) VALUES (?, ?)" % table
+        self._sql_update = "UPDATE %s SET value = ? WHERE uuid = ?" % table
+        self._sql_delete = "DELETE FROM %s WHERE uuid = ?" % table
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS %s "
+                "(uuid TEXT PRIMARY KEY, value BLOB) WITHOUT ROWID" % table
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn: t.Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._database,
+                check_same_thread=False,
+                cached_statements=self._cached_statements,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+
+        return conn
+
+    def close(self) -> None:
+        """Close connections opened by all threads."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _select_in(self, uuids: t.List[str]) -> t.Iterator[t.Tuple[str, bytes]]:
+        conn = self._connection()
+        full_chunk_sql = self._sql_select_in % ", ".join("?" * self._CHUNK_SIZE)
+        for start in range(0, len(uuids), self._CHUNK_SIZE):
+            stop = start + self._CHUNK_SIZE
+            chunk = uuids[start:stop]
+            if len(chunk) == self._CHUNK_SIZE:
+                sql = full_chunk_sql
+            else:
+                sql = self._sql_select_in % ", ".join("?" * len(chunk))
+            yield from conn.execute(sql, chunk)
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve row by primary key if exists."""
+        row = self._connection().execute(self._sql_select_one, (uuid,)).fetchone()
+
+        return None if row is None else KeyValueEntity.loaded(uuid, self._loads(row[0]))
+
+    def lookup_many(  # type: ignore[override]
+        self, uuids: t.Iterable[str]
+    ) -> t.Dict[str, KeyValueEntity]:
+        """Retrieve existing rows for all requested keys in chunked queries."""
+        rows = self._select_in(list(dict.fromkeys(uuids)))
+        return {k: KeyValueEntity.loaded(uuid=k, val=self._loads(v)) for k, v in rows}
+
+    def get_all(  # type: ignore[override]
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve rows ordered by key."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream rows ordered by key with pagination done by the database."""
+        params = (-1 if limit is None else limit, offset or 0)
+        for k, v in self._connection().execute(self._sql_select_all, params):
+            yield KeyValueEntity.loaded(uuid=k, val=self._loads(v))
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve rows in key order seeking to the cursor through the primary key."""
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        conn = self._connection()
+        if after is None:
+            rows = conn.execute(self._sql_select_all, (limit + 1, 0))
+        else:
+            rows = conn.execute(
+                self._sql_select_page, (decode_cursor(after), limit + 1)
+            )
+
+        return paginated(
+            [KeyValueEntity.loaded(k, self._loads(v)) for k, v in rows], limit
+        )
+
+    def find(self, query: Query) -> t.Iterator[KeyValueEntity]:
+        """Stream rows selected by query with key range and key order done in SQL."""
+        sql = "SELECT uuid, value FROM %s" % self._table
+        params: t.List[t.Any] = []
+        clauses = []
+        start, stop = query.key_range()
+        if start is not None:
+            clauses.append("uuid >= ?")
+            params.append(start)
+        if stop is not None:
+            clauses.append("uuid < ?")
+            params.append(stop)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        rest = query
+        if query.order_by is None or query.order_by is by_key:
+            descending = query.order_by is by_key and query.reverse
+            sql += " ORDER BY uuid DESC" if descending else " ORDER BY uuid"
+            if query.where is None and query.limit is not None:
+                sql += " LIMIT ?"
+                params.append(query.limit)
+            rest = Query(where=query.where, limit=query.limit)
+
+        rows = self._connection().execute(sql, params)
+        decoded = ((k, self._loads(v)) for k, v in rows)
+        for k, v in rest.run(decoded, key=_first, value=_second):
+            yield KeyValueEntity.loaded(uuid=k, val=query.project(v))
+
+    def insert(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Insert row into table."""
+        try:
+            with self._connection() as conn:
+                conn.execute(self._sql_insert, (entity.uuid, self._dumps(entity.value)))
+        except sqlite3.IntegrityError as e:
+            raise KeyError(entity.uuid) from e
+
+        return entity
+
+    def update(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Update row in table."""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                self._sql_update, (self._dumps(entity.value), entity.uuid)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(entity.uuid)
+
+        return entity
+
+    def delete(self, uuid: str) -> bool:  # dead: disable
+        """Delete row from table that satisfy the condition where uuid equal value."""
+        with self._connection() as conn:
+            cursor = conn.execute(self._sql_delete, (uuid,))
+
+        return cursor.rowcount > 0
+
+    def _existing(self, uuids: t.List[str]) -> t.Set[str]:
+        return {k for k, _ in self._select_in(uuids)}
+
+    @contextlib.contextmanager
+    def _write_transaction(self) -> t.Iterator[sqlite3.Connection]:
+        """Open transaction holding the write lock, so checked keys cannot change."""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    def _write_many(
+        self,
+        sql: str,
+        batch: t.List[str],
+        applies: t.Callable[[str, t.Set[str]], bool],
+        params: t.Callable[[str], t.Tuple[t.Any, ...]],
+    ) -> BulkWriteResult:
+        try:
+            with self._write_transaction() as conn:
+                existing = self._existing(batch)
+                applied = [k for k in batch if applies(k, existing)]
+                conn.executemany(sql, (params(k) for k in applied))
+        except sqlite3.IntegrityError as e:
+            return BulkWriteResult(failed={k: e for k in batch})
+
+        failed: t.Dict[str, Exception] = {
+            k: KeyError(k) for k in batch if not applies(k, existing)
+        }
+        return BulkWriteResult(applied=applied, failed=failed)
+
+    def insert_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Insert rows in one transaction skipping existing keys."""
+        batch = entity_items(entities)
+        return self._write_many(
+            self._sql_insert,
+            list(batch),
+            lambda k, existing: k not in existing,
+            lambda k: (k, self._dumps(batch[k])),
+        )
+
+    def update_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Update rows in one transaction skipping missing keys."""
+        batch = entity_items(entities)
+        return self._write_many(
+            self._sql_update,
+            list(batch),
+            lambda k, existing: k in existing,
+            lambda k: (self._dumps(batch[k]), k),
+        )
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows in one transaction skipping missing keys."""
+        return self._write_many(
+            self._sql_delete,
+            list(dict.fromkeys(uuids)),
+            lambda k, existing: k in existing,
+            lambda k: (k,),
+        )
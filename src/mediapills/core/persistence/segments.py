@@ -0,0 +1,428 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import mmap
+import os
+import pickle
+import struct
+import threading
+import typing as t
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.repositories import BaseKeyLookup
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.persistence.repositories import paginate
+
+"""This module implements append-only log-structured key-value storage."""
+
+_RECORD_PUT = 0
+_RECORD_TOMBSTONE = 1
+
+"""Record header: flag, key length and value length followed by key and value."""
+_RECORD_HEADER = struct.Struct("<BII")
+
+"""Hint file header: covered data file size and dead bytes within it."""
+_HINT_HEADER = struct.Struct("<QQ")
+
+"""Hint file entry: key length, value offset and value length followed by key."""
+_HINT_ENTRY = struct.Struct("<IQI")
+
+
+def _scan(
+    f: t.BinaryIO, start: int, size: int
+) -> t.Iterator[t.Tuple[int, str, int, int]]:
+    """Yield flag, key, value offset and value length of complete records."""
+    pos = start
+    while pos + _RECORD_HEADER.size <= size:
+        f.seek(pos)
+        flag, key_len, value_len = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+        value_offset = pos + _RECORD_HEADER.size + key_len
+        if value_offset + value_len > size:
+            return
+
+        yield flag, f.read(key_len).decode(), value_offset, value_len
+        pos = value_offset + value_len
+
+
+class LogStructuredRepositoryAdapter(BaseRepository, BaseKeyLookup):  # dead: disable
+    """Append-only segment file key-value repository adapter.
+
+    Every write is a sequential append to the segment file and an in-memory hash
+    index maps each key to the offset of its latest value, which is read back through
+    mmap without copying. Compaction rewrites live records into a fresh segment and
+    stores a hint file so a cold start restores the index without reading values.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dumps: t.Callable[[t.Any], bytes] = pickle.dumps,
+        loads: t.Callable[[t.Any], t.Any] = pickle.loads,
+        sync: bool = False,
+        compact_ratio: t.Optional[float] = None,
+        compact_min_size: int = 1 << 20,
+    ):
+        """Class constructor."""
+        super().__init__()
+        self._path = path
+        self._hint_path = path + ".hint"
+        self._dumps = dumps
+        self._loads = loads
+        self._sync = sync
+        self._compact_ratio = compact_ratio
+        self._compact_min_size = compact_min_size
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._compactor: t.Optional[threading.Thread] = None
+        self._index: t.Dict[str, t.Tuple[int, int]] = {}
+        self._dead = 0
+        self._mmap: t.Optional[mmap.mmap] = None
+        self._mapped = 0
+        self._file = open(path, "a+b")
+        self._size = os.path.getsize(path)
+        self._load_index()
+
+    @property
+    def size(self) -> int:
+        """Property segment file size in bytes getter."""
+        return self._size
+
+    @property
+    def dead_bytes(self) -> int:
+        """Property bytes held by overwritten or deleted records getter."""
+        return self._dead
+
+    def _load_index(self) -> None:
+        start = self._load_hint()
+        end = start
+        with open(self._path, "rb") as f:
+            for flag, key, offset, length in _scan(f, start, self._size):
+                self._apply(flag, key, offset, length)
+                end = offset + length
+
+        if end < self._size:
+            self._file.truncate(end)
+            self._size = end
+
+    def _load_hint(self) -> int:
+        try:
+            with open(self._hint_path, "rb") as f:
+                hint = f.read()
+        except FileNotFoundError:
+            return 0
+
+        covered, dead = _HINT_HEADER.unpack_from(hint)
+        if covered > self._size:
+            return 0
+
+        pos = _HINT_HEADER.size
+        while pos < len(hint):
+            key_len, offset, length = _HINT_ENTRY.unpack_from(hint, pos)
+            start = pos + _HINT_ENTRY.size
+            pos = start + key_len
+            self._index[hint[start:pos].decode()] = (offset, length)
+
+        self._dead = dead
+        return t.cast(int, covered)
+
+    def _write_hint(self) -> None:
+        chunks = [_HINT_HEADER.pack(self._size, self._dead)]
+        for key, (offset, length) in self._index.items():
+            key_b = key.encode()
+            chunks.append(_HINT_ENTRY.pack(len(key_b), offset, length) + key_b)
+
+        tmp_path = self._hint_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(chunks))
+        os.replace(tmp_path, self._hint_path)
+
+    @staticmethod
+    def _record_size(key: str, length: int) -> int:
+        return _RECORD_HEADER.size + len(key.encode()) + length
+
+    def _apply(self, flag: int, key: str, offset: int, length: int) -> None:
+        if flag == _RECORD_TOMBSTONE:
+            old = self._index.pop(key, None)
+            self._dead += self._record_size(key, 0)
+        else:
+            old = self._index.get(key)
+            self._index[key] = (offset, length)
+
+        if old is not None:
+            self._dead += self._record_size(key, old[1])
+
+    def _append(self, records: t.List[t.Tuple[int, str, bytes]]) -> None:
+        buffer = bytearray()
+        offsets = []
+        for flag, key, value in records:
+            key_b = key.encode()
+            buffer += _RECORD_HEADER.pack(flag, len(key_b), len(value))
+            buffer += key_b
+            offsets.append(self._size + len(buffer))
+            buffer += value
+
+        self._file.write(buffer)
+        self._file.flush()
+        if self._sync:
+            os.fsync(self._file.fileno())
+        self._size += len(buffer)
+
+        for (flag, key, value), offset in zip(records, offsets):
+            self._apply(flag, key, offset, len(value))
+
+        self._maybe_compact()
+
+    def _read(self, offset: int, length: int) -> t.Any:
+        if self._mmap is None or offset + length > self._mapped:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped = len(self._mmap)
+
+        stop = offset + length
+        with memoryview(self._mmap) as view, view[offset:stop] as value:
+            return self._loads(value)
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve row by key reading its value straight from the mapped segment."""
+        with self._lock:
+            location = self._index.get(uuid)
+            if location is None:
+                return None
+
+            return KeyValueEntity.loaded(uuid=uuid, val=self._read(*location))
+
+    def get_all(  # type: ignore[override]
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve all live rows."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream live rows of a key snapshot reading values on demand.
+
+        Values are looked up by key, as compaction may move them after the snapshot.
+        """
+        with self._lock:
+            uuids = list(self._index)
+
+        for uuid in paginate(uuids, limit=limit, offset=offset):
+            entity = self.lookup(uuid)
+            if entity is not None:
+                yield entity
+
+    def insert(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Append row to segment if key does not exist."""
+        with self._lock:
+            if entity.uuid in self._index:
+                raise KeyError(entity.uuid)
+
+            self._append([(_RECORD_PUT, entity.uuid, self._dumps(entity.value))])
+
+        return entity
+
+    def update(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Append new row version to segment if key exists."""
+        with self._lock:
+            if entity.uuid not in self._index:
+                raise KeyError(entity.uuid)
+
+            self._append([(_RECORD_PUT, entity.uuid, self._dumps(entity.value))])
+
+        return entity
+
+    def delete(self, uuid: str) -> bool:  # dead: disable
+        """Append tombstone to segment if key exists."""
+        with self._lock:
+            if uuid not in self._index:
+                return False
+
+            self._append([(_RECORD_TOMBSTONE, uuid, b"")])
+
+        return True
+
+    def insert_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Append rows for new keys in one write."""
+        batch = {entity.uuid: entity.value for entity in entities}
+        with self._lock:
+            failed = batch.keys() & self._index.keys()
+            return self._append_batch(_RECORD_PUT, batch, failed)
+
+    def update_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Append new row versions for existing keys in one write."""
+        batch = {entity.uuid: entity.value for entity in entities}
+        with self._lock:
+            failed = batch.keys() - self._index.keys()
+            return self._append_batch(_RECORD_PUT, batch, failed)
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Append tombstones for existing keys in one write."""
+        batch = dict.fromkeys(uuids)
+        with self._lock:
+            failed = batch.keys() - self._index.keys()
+            return self._append_batch(_RECORD_TOMBSTONE, batch, failed)
+
+    def _append_batch(
+        self, flag: int, batch: t.Dict[str, t.Any], failed: t.Set[str]
+    ) -> BulkWriteResult:
+        applied = [k for k in batch if k not in failed]
+        if flag == _RECORD_TOMBSTONE:
+            records = [(flag, k, b"") for k in applied]
+        else:
+            records = [(flag, k, self._dumps(batch[k])) for k in applied]
+        if records:
+            self._append(records)
+
+        return BulkWriteResult(applied=applied, failed={k: KeyError(k) for k in failed})
+
+    def _maybe_compact(self) -> None:
+        if self._compact_ratio is None or self._size < self._compact_min_size:
+            return
+
+        if self._dead / self._size < self._compact_ratio:
+            return
+
+        if self._compactor is None or not self._compactor.is_alive():
+            self.compact(background=True)
+
+    def compact(self, background: bool = False) -> t.Optional[threading.Thread]:
+        """Rewrite live rows into a fresh segment, optionally in a background thread."""
+        if not background:
+            self._compact()
+            return None
+
+        thread = threading.Thread(target=self._compact, daemon=True)
+        self._compactor = thread
+        thread.start()
+        return thread
+
+    def _compact(self) -> None:
+        with self._compaction_lock:
+            with self._lock:
+                snapshot = dict(self._index)
+                covered = self._size
+
+            tmp_path = self._path + ".compact"
+            index: t.Dict[str, t.Tuple[int, int]] = {}
+            with open(self._path, "rb") as src, open(tmp_path, "wb") as dst:
+                pos = 0
+                for key, (offset, length) in snapshot.items():
+                    src.seek(offset)
+                    pos = self._copy(
+                        dst, pos, index, _RECORD_PUT, key, src.read(length)
+                    )
+
+            with self._lock:
+                with open(self._path, "rb") as src, open(tmp_path, "ab") as dst:
+                    pos, dead = self._replay(src, dst, covered, pos, index)
+                    dst.flush()
+                    if self._sync:
+                        os.fsync(dst.fileno())
+
+                self._swap(tmp_path, index, pos, dead)
+
+    def _replay(
+        self,
+        src: t.BinaryIO,
+        dst: t.BinaryIO,
+        start: int,
+        pos: int,
+        index: t.Dict[str, t.Tuple[int, int]],
+    ) -> t.Tuple[int, int]:
+        """Copy records appended while the snapshot was being compacted."""
+        dead = 0
+        for flag, key, offset, length in _scan(src, start, self._size):
+            src.seek(offset)
+            value = src.read(length)
+            old = index.pop(key, None)
+            if old is not None:
+                dead += self._record_size(key, old[1])
+            if flag == _RECORD_TOMBSTONE:
+                dead += self._record_size(key, 0)
+
+            pos = self._copy(dst, pos, index, flag, key, value)
+
+        return pos, dead
+
+    @staticmethod
+    def _copy(
+        dst: t.BinaryIO,
+        pos: int,
+        index: t.Dict[str, t.Tuple[int, int]],
+        flag: int,
+        key: str,
+        value: bytes,
+    ) -> int:
+        key_b = key.encode()
+        dst.write(_RECORD_HEADER.pack(flag, len(key_b), len(value)) + key_b + value)
+        offset = pos + _RECORD_HEADER.size + len(key_b)
+        if flag == _RECORD_PUT:
+            index[key] = (offset, len(value))
+
+        return offset + len(value)
+
+    def _swap(
+        self, tmp_path: str, index: t.Dict[str, t.Tuple[int, int]], size: int, dead: int
+    ) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._mapped = 0
+
+        self._file.close()
+        if os.path.exists(self._hint_path):
+            os.remove(self._hint_path)
+        os.replace(tmp_path, self._path)
+
+        self._file = open(self._path, "a+b")
+        self._index = index
+        self._size = size
+        self._dead = dead
+        self._write_hint()
+
+    def close(self) -> None:
+        """Wait for running compaction, store hint file and release the segment."""
+        if self._compactor is not None:
+            self._compactor.join()
+
+        with self._lock:
+            if self._file.closed:
+                return
+
+            self._write_hint()
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._file.close()
@@ -0,0 +1,232 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import bisect
+import hashlib
+import heapq
+import itertools
+import typing as t
+
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.domain.repositories import encode_cursor
+from mediapills.core.domain.repositories import Page
+from mediapills.core.persistence.repositories import paginate
+
+"""This module implements key partitioning across several repositories."""
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def _uuid_of(entity: BaseUniqueEntity) -> str:
+    return entity.uuid
+
+
+class ConsistentHashRing:
+    """Consistent hash ring mapping keys to node names through virtual nodes."""
+
+    def __init__(self, nodes: t.Iterable[str] = (), replicas: int = 64):
+        """Class constructor."""
+        if replicas <= 0:
+            raise ValueError("replicas must be positive")
+
+        self._replicas = replicas
+        self._points: t.List[int] = []
+        self._owners: t.List[str] = []
+        self._nodes: t.Set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> t.FrozenSet[str]:
+        """Property node names on the ring getter."""
+        return frozenset(self._nodes)
+
+    def add(self, node: str) -> None:
+        """Place node virtual points on the ring."""
+        if node in self._nodes:
+            raise KeyError(node)
+
+        self._nodes.add(node)
+        for replica in range(self._replicas):
+            point = _hash("%s#%d" % (node, replica))
+            i = bisect.bisect(self._points, point)
+            self._points.insert(i, point)
+            self._owners.insert(i, node)
+
+    def remove(self, node: str) -> None:
+        """Take node virtual points off the ring."""
+        self._nodes.remove(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def get(self, key: str) -> str:
+        """Return name of the node owning the key."""
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[i]
+
+
+class ShardedRepository(BaseRepository):  # dead: disable
+    """Repository partitioning keys across named shards with consistent hashing.
+
+    Scans visit shards in name order, so pagination over the merged stream is stable
+    while the set of shards does not change.
+    """
+
+    def __init__(self, shards: t.Mapping[str, BaseRepository], replicas: int = 64):
+        """Class constructor."""
+        super().__init__()
+        self._shards = dict(shards)
+        self._ring = ConsistentHashRing(self._shards, replicas=replicas)
+
+    @property
+    def shards(self) -> t.Dict[str, BaseRepository]:
+        """Property shards by name getter."""
+        return dict(self._shards)
+
+    def shard_for(self, uuid: str) -> BaseRepository:
+        """Return shard owning the key."""
+        return self._shards[self._ring.get(uuid)]
+
+    def _group(self, uuids: t.Iterable[str]) -> t.Dict[str, t.List[str]]:
+        groups: t.Dict[str, t.List[str]] = {}
+        for uuid in uuids:
+            groups.setdefault(self._ring.get(uuid), []).append(uuid)
+
+        return groups
+
+    def _group_entities(
+        self, entities: t.Iterable[BaseUniqueEntity]
+    ) -> t.Dict[str, t.List[BaseUniqueEntity]]:
+        groups: t.Dict[str, t.List[BaseUniqueEntity]] = {}
+        for entity in entities:
+            groups.setdefault(self._ring.get(entity.uuid), []).append(entity)
+
+        return groups
+
+    def add_shard(  # dead: disable
+        self, name: str, shard: BaseRepository
+    ) -> BulkWriteResult:
+        """Add shard to the ring and move over the keys it now owns.
+
+        Rows already present on the new shard are overwritten with the live value of
+        their previous owner; a row is deleted from the previous owner only once it
+        was written, rows that could not be moved are reported as failed.
+        """
+        self._ring.add(name)
+        self._shards[name] = shard
+        result = BulkWriteResult()
+        for other_name, other in self._shards.items():
+            if other_name == name:
+                continue
+
+            entities = {
+                e.uuid: e for e in other.iter_all() if self._ring.get(e.uuid) == name
+            }
+            inserted = shard.insert_many(entities.values())
+            updated = shard.update_many(entities[uuid] for uuid in inserted.failed)
+            moved = inserted.applied + updated.applied
+            other.delete_many(moved)
+            result.applied.extend(moved)
+            result.failed.update(updated.failed)
+
+        return result
+
+    def get_one(self, uuid: str) -> t.Optional[BaseUniqueEntity]:
+        """Retrieve row from the shard owning the key."""
+        return self.shard_for(uuid).get_one(uuid)
+
+    def get_many(self, uuids: t.Iterable[str]) -> t.Dict[str, BaseUniqueEntity]:
+        """Retrieve rows with one batch call per shard."""
+        found: t.Dict[str, BaseUniqueEntity] = {}
+        for name, group in self._group(uuids).items():
+            found.update(self._shards[name].get_many(group))
+
+        return found
+
+    def get_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.List[BaseUniqueEntity]:
+        """Retrieve rows of all shards."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.Iterator[BaseUniqueEntity]:
+        """Stream rows of all shards one shard after another."""
+        streams = (self._shards[name].iter_all() for name in sorted(self._shards))
+        return paginate(itertools.chain.from_iterable(streams), limit, offset)
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve rows in key order merging one page from every shard."""
+        pages = [
+            shard.get_page(after=after, limit=limit) for shard in self._shards.values()
+        ]
+        merged = heapq.merge(*(page.entities for page in pages), key=_uuid_of)
+        entities = list(itertools.islice(merged, limit))
+        more = len(entities) == limit and (
+            any(page.cursor for page in pages)
+            or sum(len(page.entities) for page in pages) > limit
+        )
+
+        return Page(entities, encode_cursor(entities[-1].uuid) if more else None)
+
+    def insert(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Insert row into the shard owning the key."""
+        return self.shard_for(entity.uuid).insert(entity)
+
+    def update(self, entity: BaseUniqueEntity) -> t.Optional[BaseUniqueEntity]:
+        """Update row in the shard owning the key."""
+        return self.shard_for(entity.uuid).update(entity)
+
+    def delete(self, uuid: str) -> bool:
+        """Delete row from the shard owning the key."""
+        return self.shard_for(uuid).delete(uuid)
+
+    def insert_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Insert rows with one batch call per shard."""
+        groups = self._group_entities(entities)
+        return self._merge(self._shards[n].insert_many(g) for n, g in groups.items())
+
+    def update_many(self, entities: t.Iterable[BaseUniqueEntity]) -> BulkWriteResult:
+        """Update rows with one batch call per shard."""
+        groups = self._group_entities(entities)
+        return self._merge(self._shards[n].update_many(g) for n, g in groups.items())
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows with one batch call per shard."""
+        groups = self._group(uuids)
+        return self._merge(self._shards[n].delete_many(g) for n, g in groups.items())
+
+    @staticmethod
+    def _merge(results: t.Iterable[BulkWriteResult]) -> BulkWriteResult:
+        merged = BulkWriteResult()
+        for result in results:
+            merged.applied.extend(result.applied)
+            merged.failed.update(result.failed)
+
+        return merged
@@ -0,0 +1,373 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import contextlib
+import multiprocessing
+import os
+import pickle
+import struct
+import sys
+import time
+import typing as t
+import zlib
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.repositories import BaseKeyLookup
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.persistence.repositories import paginate
+
+"""This module implements key-value storage shared between processes."""
+
+_MAGIC = b"MPSHMKV1"
+
+"""Segment header: magic, version, capacity, live rows, used slots, data size and data
+top."""
+_HEADER = struct.Struct("<8s6Q")
+_VERSION = struct.Struct("<Q")
+
+"""Hash table slot: state, hash, key offset, key length, value offset, value length."""
+_SLOT = struct.Struct("<6Q")
+
+_SLOT_EMPTY = 0
+_SLOT_LIVE = 1
+_SLOT_DELETED = 2
+
+"""Longest wait in seconds for a writer to finish before a read gives up."""
+_READ_TIMEOUT = 1.0
+_MAX_BACKOFF = 0.001
+
+_T = t.TypeVar("_T")
+
+
+def _tracker_fd() -> t.Optional[int]:
+    return getattr(resource_tracker._resource_tracker, "_fd", None)
+
+
+"""Resource tracker connection this process inherited from its parent, if any."""
+_inherited_tracker_fd = (
+    _tracker_fd() if multiprocessing.parent_process() is not None else None
+)
+
+
+def _after_fork_in_child() -> None:
+    global _inherited_tracker_fd
+    _inherited_tracker_fd = _tracker_fd()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class SharedMemoryRepositoryAdapter(BaseRepository, BaseKeyLookup):  # dead: disable
+    """Key-value repository adapter stored in one shared memory segment.
+
+    The segment holds a fixed-capacity open addressing hash table followed by an
+    append-only data region, so every process attached by name reads the same copy
+    without pickling through a proxy. Readers never lock: a version counter bumped
+    around every slot write lets them retry a torn read, backing off while a write is
+    in progress. Writers in several processes must share a lock: the creating process
+    makes one unless given, and processes attaching without it can only read. Space
+    of overwritten and deleted values is not reclaimed.
+    """
+
+    def __init__(
+        self,
+        name: t.Optional[str] = None,
+        create: bool = True,
+        capacity: int = 1024,
+        data_size: int = 1 << 20,
+        lock: t.Optional[t.ContextManager[t.Any]] = None,
+        dumps: t.Callable[[t.Any], bytes] = pickle.dumps,
+        loads: t.Callable[[t.Any], t.Any] = pickle.loads,
+    ):
+        """Class constructor, creating a new segment or attaching to a named one."""
+        super().__init__()
+        if lock is None and create:
+            lock = multiprocessing.Lock()
+        self._lock = lock
+        self._dumps = dumps
+        self._loads = loads
+
+        if create:
+            if capacity <= 1 or data_size <= 0:
+                raise ValueError("capacity must exceed 1 and data_size be positive")
+
+            table_size = _HEADER.size + capacity * _SLOT.size
+            self._shm = shared_memory.SharedMemory(
+                name=name, create=True, size=table_size + data_size
+            )
+            self._buf = t.cast(memoryview, self._shm.buf)
+            self._buf[:table_size] = bytes(table_size)
+            _HEADER.pack_into(self._buf, 0, _MAGIC, 0, capacity, 0, 0, data_size, 0)
+        else:
+            self._shm = self._attach(t.cast(str, name))
+            self._buf = t.cast(memoryview, self._shm.buf)
+            if self._buf[: len(_MAGIC)] != _MAGIC:
+                self._shm.close()
+                raise ValueError("Not a shared memory repository: %r" % name)
+
+        header = _HEADER.unpack_from(self._buf)
+        self._capacity: int = header[2]
+        self._data_size: int = header[5]
+        self._data_start: int = _HEADER.size + self._capacity * _SLOT.size
+
+    @staticmethod
+    def _attach(name: str) -> shared_memory.SharedMemory:
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(  # type: ignore[call-arg,unused-ignore]
+                name=name, track=False
+            )
+
+        shm = shared_memory.SharedMemory(name=name)
+        # Only the creating process owns the segment, so attaching must not let a
+        # tracker of our own unlink it. Children sharing the creator's tracker keep
+        # the registration, removing it would drop the creator's own.
+        fd = _tracker_fd()
+        if fd is None or fd != _inherited_tracker_fd:
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+        return shm
+
+    @property
+    def name(self) -> str:
+        """Property shared memory segment name getter."""
+        return self._shm.name
+
+    @property
+    def lock(self) -> t.Optional[t.ContextManager[t.Any]]:  # dead: disable
+        """Property lock writers share, to be passed to attaching processes getter."""
+        return self._lock
+
+    def __len__(self) -> int:
+        """Return number of live rows."""
+        return t.cast(int, _HEADER.unpack_from(self._buf)[3])
+
+    def close(self) -> None:
+        """Detach this process from the segment."""
+        self._shm.close()
+
+    def unlink(self) -> None:  # dead: disable
+        """Destroy the segment once every process has detached."""
+        self._shm.unlink()
+
+    def _view(self, offset: int, length: int) -> memoryview:
+        stop = offset + length
+        return self._buf[offset:stop]
+
+    def _slot(self, index: int) -> t.Tuple[int, ...]:
+        return _SLOT.unpack_from(self._buf, _HEADER.size + index * _SLOT.size)
+
+    def _version(self) -> int:
+        return t.cast(int, _VERSION.unpack_from(self._buf, len(_MAGIC))[0])
+
+    @contextlib.contextmanager
+    def _writing(self) -> t.Iterator[t.List[int]]:
+        """Yield header fields and store them with the slot as one versioned write."""
+        version = self._version()
+        _VERSION.pack_into(self._buf, len(_MAGIC), version + 1)
+        header = list(_HEADER.unpack_from(self._buf))
+        try:
+            yield header
+        finally:
+            header[1] = version + 2
+            _HEADER.pack_into(self._buf, 0, *header)
+
+    def _probe(self, key: bytes) -> t.Tuple[int, t.Optional[t.Tuple[int, ...]]]:
+        """Return index and slot holding key, or index of a free slot and None."""
+        hashed = zlib.crc32(key)
+        free = -1
+        index = hashed % self._capacity
+        while True:
+            slot = self._slot(index)
+            if slot[0] == _SLOT_EMPTY:
+                return (index if free < 0 else free), None
+            if slot[0] == _SLOT_DELETED:
+                free = index if free < 0 else free
+            elif slot[1] == hashed and slot[3] == len(key):
+                with self._view(slot[2], slot[3]) as stored:
+                    if stored == key:
+                        return index, slot
+
+            index = (index + 1) % self._capacity
+
+    def _consistent(self, read: t.Callable[[], _T]) -> _T:
+        """Return result of read that no write overlapped, retrying with backoff."""
+        deadline = None
+        delay = 0.0
+        while True:
+            version = self._version()
+            if not version % 2:
+                result = read()
+                if self._version() == version:
+                    return result
+
+            if deadline is None:
+                deadline = time.monotonic() + _READ_TIMEOUT
+            elif time.monotonic() > deadline:
+                raise TimeoutError("Shared memory write did not finish in time")
+            time.sleep(delay)
+            delay = min(delay * 2 or 1e-6, _MAX_BACKOFF)
+
+    def _find(self, key: bytes) -> t.Optional[t.Tuple[int, ...]]:
+        return self._consistent(lambda: self._probe(key)[1])
+
+    def get_buffer(self, uuid: str) -> t.Optional[memoryview]:  # dead: disable
+        """Return zero-copy view of the stored value bytes.
+
+        Release the view before closing the repository.
+        """
+        slot = self._find(uuid.encode())
+
+        return None if slot is None else self._view(slot[4], slot[5])
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve row decoding its value straight from shared memory."""
+        view = self.get_buffer(uuid)
+        if view is None:
+            return None
+
+        with view:
+            return KeyValueEntity.loaded(uuid=uuid, val=self._loads(view))
+
+    def get_all(  # type: ignore[override]
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve all live rows."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream live rows in slot order."""
+        for uuid in paginate(self._iter_keys(), limit=limit, offset=offset):
+            entity = self.lookup(uuid)
+            if entity is not None:
+                yield entity
+
+    def _live_key(self, index: int) -> t.Optional[bytes]:
+        slot = self._slot(index)
+        if slot[0] != _SLOT_LIVE:
+            return None
+
+        with self._view(slot[2], slot[3]) as key:
+            return bytes(key)
+
+    def _iter_keys(self) -> t.Iterator[str]:
+        for index in range(self._capacity):
+            key = self._consistent(lambda: self._live_key(index))
+            if key is not None:
+                yield str(key, "utf-8")
+
+    @contextlib.contextmanager
+    def _locked(self) -> t.Iterator[None]:
+        if self._lock is None:
+            raise RuntimeError("Attached without the writers lock, rows are read only")
+
+        with self._lock:
+            yield
+
+    def _store(self, data: bytes, header: t.List[int]) -> int:
+        top: int = header[6]
+        if top + len(data) > self._data_size:
+            raise MemoryError("Shared memory data region is full")
+
+        offset = self._data_start + top
+        with self._view(offset, len(data)) as view:
+            view[:] = data
+        header[6] = top + len(data)
+        return offset
+
+    def insert(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Insert row into the shared hash table."""
+        key = entity.uuid.encode()
+        value = self._dumps(entity.value)
+        with self._locked():
+            index, slot = self._probe(key)
+            if slot is not None:
+                raise KeyError(entity.uuid)
+
+            reused = self._slot(index)[0] == _SLOT_DELETED
+            with self._writing() as header:
+                if not reused and header[4] + 1 >= self._capacity:
+                    raise MemoryError("Shared memory hash table is full")
+
+                offset = self._store(key + value, header)
+                _SLOT.pack_into(
+                    self._buf,
+                    _HEADER.size + index * _SLOT.size,
+                    _SLOT_LIVE,
+                    zlib.crc32(key),
+                    offset,
+                    len(key),
+                    offset + len(key),
+                    len(value),
+                )
+                header[3] += 1
+                header[4] += 0 if reused else 1
+
+        return entity
+
+    def update(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Replace row value, appending the new value to the data region."""
+        key = entity.uuid.encode()
+        value = self._dumps(entity.value)
+        with self._locked():
+            index, slot = self._probe(key)
+            if slot is None:
+                raise KeyError(entity.uuid)
+
+            with self._writing() as header:
+                offset = self._store(value, header)
+                _SLOT.pack_into(
+                    self._buf,
+                    _HEADER.size + index * _SLOT.size,
+                    *slot[:4],
+                    offset,
+                    len(value),
+                )
+
+        return entity
+
+    def delete(self, uuid: str) -> bool:  # dead: disable
+        """Mark row slot as deleted."""
+        with self._locked():
+            index, slot = self._probe(uuid.encode())
+            if slot is None:
+                return False
+
+            with self._writing() as header:
+                _SLOT.pack_into(
+                    self._buf,
+                    _HEADER.size + index * _SLOT.size,
+                    _SLOT_DELETED,
+                    *slot[1:],
+                )
+                header[3] -= 1
+
+        return True
@@ -0,0 +1,280 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import bisect
+import mmap
+import os
+import pickle
+import struct
+import typing as t
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.repositories import BaseKeyLookup
+from mediapills.core.domain.repositories import BaseViewRepository
+from mediapills.core.domain.repositories import decode_cursor
+from mediapills.core.domain.repositories import Page
+from mediapills.core.domain.repositories import paginated
+
+"""This module implements binary repository snapshots loaded lazily through mmap.
+
+A snapshot is a header, one record per row, the row keys and a key sorted index:
+
+    header  magic, row count, index offset                  <8sQQ
+    record  kind, payload length, payload                   <BQ
+    index   key offset, key length, record offset per row   <QQQ
+
+Raw bytes values are stored as they are. Other values are pickled with protocol 5:
+the payload holds the out-of-band buffer count and pickle length, the buffer lengths,
+the pickle stream and then the buffers, so large buffers are never copied into it.
+"""
+
+_MAGIC = b"MPSNAP01"
+_HEADER = struct.Struct("<8sQQ")
+_RECORD = struct.Struct("<BQ")
+_PICKLE = struct.Struct("<IQ")
+_LENGTH = struct.Struct("<Q")
+_ENTRY = struct.Struct("<QQQ")
+
+_RAW = 0
+_PICKLED = 1
+
+
+def _write_value(file: t.BinaryIO, value: t.Any) -> None:
+    if isinstance(value, bytes):
+        file.write(_RECORD.pack(_RAW, len(value)))
+        file.write(value)
+        return
+
+    buffers: t.List[pickle.PickleBuffer] = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    lengths = [raw.nbytes for raw in raws]
+    size = _PICKLE.size + _LENGTH.size * len(raws) + len(data) + sum(lengths)
+    file.write(_RECORD.pack(_PICKLED, size))
+    file.write(_PICKLE.pack(len(raws), len(data)))
+    for length in lengths:
+        file.write(_LENGTH.pack(length))
+    file.write(data)
+    for raw in raws:
+        file.write(raw)
+
+
+def dump(repository: BaseViewRepository, path: str) -> int:  # dead: disable
+    """Write all repository rows to a snapshot file returning the row count.
+
+    The file is written next to path and renamed over it once complete.
+    """
+    entries: t.List[t.Tuple[bytes, int]] = []
+    partial = path + ".partial"
+    with open(partial, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, 0, 0))
+        for entity in repository.iter_all():
+            entries.append((entity.uuid.encode(), file.tell()))
+            _write_value(file, getattr(entity, "value", entity))
+
+        entries.sort()
+        key_offsets = []
+        for key, _ in entries:
+            key_offsets.append(file.tell())
+            file.write(key)
+
+        index_offset = file.tell()
+        for (key, record_offset), key_offset in zip(entries, key_offsets):
+            file.write(_ENTRY.pack(key_offset, len(key), record_offset))
+
+        file.seek(0)
+        file.write(_HEADER.pack(_MAGIC, len(entries), index_offset))
+
+    os.replace(partial, path)
+    return len(entries)
+
+
+class _Keys(t.Sequence[bytes]):
+    """Sorted snapshot keys read from the index on access."""
+
+    def __init__(self, view: memoryview, count: int, index_offset: int):
+        self._view = view
+        self._count = count
+        self._index_offset = index_offset
+
+    def __len__(self) -> int:
+        return self._count
+
+    @t.overload
+    def __getitem__(self, i: int) -> bytes: ...
+
+    @t.overload
+    def __getitem__(self, i: slice) -> t.Sequence[bytes]: ...
+
+    def __getitem__(self, i: t.Union[int, slice]) -> t.Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+
+        key_offset, key_length, _ = self.entry(i)
+        stop = key_offset + key_length
+        return bytes(self._view[key_offset:stop])
+
+    def entry(self, i: int) -> t.Tuple[int, int, int]:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+
+        return t.cast(
+            t.Tuple[int, int, int],
+            _ENTRY.unpack_from(self._view, self._index_offset + i * _ENTRY.size),
+        )
+
+
+class SnapshotRepository(BaseViewRepository, BaseKeyLookup):  # dead: disable
+    """Read only repository over a snapshot file mapped into memory.
+
+    Opening reads only the header. Lookups binary search the key index and decode
+    just the requested values, so pages are loaded on demand by the OS.
+    """
+
+    def __init__(self, path: str):
+        """Class constructor."""
+        super().__init__()
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, count, index_offset = _HEADER.unpack_from(self._view)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a repository snapshot")
+
+        self._index_offset = index_offset
+        self._keys = _Keys(self._view, count, index_offset)
+
+    def __len__(self) -> int:
+        """Return number of rows."""
+        return len(self._keys)
+
+    def close(self) -> None:
+        """Unmap the snapshot; buffers from get_buffer must be released first."""
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def _find(self, uuid: str) -> t.Optional[int]:
+        key = uuid.encode()
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+
+        return None
+
+    def _record(self, record_offset: int) -> t.Tuple[int, int, int]:
+        kind, length = _RECORD.unpack_from(self._view, record_offset)
+        return kind, record_offset + _RECORD.size, length
+
+    def _load(self, record_offset: int) -> t.Any:
+        kind, offset, length = self._record(record_offset)
+        stop = offset + length
+        if kind == _RAW:
+            return bytes(self._view[offset:stop])
+
+        count, size = _PICKLE.unpack_from(self._view, offset)
+        offset += _PICKLE.size
+        lengths = [
+            _LENGTH.unpack_from(self._view, offset + j * _LENGTH.size)[0]
+            for j in range(count)
+        ]
+        offset += _LENGTH.size * count
+        data_stop = offset + size
+        buffers = []
+        buffer_stop = data_stop
+        for buffer_length in lengths:
+            start, buffer_stop = buffer_stop, buffer_stop + buffer_length
+            buffers.append(self._view[start:buffer_stop])
+
+        with self._view[offset:data_stop] as data:
+            return pickle.loads(data, buffers=buffers)
+
+    def get_buffer(self, uuid: str) -> t.Optional[memoryview]:  # dead: disable
+        """Return zero-copy view of a raw bytes value, None for missing or pickled.
+
+        Release the view before closing the repository.
+        """
+        i = self._find(uuid)
+        if i is None:
+            return None
+
+        kind, offset, length = self._record(self._keys.entry(i)[2])
+        stop = offset + length
+        return self._view[offset:stop] if kind == _RAW else None
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve row decoding only its value."""
+        i = self._find(uuid)
+        if i is None:
+            return None
+
+        return KeyValueEntity.loaded(uuid=uuid, val=self._load(self._keys.entry(i)[2]))
+
+    def get_all(  # type: ignore[override]
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve all rows in key order."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def _items(self, start: int, stop: int) -> t.Iterator[t.Tuple[str, t.Any]]:
+        view = self._view
+        index_start = self._index_offset + start * _ENTRY.size
+        index_stop = self._index_offset + stop * _ENTRY.size
+        with view[index_start:index_stop] as index:
+            for key_offset, key_length, record_offset in _ENTRY.iter_unpack(index):
+                key_stop = key_offset + key_length
+                yield str(view[key_offset:key_stop], "utf-8"), self._load(record_offset)
+
+    def _rows(self, start: int, stop: int) -> t.Iterator[KeyValueEntity]:
+        for k, v in self._items(start, stop):
+            yield KeyValueEntity.loaded(uuid=k, val=v)
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream rows in key order decoding values one at a time."""
+        start = offset or 0
+        stop = len(self._keys) if limit is None else min(start + limit, len(self._keys))
+        return self._rows(min(start, stop), stop)
+
+    def get_page(self, after: t.Optional[str] = None, limit: int = 100) -> Page:
+        """Retrieve rows in key order seeking to the cursor in the key index."""
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(self._keys, decode_cursor(after).encode())
+        stop = min(start + limit + 1, len(self._keys))
+        return paginated(list(self._rows(start, stop)), limit)
+
+    def to_dict(self) -> t.Dict[str, t.Any]:  # dead: disable
+        """Decode all rows, e.g. to warm start a DictRepositoryAdapter."""
+        return dict(self._items(0, len(self)))
+
+
+def load(path: str) -> SnapshotRepository:  # dead: disable
+    """Open snapshot file written by dump."""
+    return SnapshotRepository(path)
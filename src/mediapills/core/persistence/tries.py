@@ -0,0 +1,394 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import contextlib
+import operator
+import threading
+import typing as t
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.queries import Query
+from mediapills.core.domain.repositories import BaseKeyLookup
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BaseViewRepository
+from mediapills.core.domain.repositories import BulkWriteResult
+from mediapills.core.persistence.repositories import entity_items
+from mediapills.core.persistence.repositories import paginate
+
+"""This module implements a persistent hash array mapped trie and its repositories."""
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_HASH_BITS = 64
+_MISSING = object()
+
+_first = operator.itemgetter(0)
+_second = operator.itemgetter(1)
+
+
+def _hash(key: str) -> int:
+    return hash(key) & ((1 << _HASH_BITS) - 1)
+
+
+class _Leaf:
+    __slots__ = ["hash", "key", "value"]
+
+    def __init__(self, h: int, key: str, value: t.Any):
+        self.hash = h
+        self.key = key
+        self.value = value
+
+
+class _Collision:
+    __slots__ = ["hash", "leaves"]
+
+    def __init__(self, h: int, leaves: t.Tuple[_Leaf, ...]):
+        self.hash = h
+        self.leaves = leaves
+
+
+class _Node:
+    __slots__ = ["bitmap", "entries"]
+
+    def __init__(self, bitmap: int, entries: t.Tuple[t.Any, ...]):
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+def _slot(h: int, shift: int) -> int:
+    return 1 << ((h >> shift) & (_WIDTH - 1))
+
+
+def _join(a: t.Any, b: _Leaf, shift: int) -> t.Any:
+    if a.hash == b.hash:
+        leaves = a.leaves if isinstance(a, _Collision) else (a,)
+        return _Collision(a.hash, leaves + (b,))
+
+    bit_a, bit_b = _slot(a.hash, shift), _slot(b.hash, shift)
+    if bit_a == bit_b:
+        return _Node(bit_a, (_join(a, b, shift + _BITS),))
+
+    return _Node(bit_a | bit_b, (a, b) if bit_a < bit_b else (b, a))
+
+
+def _get(node: t.Any, h: int, key: str) -> t.Any:
+    shift = 0
+    while isinstance(node, _Node):
+        bit = _slot(h, shift)
+        if not node.bitmap & bit:
+            return _MISSING
+        node = node.entries[bin(node.bitmap & (bit - 1)).count("1")]
+        shift += _BITS
+
+    if isinstance(node, _Collision):
+        for leaf in node.leaves:
+            if leaf.key == key:
+                return leaf.value
+        return _MISSING
+
+    return node.value if node.hash == h and node.key == key else _MISSING
+
+
+def _set(node: t.Any, leaf: _Leaf, shift: int) -> t.Tuple[t.Any, bool]:
+    if isinstance(node, _Node):
+        bit = _slot(leaf.hash, shift)
+        idx = bin(node.bitmap & (bit - 1)).count("1")
+        entries = node.entries
+        if not node.bitmap & bit:
+            entries = entries[:idx] + (leaf,) + entries[idx:]
+            return _Node(node.bitmap | bit, entries), True
+
+        rest = idx + 1
+        child, added = _set(entries[idx], leaf, shift + _BITS)
+        return _Node(node.bitmap, entries[:idx] + (child,) + entries[rest:]), added
+
+    if isinstance(node, _Collision) and node.hash == leaf.hash:
+        leaves = tuple(old for old in node.leaves if old.key != leaf.key)
+        added = len(leaves) == len(node.leaves)
+        return _Collision(node.hash, leaves + (leaf,)), added
+
+    if isinstance(node, _Leaf) and node.key == leaf.key:
+        return leaf, False
+
+    return _join(node, leaf, shift), True
+
+
+def _delete(node: t.Any, h: int, key: str, shift: int) -> t.Any:
+    """Return node without key, None if it became empty, or node itself if absent."""
+    if isinstance(node, _Node):
+        bit = _slot(h, shift)
+        if not node.bitmap & bit:
+            return node
+
+        idx = bin(node.bitmap & (bit - 1)).count("1")
+        rest = idx + 1
+        entries = node.entries
+        child = _delete(entries[idx], h, key, shift + _BITS)
+        if child is entries[idx]:
+            return node
+        if child is not None:
+            return _Node(node.bitmap, entries[:idx] + (child,) + entries[rest:])
+
+        entries = entries[:idx] + entries[rest:]
+        if shift and len(entries) == 1 and not isinstance(entries[0], _Node):
+            return entries[0]
+        if shift and not entries:
+            return None
+        return _Node(node.bitmap ^ bit, entries)
+
+    if isinstance(node, _Collision):
+        leaves = tuple(leaf for leaf in node.leaves if leaf.key != key)
+        if len(leaves) == len(node.leaves):
+            return node
+        return leaves[0] if len(leaves) == 1 else _Collision(node.hash, leaves)
+
+    return None if node.hash == h and node.key == key else node
+
+
+def _items(node: t.Any) -> t.Iterator[t.Tuple[str, t.Any]]:
+    if isinstance(node, _Node):
+        for entry in node.entries:
+            yield from _items(entry)
+    elif isinstance(node, _Collision):
+        for leaf in node.leaves:
+            yield leaf.key, leaf.value
+    else:
+        yield node.key, node.value
+
+
+class HashArrayMappedTrie:
+    """Immutable string keyed map sharing structure between versions.
+
+    Updates return a new trie copying only the O(log n) path to the changed key.
+    """
+
+    __slots__ = ["_root", "_count"]
+
+    def __init__(self, data: t.Optional[t.Mapping[str, t.Any]] = None):
+        """Class constructor."""
+        self._root: t.Any = _Node(0, ())
+        self._count = 0
+        for key, value in (data or {}).items():
+            self._root, added = _set(self._root, _Leaf(_hash(key), key, value), 0)
+            self._count += added
+
+    @classmethod
+    def _of(cls, root: t.Any, count: int) -> "HashArrayMappedTrie":
+        trie = cls.__new__(cls)
+        trie._root = root
+        trie._count = count
+        return trie
+
+    def __len__(self) -> int:
+        """Return number of keys."""
+        return self._count
+
+    def __contains__(self, key: object) -> bool:
+        """Return True if key is present."""
+        return (
+            isinstance(key, str) and _get(self._root, _hash(key), key) is not _MISSING
+        )
+
+    def get(self, key: str, default: t.Any = None) -> t.Any:
+        """Return value of key or default when absent."""
+        value = _get(self._root, _hash(key), key)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: t.Any) -> "HashArrayMappedTrie":
+        """Return trie with key set to value."""
+        root, added = _set(self._root, _Leaf(_hash(key), key, value), 0)
+        return self._of(root, self._count + added)
+
+    def delete(self, key: str) -> "HashArrayMappedTrie":
+        """Return trie without key; the same trie when key is absent."""
+        root = _delete(self._root, _hash(key), key, 0)
+        return self if root is self._root else self._of(root, self._count - 1)
+
+    def items(self) -> t.Iterator[t.Tuple[str, t.Any]]:
+        """Iterate over (key, value) pairs in hash order."""
+        return _items(self._root)
+
+
+class TrieViewRepository(BaseViewRepository, BaseKeyLookup):
+    """Read only repository over one version of a hash array mapped trie."""
+
+    def __init__(self, trie: t.Optional[HashArrayMappedTrie] = None):
+        """Class constructor."""
+        super().__init__()
+        self._trie = trie or HashArrayMappedTrie()
+
+    def __len__(self) -> int:
+        """Return number of rows."""
+        return len(self._trie)
+
+    def lookup(self, uuid: str) -> t.Optional[KeyValueEntity]:
+        """Retrieve trie element if exists."""
+        val = self._trie.get(uuid, _MISSING)
+        return None if val is _MISSING else KeyValueEntity.loaded(uuid=uuid, val=val)
+
+    def lookup_many(  # type: ignore[override]
+        self, uuids: t.Iterable[str]
+    ) -> t.Dict[str, KeyValueEntity]:
+        """Retrieve existing trie elements for all requested keys."""
+        trie = self._trie
+        found = {}
+        for uuid in uuids:
+            val = trie.get(uuid, _MISSING)
+            if val is not _MISSING:
+                found[uuid] = KeyValueEntity.loaded(uuid=uuid, val=val)
+
+        return found
+
+    def get_all(  # type: ignore[override]
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.List[KeyValueEntity]:
+        """Retrieve all trie data."""
+        return list(self.iter_all(limit=limit, offset=offset))
+
+    def iter_all(
+        self,
+        limit: t.Optional[int] = None,
+        offset: t.Optional[int] = None,
+    ) -> t.Iterator[KeyValueEntity]:
+        """Stream trie data in hash order from the version current at call time."""
+        items = self._trie.items()
+        return (
+            KeyValueEntity.loaded(uuid=k, val=v)
+            for k, v in paginate(items, limit, offset)
+        )
+
+    def find(self, query: Query) -> t.Iterator[KeyValueEntity]:
+        """Stream trie elements selected by query building entities only for matches."""
+        for k, v in query.run(self._trie.items(), key=_first, value=_second):
+            yield KeyValueEntity.loaded(uuid=k, val=query.project(v))
+
+
+class TrieRepositoryAdapter(TrieViewRepository, BaseRepository):  # dead: disable
+    """Repository adapter keeping rows in a persistent hash array mapped trie.
+
+    Every write publishes a new trie version, so snapshots are O(1) and readers never
+    see a partially applied bulk write. Writers are serialized by a reentrant lock,
+    which a transaction holds for its whole block.
+    """
+
+    def __init__(self, data: t.Optional[t.Mapping[str, t.Any]] = None):
+        """Class constructor."""
+        super().__init__(HashArrayMappedTrie(data))
+        self._lock = threading.RLock()
+
+    def snapshot(self) -> TrieViewRepository:
+        """Return read only view of the current version."""
+        return TrieViewRepository(self._trie)
+
+    def restore(self, snapshot: TrieViewRepository) -> None:
+        """Roll rows back to the version captured by snapshot."""
+        with self._lock:
+            self._trie = snapshot._trie
+
+    @contextlib.contextmanager
+    def transaction(self) -> t.Iterator[TrieViewRepository]:  # dead: disable
+        """Roll back all writes made in the block if it raises.
+
+        Writers in other threads wait until the block ends, so a rollback discards
+        only the writes of the block. Readers see the writes as they are made.
+        """
+        with self._lock:
+            snapshot = self.snapshot()
+            try:
+                yield snapshot
+            except BaseException:
+                self.restore(snapshot)
+                raise
+
+    def insert(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Insert row into table."""
+        with self._lock:
+            if entity.uuid in self._trie:
+                raise KeyError()
+
+            self._trie = self._trie.set(entity.uuid, entity.value)
+        return entity
+
+    def update(  # dead: disable
+        self, entity: KeyValueEntity  # type: ignore[override]
+    ) -> t.Optional[KeyValueEntity]:
+        """Update row in table."""
+        with self._lock:
+            if entity.uuid not in self._trie:
+                raise KeyError()
+
+            self._trie = self._trie.set(entity.uuid, entity.value)
+        return entity
+
+    def delete(self, uuid: str) -> bool:  # dead: disable
+        """Delete row from table that satisfy the condition where uuid equal value."""
+        with self._lock:
+            trie = self._trie
+            self._trie = trie.delete(uuid)
+            return self._trie is not trie
+
+    def insert_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Insert rows skipping existing keys; repeated keys keep the last value."""
+        return self._write_many(entities, exists=False)
+
+    def update_many(  # type: ignore[override]
+        self, entities: t.Iterable[KeyValueEntity]
+    ) -> BulkWriteResult:
+        """Update rows skipping missing keys; repeated keys keep the last value."""
+        return self._write_many(entities, exists=True)
+
+    def _write_many(
+        self, entities: t.Iterable[KeyValueEntity], exists: bool
+    ) -> BulkWriteResult:
+        batch = entity_items(entities)
+        result = BulkWriteResult()
+        with self._lock:
+            trie = self._trie
+            for uuid, value in batch.items():
+                if (uuid in trie) != exists:
+                    result.failed[uuid] = KeyError(uuid)
+                else:
+                    result.applied.append(uuid)
+                    trie = trie.set(uuid, value)
+            self._trie = trie
+
+        return result
+
+    def delete_many(self, uuids: t.Iterable[str]) -> BulkWriteResult:
+        """Delete rows skipping missing keys and publish the result at once."""
+        result = BulkWriteResult()
+        with self._lock:
+            trie = self._trie
+            for uuid in dict.fromkeys(uuids):
+                pruned = trie.delete(uuid)
+                if pruned is trie:
+                    result.failed[uuid] = KeyError(uuid)
+                else:
+                    result.applied.append(uuid)
+                trie = pruned
+            self._trie = trie
+
+        return result
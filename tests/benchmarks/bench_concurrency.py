@@ -0,0 +1,94 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""Multi-threaded throughput benchmark for dictionary repository adapters, run with
+PYTHONPATH=src python tests/benchmarks/bench_concurrency.py
+"""
+
+import threading
+import time
+import typing as t
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.persistence.repositories import ConcurrentDictRepositoryAdapter
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+
+OPERATIONS = 50_000
+KEYS = 10_000
+
+
+def worker(repo: BaseRepository, seed: int, errors: t.List[BaseException]) -> None:
+    try:
+        for i in range(OPERATIONS):
+            uuid = "k%d" % ((i * 7919 + seed) % KEYS)
+            if i % 10 == 0:
+                if not repo.delete(uuid):
+                    try:
+                        repo.insert(KeyValueEntity(uuid=uuid, val=i))
+                    except KeyError:
+                        pass
+            elif i % 4 == 0:
+                try:
+                    repo.update(KeyValueEntity(uuid=uuid, val=i))
+                except KeyError:
+                    pass
+            elif i % 1000 == 0:
+                repo.get_all(limit=100)
+            else:
+                repo.get_one(uuid)
+    except BaseException as e:
+        errors.append(e)
+
+
+def run(factory: t.Callable[[], BaseRepository], threads: int) -> t.Tuple[float, int]:
+    repo = factory()
+    errors: t.List[BaseException] = []
+    pool = [
+        threading.Thread(target=worker, args=(repo, seed, errors))
+        for seed in range(threads)
+    ]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return threads * OPERATIONS / elapsed, len(errors)
+
+
+def main() -> None:
+    data = {"k%d" % i: i for i in range(KEYS)}
+    factories: t.Dict[str, t.Callable[[], BaseRepository]] = {
+        "DictRepositoryAdapter": lambda: DictRepositoryAdapter(dict(data)),
+        "ConcurrentDictRepositoryAdapter": lambda: ConcurrentDictRepositoryAdapter(
+            dict(data)
+        ),
+    }
+    print("%-32s %8s %14s %8s" % ("adapter", "threads", "ops/s", "errors"))
+    for name, factory in factories.items():
+        for threads in (1, 2, 4, 8):
+            throughput, errors = run(factory, threads)
+            print("%-32s %8d %14.0f %8d" % (name, threads, throughput, errors))
+
+
+if __name__ == "__main__":
+    main()
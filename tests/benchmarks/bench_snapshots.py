@@ -0,0 +1,86 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""Warm restart benchmark comparing snapshot loads with rebuilding from source, run with
+PYTHONPATH=src python tests/benchmarks/bench_snapshots.py
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+import typing as t
+
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+from mediapills.core.persistence.snapshots import dump
+from mediapills.core.persistence.snapshots import load
+
+ROWS = 100_000
+BLOB = 1024
+
+
+def source() -> t.Iterator[t.Tuple[str, t.Any]]:
+    for i in range(ROWS):
+        if i % 2:
+            yield "k%06d" % i, {"id": i, "name": "row %d" % i, "tags": ["a", "b"]}
+        else:
+            yield "k%06d" % i, os.urandom(BLOB)
+
+
+def measure(name: str, build: t.Callable[[], t.Any]) -> t.Any:
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    del result
+    tracemalloc.start()
+    result = build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("%-28s %10.3f s %12.1f MiB" % (name, elapsed, peak / 2**20))
+    return result
+
+
+def main() -> None:
+    data = dict(source())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "repo.snap")
+        started = time.perf_counter()
+        dump(DictRepositoryAdapter(data), path)
+        print(
+            "dump %d rows, %.1f MiB in %.3f s"
+            % (ROWS, os.path.getsize(path) / 2**20, time.perf_counter() - started)
+        )
+        print("%-28s %12s %16s" % ("load", "time", "peak memory"))
+        measure("naive rebuild", lambda: DictRepositoryAdapter(dict(source())))
+        snapshot = measure("lazy mmap open", lambda: load(path))
+        measure(
+            "lazy mmap 1000 lookups",
+            lambda: [
+                snapshot.get_one("k%06d" % i) for i in range(0, ROWS, ROWS // 1000)
+            ],
+        )
+        measure(
+            "eager snapshot load", lambda: DictRepositoryAdapter(snapshot.to_dict())
+        )
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    main()
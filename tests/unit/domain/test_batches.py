@@ -0,0 +1,87 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import unittest
+
+from mediapills.core.domain.batches import EntityBatch
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.outputs import BaseOutput
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class TestEntityBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.batch = EntityBatch(["a", "b", "c", "d"], [1, 2, 3, 4])
+
+    def test_getitem_should_build_row_views(self) -> None:
+        row = self.batch[-1]
+
+        self.assertIsInstance(row, KeyValueEntity)
+        self.assertEqual(("d", 4), (row.uuid, row.value))
+        self.assertEqual(["a", "b", "c", "d"], [e.uuid for e in self.batch])
+        self.assertRaises(IndexError, self.batch.__getitem__, 4)
+
+    def test_contains_should_match_uuid_and_value(self) -> None:
+        self.assertIn(self.batch[1], self.batch)
+        self.assertIn(KeyValueEntity("c", 3), self.batch[1:])
+        self.assertNotIn(KeyValueEntity("a", 1), self.batch[1:])
+        self.assertNotIn(KeyValueEntity("b", 3), self.batch)
+        self.assertNotIn("b", self.batch)
+
+    def test_slice_should_share_columns(self) -> None:
+        tail = self.batch[1:]
+        middle = tail[:2]
+
+        self.assertIs(self.batch._uuids, middle._uuids)
+        self.assertEqual((["b", "c"], [2, 3]), (middle.uuids, middle.values))
+        self.assertEqual(["a", "c"], self.batch[::2].uuids)
+        self.assertEqual(0, len(self.batch[3:1]))
+
+    def test_filter_and_map_should_work_on_columns(self) -> None:
+        even = self.batch[1:].filter(lambda uuid, value: value % 2 == 0)
+        doubled = self.batch.map(lambda value: value * 2)
+
+        self.assertEqual([("b", 2), ("d", 4)], list(even.items()))
+        self.assertIs(self.batch._uuids, doubled._uuids)
+        self.assertEqual([2, 4, 6, 8], doubled.values)
+
+    def test_from_entities_should_read_values(self) -> None:
+        batch = EntityBatch.from_entities([KeyValueEntity("a", 1)])
+
+        self.assertEqual([("a", 1)], list(batch.items()))
+        self.assertIs(batch, EntityBatch.from_entities(batch))
+        self.assertRaises(ValueError, EntityBatch, ["a"], [])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_to_numpy_should_export_columns(self) -> None:
+        uuids, values = self.batch[1:3].to_numpy()
+
+        self.assertEqual(["b", "c"], uuids.tolist())
+        self.assertEqual(5, int(values.sum()))
+
+    def test_output_should_accept_batch(self) -> None:
+        output = BaseOutput()
+        output.data = self.batch
+
+        self.assertEqual(4, len(output.data))
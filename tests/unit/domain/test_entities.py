@@ -0,0 +1,150 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import gc
+import sys
+import tracemalloc
+import typing as t
+import unittest
+from datetime import datetime
+
+from mediapills.core.domain.entities import BaseEntity
+from mediapills.core.domain.entities import BaseImmutableEntity
+from mediapills.core.domain.entities import BaseMutableEntity
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.entities import LoggingLevel
+from mediapills.core.domain.entities import LogRecordEntity
+
+POINTER = 8
+OVERHEAD = 32
+"""Object header plus garbage collector header of a slotted instance on 64-bit CPython."""
+INSTANCES = 10_000
+
+
+class UniqueEntity(BaseUniqueEntity):
+    __slots__: t.List[str] = []
+
+
+class ImmutableEntity(BaseImmutableEntity):
+    __slots__: t.List[str] = []
+
+
+class MutableEntity(BaseMutableEntity):
+    __slots__: t.List[str] = []
+
+
+def bytes_per_instance(factory: t.Callable[[], BaseEntity]) -> float:
+    instances: t.List[t.Optional[BaseEntity]] = [None] * INSTANCES
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(INSTANCES):
+            instances[i] = factory()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    return used / INSTANCES
+
+
+@unittest.skipUnless(
+    sys.implementation.name == "cpython" and sys.maxsize > 2**32,
+    "instance layout budgets are for 64-bit CPython",
+)
+class TestEntityFootprint(unittest.TestCase):
+    created = datetime(2024, 1, 1)
+
+    def assert_footprint(self, factory: t.Callable[[], BaseEntity], slots: int) -> None:
+        entity = factory()
+
+        self.assertFalse(hasattr(entity, "__dict__"))
+        self.assertLessEqual(
+            round(bytes_per_instance(factory)), OVERHEAD + slots * POINTER
+        )
+
+    # Unique entities pay one extra pointer for the __weakref__ slot the identity map
+    # needs to hold them weakly; the budgets below count it deliberately.
+    def test_unique_entity_should_take_uuid_and_weakref_slots(self) -> None:
+        self.assert_footprint(lambda: UniqueEntity("uuid"), 2)
+        self.assertTrue(hasattr(UniqueEntity("uuid"), "__weakref__"))
+
+    def test_log_record_entity_should_not_be_weakly_referenceable(self) -> None:
+        record = LogRecordEntity("msg", LoggingLevel.INFO, "name")
+
+        self.assertFalse(hasattr(record, "__weakref__"))
+
+    def test_immutable_entity_should_take_three_slots(self) -> None:
+        self.assert_footprint(lambda: ImmutableEntity("uuid", self.created), 3)
+
+    def test_mutable_entity_should_take_six_slots(self) -> None:
+        self.assert_footprint(lambda: MutableEntity("uuid", 1, self.created), 6)
+
+    def test_key_value_entity_should_take_four_slots(self) -> None:
+        self.assert_footprint(lambda: KeyValueEntity("uuid", 1), 4)
+
+    def test_log_record_entity_should_take_five_slots(self) -> None:
+        self.assert_footprint(
+            lambda: LogRecordEntity("msg", LoggingLevel.INFO, "name", self.created), 5
+        )
+
+
+class TestMutableEntity(unittest.TestCase):
+    def test_timestamps_should_be_usable(self) -> None:
+        created, updated = datetime(2024, 1, 1), datetime(2024, 1, 2)
+        entity = MutableEntity("uuid", 1, created_at=created)
+        entity.value = 2
+        entity.updated_at = updated
+
+        self.assertEqual(
+            (2, created, updated), (entity.value, entity.created_at, entity.updated_at)
+        )
+        self.assertIsNone(ImmutableEntity("uuid").created_at)
+
+    def test_new_entity_should_start_dirty(self) -> None:
+        entity = MutableEntity("uuid", 1)
+
+        self.assertEqual(frozenset({"value", "updated_at"}), entity.dirty_fields)
+
+    def test_setters_should_mark_fields_dirty(self) -> None:
+        entity = MutableEntity("uuid", 1)
+        entity.mark_clean()
+        self.assertFalse(entity.dirty)
+
+        entity.value = 2
+        self.assertEqual(frozenset({"value"}), entity.dirty_fields)
+        entity.updated_at = datetime(2024, 1, 2)
+        self.assertEqual(frozenset({"value", "updated_at"}), entity.dirty_fields)
+
+        entity.mark_clean()
+        self.assertFalse(entity.dirty)
+        self.assertEqual({}, entity.changes())
+
+
+class TestKeyValueEntity(unittest.TestCase):
+    def test_value_setter_should_record_change(self) -> None:
+        entity = KeyValueEntity.loaded("uuid", 1)
+        self.assertFalse(entity.dirty)
+        entity.value = 2
+
+        self.assertTrue(entity.dirty)
+        self.assertEqual({"value": 2}, entity.changes())
+        self.assertTrue(KeyValueEntity("uuid", 1).dirty)
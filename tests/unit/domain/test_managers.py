@@ -0,0 +1,84 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import unittest
+from unittest.mock import Mock
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.managers import RepositoryEntityManager
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+from mediapills.core.persistence.tries import TrieRepositoryAdapter
+
+
+class TestRepositoryEntityManager(unittest.TestCase):
+    def test_update_many_should_skip_clean_entities(self) -> None:
+        repo = DictRepositoryAdapter({"a": 1, "b": 2, "c": 3})
+        repo.update_fields_many = Mock(wraps=repo.update_fields_many)  # type: ignore
+        manager = RepositoryEntityManager(repo)
+        entities = list(repo.get_all())
+        entities[1].value = 20  # type: ignore
+        result = manager.update_many(entities)
+
+        self.assertEqual(["b"], result.applied)
+        self.assertEqual(2, manager.skipped)
+        self.assertFalse(entities[1].dirty)  # type: ignore
+        self.assertEqual(20, repo.get_one("b").value)  # type: ignore
+        repo.update_fields_many.assert_called_once_with(  # type: ignore
+            {"b": {"value": 20}}
+        )
+
+    def test_update_should_not_write_loaded_clean_entity(self) -> None:
+        repo = TrieRepositoryAdapter({"a": 1})
+        repo.update_many = Mock(wraps=repo.update_many)  # type: ignore
+        manager = RepositoryEntityManager(repo)
+        entity = repo.get_one("a")
+        assert isinstance(entity, KeyValueEntity)
+
+        manager.update(entity)
+        repo.update_many.assert_not_called()  # type: ignore
+        entity.value = 2
+        manager.update(entity)
+        self.assertEqual(2, repo.get_one("a").value)  # type: ignore
+        self.assertFalse(entity.dirty)
+
+    def test_update_should_write_new_entity(self) -> None:
+        repo = DictRepositoryAdapter({"a": 1})
+        manager = RepositoryEntityManager(repo)
+        manager.update(KeyValueEntity("a", 2))
+
+        self.assertEqual(2, repo.get_one("a").value)  # type: ignore
+        self.assertEqual(0, manager.skipped)
+
+    def test_update_should_raise_for_missing_row(self) -> None:
+        manager = RepositoryEntityManager(DictRepositoryAdapter({}))
+        entity = KeyValueEntity("a", 1)
+
+        with self.assertRaises(KeyError):
+            manager.update(entity)
+        self.assertTrue(entity.dirty)
+
+    def test_insert_and_delete_should_delegate(self) -> None:
+        repo = DictRepositoryAdapter({})
+        manager = RepositoryEntityManager(repo)
+        manager.insert(KeyValueEntity("a", 1))  # type: ignore
+
+        self.assertIs(repo, manager.repository())
+        self.assertEqual(["a"], manager.delete_many(["a", "b"]))
+        self.assertFalse(manager.delete("a"))
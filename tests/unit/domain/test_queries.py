@@ -0,0 +1,68 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import sys
+import typing as t
+import unittest
+
+from mediapills.core.domain.queries import by_key
+from mediapills.core.domain.queries import Query
+
+ROWS = [("b", 2), ("a/2", 5), ("a/1", 1), ("c", 3)]
+
+
+def run(query: Query) -> t.List[t.Tuple[str, int]]:
+    return list(query.run(ROWS, key=lambda r: r[0], value=lambda r: r[1]))
+
+
+class TestQuery(unittest.TestCase):
+    def test_run_should_filter_by_prefix_and_predicate(self) -> None:
+        query = Query(prefix="a/", where=lambda v: v > 1)
+
+        self.assertEqual([("a/2", 5)], run(query))
+
+    def test_run_should_filter_by_key_range(self) -> None:
+        self.assertEqual([("b", 2)], run(Query(start="b", stop="c")))
+
+    def test_run_should_order_and_limit(self) -> None:
+        self.assertEqual(
+            ["a/1", "a/2"], [k for k, _ in run(Query(order_by=by_key, limit=2))]
+        )
+        self.assertEqual(
+            [("a/2", 5), ("c", 3)],
+            run(Query(order_by=lambda k, v: v, reverse=True, limit=2)),
+        )
+        self.assertEqual(
+            ["c", "b", "a/2", "a/1"],
+            [k for k, _ in run(Query(order_by=by_key, reverse=True))],
+        )
+
+    def test_key_range_should_combine_prefix_and_bounds(self) -> None:
+        self.assertEqual(("a/", "a0"), Query(prefix="a/").key_range())
+        self.assertEqual(("a/5", "a0"), Query(prefix="a/", start="a/5").key_range())
+        self.assertEqual(("a", "a/9"), Query(start="a", stop="a/9").key_range())
+        self.assertEqual(
+            ("a" + chr(sys.maxunicode), "b"),
+            Query(prefix="a" + chr(sys.maxunicode)).key_range(),
+        )
+
+    def test_project_should_apply_select(self) -> None:
+        self.assertEqual(4, Query(select=lambda v: v * 2).project(2))
+        self.assertEqual(2, Query().project(2))
@@ -0,0 +1,116 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import typing as t
+import unittest
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.queries import Query
+from mediapills.core.domain.repositories import BaseRepository
+from mediapills.core.domain.repositories import BaseViewRepository
+
+
+class ListViewRepository(BaseViewRepository):
+    def __init__(self, data: t.List[KeyValueEntity]):
+        self.data = data
+        self.scans = 0
+
+    def get_all(  # type: ignore[override]
+        self, limit: t.Optional[int] = None, offset: t.Optional[int] = None
+    ) -> t.List[KeyValueEntity]:
+        self.scans += 1
+        return self.data
+
+
+class ListRepository(ListViewRepository, BaseRepository):
+    def insert(self, entity: KeyValueEntity) -> KeyValueEntity:  # type: ignore
+        if self.get_one(entity.uuid) is not None:
+            raise KeyError(entity.uuid)
+
+        self.data.append(entity)
+        return entity
+
+    def update(self, entity: KeyValueEntity) -> KeyValueEntity:  # type: ignore
+        raise KeyError(entity.uuid)
+
+    def delete(self, uuid: str) -> bool:
+        return False
+
+
+class TestBaseViewRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.repo = ListViewRepository(
+            [KeyValueEntity(uuid="k%d" % i, val=i) for i in range(5)]
+        )
+
+    def test_get_one_should_fall_back_to_scan(self) -> None:
+        self.assertEqual(3, self.repo.get_one("k3").value)  # type: ignore
+        self.assertIsNone(self.repo.get_one("missing"))
+
+    def test_get_many_should_resolve_keys_in_one_scan(self) -> None:
+        found = self.repo.get_many(["k1", "k4", "missing", "k1"])
+
+        self.assertEqual({"k1", "k4"}, set(found))
+        self.assertEqual(1, self.repo.scans)
+
+    def test_find_should_stream_filter_rows(self) -> None:
+        query = Query(where=lambda v: v % 2 == 0, select=str, limit=2)
+        found = list(self.repo.find(query))
+
+        self.assertEqual(["k0", "k2"], [entity.uuid for entity in found])
+        self.assertEqual(["0", "2"], [entity.value for entity in found])
+
+    def test_get_page_should_scan_past_cursor(self) -> None:
+        first = self.repo.get_page(limit=3)
+        second = self.repo.get_page(after=first.cursor, limit=3)
+
+        self.assertEqual(["k0", "k1", "k2"], [e.uuid for e in first.entities])
+        self.assertEqual(["k3", "k4"], [e.uuid for e in second.entities])
+        self.assertIsNone(second.cursor)
+
+    def test_get_range_should_scan_in_key_order(self) -> None:
+        self.repo = ListViewRepository(
+            [KeyValueEntity(uuid=k, val=0) for k in ["b/2", "a/1", "b/1", "c"]]
+        )
+
+        self.assertEqual(["b/1", "b/2"], [e.uuid for e in self.repo.get_prefix("b/")])
+        self.assertEqual(["a/1"], [e.uuid for e in self.repo.get_range("a", "b/1")])
+        self.assertEqual(["b/2"], [e.uuid for e in self.repo.get_range("b/2", limit=1)])
+
+    def test_get_many_should_skip_scan_for_no_keys(self) -> None:
+        self.assertEqual({}, self.repo.get_many([]))
+        self.assertEqual(0, self.repo.scans)
+
+
+class TestBaseRepository(unittest.TestCase):
+    def test_insert_many_should_not_abort_on_conflict(self) -> None:
+        repo = ListRepository([KeyValueEntity(uuid="a", val=1)])
+        result = repo.insert_many(
+            [KeyValueEntity(uuid="a", val=2), KeyValueEntity(uuid="b", val=3)]
+        )
+
+        self.assertEqual(["b"], result.applied)
+        self.assertEqual(["a"], list(result.failed))
+
+    def test_update_and_delete_many_should_collect_failures(self) -> None:
+        repo = ListRepository([])
+
+        self.assertEqual(["a"], list(repo.update_many([KeyValueEntity("a", 1)]).failed))
+        self.assertEqual(["a"], list(repo.delete_many(["a"]).failed))
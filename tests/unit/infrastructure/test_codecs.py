@@ -0,0 +1,151 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import sys
+import typing as t
+import unittest
+from datetime import datetime
+
+from mediapills.core.domain.entities import BaseMutableEntity
+from mediapills.core.domain.entities import BaseUniqueEntity
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.entities import LoggingLevel
+from mediapills.core.domain.entities import LogRecordEntity
+from mediapills.core.infrastructure.codecs import codec_for
+from mediapills.core.infrastructure.codecs import EntityCodec
+
+
+class Article(BaseMutableEntity):
+    __slots__ = ["_title", "tags"]
+
+    def __init__(self, uuid: str, title: str, tags: t.List[str]):
+        super().__init__(uuid, None, datetime(2024, 1, 1))
+        self._title = title
+        self.tags = tags
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+
+class Unslotted(BaseUniqueEntity):
+    pass
+
+
+class Event(BaseUniqueEntity):
+    __slots__ = ["_at"]
+
+    def __init__(self, uuid: str, at: t.Optional[datetime]):
+        super().__init__(uuid)
+        self._at = at
+
+    @property
+    def at(self) -> "datetime | None":
+        return self._at
+
+
+class TestEntityCodec(unittest.TestCase):
+    def test_codec_should_be_compiled_once_per_class(self) -> None:
+        self.assertIs(codec_for(KeyValueEntity), codec_for(KeyValueEntity))
+        self.assertEqual(("uuid", "value"), codec_for(KeyValueEntity).fields)
+
+    def test_key_value_entity_should_round_trip(self) -> None:
+        codec = codec_for(KeyValueEntity)
+        value = {"a": [1, 2.5, None, True, "x"], "big": 2**70}
+        entity = KeyValueEntity("key", value)
+        entity.value = value
+
+        self.assertEqual(
+            '{"uuid":"key","value":1}', codec.to_json(KeyValueEntity("key", 1))
+        )
+        for decoded in (
+            codec.from_json(codec.to_json(entity)),
+            codec.from_bytes(codec.to_bytes(entity)),
+        ):
+            self.assertEqual(("key", value), (decoded.uuid, decoded.value))
+            self.assertFalse(decoded.dirty)
+
+    def test_log_record_should_convert_level_and_timestamp(self) -> None:
+        codec = codec_for(LogRecordEntity)
+        record = LogRecordEntity("msg", LoggingLevel.WARN, "app", datetime(2024, 1, 2))
+
+        self.assertEqual(
+            {
+                "msg": "msg",
+                "name": "app",
+                "lvl": "warn",
+                "created": "2024-01-02T00:00:00",
+            },
+            json.loads(codec.to_json(record)),
+        )
+        decoded = codec.from_bytes(codec.to_bytes(record))
+        self.assertEqual(
+            ("msg", LoggingLevel.WARN, "app", datetime(2024, 1, 2)),
+            (decoded.msg, decoded.lvl, decoded.name, decoded.created),
+        )
+
+    def test_user_subclass_should_include_public_slots(self) -> None:
+        codec = codec_for(Article)
+        decoded = codec.from_dict(codec.to_dict(Article("a", "Title", ["x"])))
+
+        self.assertEqual(
+            ("uuid", "created_at", "value", "updated_at", "title", "tags"), codec.fields
+        )
+        self.assertEqual(("Title", ["x"]), (decoded.title, decoded.tags))
+        self.assertEqual(datetime(2024, 1, 1), decoded.created_at)
+
+    @unittest.skipIf(sys.version_info < (3, 10), "PEP 604 unions need Python 3.10")
+    def test_pep_604_optional_should_convert_values(self) -> None:
+        codec = codec_for(Event)
+        encoded = codec.to_json(Event("e", datetime(2024, 1, 2)))
+
+        self.assertEqual('{"uuid":"e","at":"2024-01-02T00:00:00"}', encoded)
+        self.assertEqual(datetime(2024, 1, 2), codec.from_json(encoded).at)
+        self.assertIsNone(codec.from_json(codec.to_json(Event("e", None))).at)
+
+    def test_codec_should_reject_unslotted_class(self) -> None:
+        with self.assertRaises(TypeError):
+            EntityCodec(Unslotted)
+
+    def test_from_bytes_should_reject_other_class(self) -> None:
+        data = codec_for(LogRecordEntity).to_bytes(
+            LogRecordEntity("m", LoggingLevel.INFO, "n")
+        )
+
+        with self.assertRaises(ValueError):
+            codec_for(KeyValueEntity).from_bytes(data)
+
+    def test_from_bytes_should_reject_truncated_and_trailing_input(self) -> None:
+        codec = codec_for(KeyValueEntity)
+        data = codec.to_bytes(KeyValueEntity("key", {"a": [1, "text", b"raw"]}))
+
+        for size in range(len(data)):
+            with self.subTest(size=size), self.assertRaises(ValueError):
+                codec.from_bytes(data[:size])
+        with self.assertRaises(ValueError):
+            codec.from_bytes(data + b"N")
+        self.assertEqual(
+            {"a": [1, "text", b"raw"]}, codec.from_bytes(memoryview(data)).value
+        )
+
+    def test_to_bytes_should_reject_unsupported_value(self) -> None:
+        with self.assertRaises(TypeError):
+            codec_for(KeyValueEntity).to_bytes(KeyValueEntity("key", object()))
@@ -0,0 +1,190 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import time
+import typing as t
+import unittest
+from unittest.mock import Mock
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.persistence.buffers import WriteBehindRepository
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+
+
+class TestWriteBehindRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.backend = DictRepositoryAdapter({"a": 1})
+        self.repo = WriteBehindRepository(self.backend, max_pending=None, interval=None)
+
+    def tearDown(self) -> None:
+        self.repo.close()
+
+    def test_updates_should_collapse_to_last_write(self) -> None:
+        self.backend.update_many = Mock(wraps=self.backend.update_many)  # type: ignore
+        for i in range(100):
+            self.repo.update(KeyValueEntity(uuid="a", val=i))
+
+        self.assertEqual(1, self.repo.pending)
+        self.assertEqual(1, self.backend.get_one("a").value)  # type: ignore
+        self.assertEqual(["a"], self.repo.flush().applied)
+        self.assertEqual(99, self.backend.get_one("a").value)  # type: ignore
+        self.assertEqual(1, len(self.backend.update_many.call_args[0][0]))  # type: ignore
+
+    def test_reads_should_see_buffered_writes(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="b", val=2))
+        self.repo.delete("a")
+
+        self.assertIsNone(self.repo.get_one("a"))
+        self.assertEqual(2, self.repo.get_one("b").value)  # type: ignore
+        self.assertEqual(["b"], list(self.repo.get_many(["a", "b"])))
+        self.assertEqual(["b"], [entity.uuid for entity in self.repo.get_all()])
+        self.assertEqual(["a"], [entity.uuid for entity in self.backend.get_all()])
+
+    def test_writes_should_validate_against_buffer_and_backend(self) -> None:
+        with self.assertRaises(KeyError):
+            self.repo.insert(KeyValueEntity(uuid="a", val=2))
+        with self.assertRaises(KeyError):
+            self.repo.update(KeyValueEntity(uuid="b", val=2))
+        self.assertFalse(self.repo.delete("b"))
+
+        self.repo.delete("a")
+        self.repo.insert(KeyValueEntity(uuid="a", val=3))
+        self.repo.insert(KeyValueEntity(uuid="b", val=2))
+        self.assertTrue(self.repo.delete("b"))
+        self.repo.flush()
+
+        self.assertEqual({"a": 3}, {e.uuid: e.value for e in self.backend.get_all()})
+
+    def test_close_should_flush_pending_writes(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="b", val=2))
+        self.repo.close()
+
+        self.assertEqual(2, self.backend.get_one("b").value)  # type: ignore
+
+    def test_background_thread_should_flush_on_size(self) -> None:
+        repo = WriteBehindRepository(self.backend, max_pending=10, interval=None)
+        self.addCleanup(repo.close)
+        for i in range(10):
+            repo.insert(KeyValueEntity(uuid="k%d" % i, val=i))
+
+        deadline = time.monotonic() + 5
+        while len(self.backend.get_all()) < 11 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(11, len(self.backend.get_all()))
+
+    def test_background_thread_should_flush_on_interval(self) -> None:
+        repo = WriteBehindRepository(self.backend, max_pending=None, interval=0.01)
+        self.addCleanup(repo.close)
+        repo.update(KeyValueEntity(uuid="a", val=2))
+
+        deadline = time.monotonic() + 5
+        while self.backend.get_one("a").value != 2:  # type: ignore
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def fail_once(self, name: str) -> None:
+        original = getattr(self.backend, name)
+        calls = []
+
+        def write(*args: t.Any) -> t.Any:
+            calls.append(args)
+            if len(calls) == 1:
+                raise RuntimeError("backend down")
+            return original(*args)
+
+        setattr(self.backend, name, write)
+
+    def test_failed_flush_should_keep_unflushed_writes(self) -> None:
+        self.fail_once("update_many")
+        self.backend.delete_many = Mock(wraps=self.backend.delete_many)  # type: ignore
+        self.repo.insert(KeyValueEntity(uuid="b", val=2))
+        self.repo.update(KeyValueEntity(uuid="a", val=2))
+
+        self.assertRaises(RuntimeError, self.repo.flush)
+        self.assertEqual(1, self.repo.pending)
+        self.assertEqual(2, self.backend.get_one("b").value)  # type: ignore
+        self.assertEqual(2, self.repo.get_one("a").value)  # type: ignore
+
+        self.repo.update(KeyValueEntity(uuid="a", val=3))
+        self.assertEqual(["a"], self.repo.flush().applied)
+        self.assertEqual(3, self.backend.get_one("a").value)  # type: ignore
+        self.backend.delete_many.assert_not_called()  # type: ignore
+
+    def test_background_thread_should_survive_backend_error(self) -> None:
+        self.fail_once("update_many")
+        repo = WriteBehindRepository(self.backend, max_pending=None, interval=0.01)
+        self.addCleanup(repo.close)
+        repo.update(KeyValueEntity(uuid="a", val=2))
+
+        deadline = time.monotonic() + 5
+        while self.backend.get_one("a").value != 2:  # type: ignore
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertIsInstance(repo.error, RuntimeError)
+
+    def test_background_flush_should_record_rejected_keys(self) -> None:
+        repo = WriteBehindRepository(self.backend, max_pending=None, interval=0.01)
+        self.addCleanup(repo.close)
+        repo.insert(KeyValueEntity(uuid="b", val=2))
+        self.backend.insert(KeyValueEntity(uuid="b", val=3))
+
+        deadline = time.monotonic() + 5
+        while not repo.failed:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(["b"], list(repo.failed))
+        self.assertIsInstance(repo.failed["b"], KeyError)
+
+    def test_writes_should_read_backend_without_holding_lock(self) -> None:
+        get_one = self.backend.get_one
+
+        def unlocked_get_one(uuid: str) -> t.Any:
+            self.assertFalse(self.repo._lock.locked())
+            return get_one(uuid)
+
+        self.backend.get_one = Mock(side_effect=unlocked_get_one)  # type: ignore
+        self.repo.update(KeyValueEntity(uuid="a", val=2))
+        self.repo.insert(KeyValueEntity(uuid="b", val=2))
+
+        self.assertEqual(2, self.backend.get_one.call_count)  # type: ignore
+
+    def test_writes_after_close_should_raise(self) -> None:
+        self.repo.close()
+
+        with self.assertRaises(RuntimeError):
+            self.repo.insert(KeyValueEntity(uuid="b", val=2))
+        with self.assertRaises(RuntimeError):
+            self.repo.delete("a")
+        self.assertEqual(0, self.repo.pending)
+
+    def test_writes_should_read_backend_again_after_concurrent_flush(self) -> None:
+        get_one = self.backend.get_one
+
+        def stale_get_one(uuid: str) -> t.Any:
+            found = get_one(uuid)
+            if self.backend.get_one.call_count == 1:  # type: ignore
+                self.backend.insert(KeyValueEntity(uuid=uuid, val=9))
+                self.repo.flush()
+            return found
+
+        self.backend.get_one = Mock(side_effect=stale_get_one)  # type: ignore
+
+        self.assertRaises(KeyError, self.repo.insert, KeyValueEntity(uuid="b", val=2))
+        self.assertEqual(2, self.backend.get_one.call_count)  # type: ignore
@@ -0,0 +1,170 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import unittest
+from unittest.mock import Mock
+
+from mediapills.core.domain.batches import EntityBatch
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.queries import Query
+from mediapills.core.persistence.caches import CachingRepository
+from mediapills.core.persistence.caches import CachingViewRepository
+from mediapills.core.persistence.caches import IdentityMapRepository
+from mediapills.core.persistence.caches import IdentityMapViewRepository
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+
+
+class TestCachingViewRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.backend = DictRepositoryAdapter({"a": 1, "b": 2, "c": 3})
+        self.backend.lookup = Mock(wraps=self.backend.lookup)  # type: ignore
+        self.now = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    def test_get_one_should_serve_hot_key_from_cache(self) -> None:
+        repo = CachingViewRepository(self.backend)
+        repo.get_one("a")
+        repo.get_one("a")
+
+        self.assertEqual(1, self.backend.lookup.call_count)  # type: ignore
+        self.assertEqual((1, 1), (repo.hits, repo.misses))
+        self.assertEqual(0.5, repo.hit_rate)
+
+    def test_get_one_should_evict_least_recently_used(self) -> None:
+        repo = CachingViewRepository(self.backend, maxsize=2)
+        repo.get_one("a")
+        repo.get_one("b")
+        repo.get_one("a")
+        repo.get_one("c")
+
+        self.assertEqual(1, repo.evictions)
+        self.assertEqual(2, len(repo))
+        repo.get_one("a")
+        self.assertEqual(2, repo.hits)
+
+    def test_get_one_should_expire_after_ttl(self) -> None:
+        repo = CachingViewRepository(self.backend, ttl=10, clock=self.clock)
+        repo.get_one("a")
+        self.now = 10.0
+        repo.get_one("a")
+
+        self.assertEqual((0, 2, 1), (repo.hits, repo.misses, repo.evictions))
+
+    def test_get_many_should_load_only_misses(self) -> None:
+        repo = CachingViewRepository(self.backend)
+        repo.get_one("a")
+        self.backend.get_many = Mock(wraps=self.backend.get_many)  # type: ignore
+        found = repo.get_many(["a", "b", "missing"])
+
+        self.assertEqual({"a", "b"}, set(found))
+        self.backend.get_many.assert_called_once_with(["b", "missing"])
+
+    def test_constructor_should_reject_empty_cache(self) -> None:
+        with self.assertRaises(ValueError):
+            CachingViewRepository(self.backend, maxsize=0)
+
+    def test_cached_entity_should_not_share_caller_instances(self) -> None:
+        repo = CachingViewRepository(self.backend)
+        entity = repo.get_one("a")
+        entity.value = 100  # type: ignore
+        cached = repo.get_one("a")
+
+        self.assertEqual(1, cached.value)  # type: ignore
+        self.assertIsNot(cached, repo.get_one("a"))
+        self.assertFalse(cached.dirty)  # type: ignore
+
+
+class TestCachingRepository(unittest.TestCase):
+    def test_update_should_refresh_cache(self) -> None:
+        repo = CachingRepository(DictRepositoryAdapter({"a": 1}))
+        repo.get_one("a")
+        repo.update(KeyValueEntity(uuid="a", val=2))
+
+        self.assertEqual(2, repo.get_one("a").value)  # type: ignore
+        self.assertEqual(1, repo.hits)
+
+    def test_delete_should_invalidate_cache(self) -> None:
+        repo = CachingRepository(DictRepositoryAdapter({"a": 1}))
+        repo.get_one("a")
+
+        self.assertTrue(repo.delete("a"))
+        self.assertIsNone(repo.get_one("a"))
+
+    def test_bulk_writes_should_invalidate_applied_keys(self) -> None:
+        repo = CachingRepository(DictRepositoryAdapter({"a": 1}))
+        repo.get_one("a")
+        repo.update_many([KeyValueEntity(uuid="a", val=2)])
+
+        self.assertEqual(0, len(repo))
+        self.assertEqual(2, repo.get_one("a").value)  # type: ignore
+
+
+class TestIdentityMapViewRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.backend = DictRepositoryAdapter({"a": 1, "b": 2, "c": 3})
+        self.backend.lookup = Mock(wraps=self.backend.lookup)  # type: ignore
+
+    def test_get_one_should_return_same_instance(self) -> None:
+        repo = IdentityMapViewRepository(self.backend)
+        first = repo.get_one("a")
+
+        self.assertIs(first, repo.get_one("a"))
+        self.assertIs(first, repo.get_many(["a", "b"])["a"])
+        self.assertIs(first, [e for e in repo.get_all() if e.uuid == "a"][0])
+        self.assertIs(first, repo.get_page(limit=1).entities[0])
+        self.assertEqual(1, self.backend.lookup.call_count)  # type: ignore
+        self.assertEqual((2, 2), (repo.hits, repo.misses))
+
+    def test_map_should_drop_unreferenced_entities(self) -> None:
+        repo = IdentityMapViewRepository(self.backend)
+        repo.get_one("a")
+
+        self.assertEqual(0, len(repo))
+        repo.get_one("a")
+        self.assertEqual((0, 2), (repo.hits, repo.misses))
+
+    def test_scans_should_return_mapped_instances(self) -> None:
+        repo = IdentityMapViewRepository(self.backend)
+        entity = repo.get_one("b")
+
+        self.assertIs(entity, repo.get_range("b", "c")[0])
+        self.assertIs(entity, repo.get_prefix("b")[0])
+        self.assertIs(entity, next(repo.find(Query(prefix="b"))))
+        self.assertIsNot(entity, next(repo.find(Query(prefix="b", select=str))))
+
+
+class TestIdentityMapRepository(unittest.TestCase):
+    def test_writes_should_keep_identity(self) -> None:
+        repo = IdentityMapRepository(DictRepositoryAdapter({"a": 1}))
+        entity = KeyValueEntity("b", 2)
+        repo.insert(entity)
+        batch = [KeyValueEntity("c", 3)]
+        repo.insert_many(batch)
+        loaded = repo.get_one("a")
+        repo.insert_many(EntityBatch(["d"], [4]))
+        repo.delete("a")
+
+        self.assertIs(entity, repo.get_one("b"))
+        self.assertIs(batch[0], repo.get_one("c"))
+        self.assertIsNot(loaded, repo.get_one("a"))
+        self.assertIsNone(repo.get_one("a"))
+        self.assertEqual(4, repo.get_one("d").value)  # type: ignore
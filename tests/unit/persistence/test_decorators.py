@@ -0,0 +1,67 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import typing as t
+import unittest
+from unittest.mock import Mock
+
+from mediapills.core.domain.queries import Query
+from mediapills.core.persistence.caches import CachingViewRepository
+from mediapills.core.persistence.caches import IdentityMapViewRepository
+from mediapills.core.persistence.decorators import DelegatingViewRepository
+from mediapills.core.persistence.feeds import ObservableRepository
+from mediapills.core.persistence.filters import BloomFilterViewRepository
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+
+DECORATORS: t.List[t.Callable[[DictRepositoryAdapter], DelegatingViewRepository]] = [
+    DelegatingViewRepository,
+    CachingViewRepository,
+    IdentityMapViewRepository,
+    BloomFilterViewRepository,
+    ObservableRepository,
+]
+
+
+class TestDelegatingViewRepository(unittest.TestCase):
+    def test_scans_should_delegate_to_wrapped_repository(self) -> None:
+        for decorator in DECORATORS:
+            with self.subTest(decorator=decorator):
+                backend = DictRepositoryAdapter({"a": 1, "b": 2, "c": 3})
+                for name in ("find", "get_range", "get_prefix", "get_batch"):
+                    setattr(backend, name, Mock(wraps=getattr(backend, name)))
+                repo = decorator(backend)
+                found = repo.find(Query(start="b", stop="c"))
+
+                self.assertIs(backend, repo.repository)
+                self.assertEqual(["b"], [entity.uuid for entity in found])
+                self.assertEqual(["a", "b"], [e.uuid for e in repo.get_range("a", "c")])
+                self.assertEqual(["c"], [e.uuid for e in repo.get_prefix("c")])
+                self.assertEqual(3, len(repo.get_batch()))
+                for name in ("find", "get_range", "get_prefix", "get_batch"):
+                    self.assertTrue(getattr(backend, name).called, name)
+
+    def test_reads_should_delegate_to_wrapped_repository(self) -> None:
+        repo = DelegatingViewRepository(DictRepositoryAdapter({"a": 1, "b": 2}))
+
+        self.assertEqual(1, repo.get_one("a").value)  # type: ignore
+        self.assertEqual(["b"], list(repo.get_many(["b", "z"])))
+        self.assertEqual(["a", "b"], [e.uuid for e in repo.get_all()])
+        self.assertEqual(["b"], [e.uuid for e in repo.iter_all(offset=1)])
+        self.assertEqual(["a"], [e.uuid for e in repo.get_page(limit=1).entities])
@@ -0,0 +1,156 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import random
+import unittest
+from unittest import mock
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.persistence.expiry import ExpiringDictRepositoryAdapter
+from mediapills.core.persistence.expiry import TimingWheel
+from mediapills.core.persistence.indexes import HashIndex
+
+
+class TestTimingWheel(unittest.TestCase):
+    def test_advance_should_return_keys_once_due(self) -> None:
+        wheel = TimingWheel(tick=1.0, slots=4, levels=2)
+        wheel.schedule("soon", 2.5)
+        wheel.schedule("later", 9.0)
+        wheel.schedule("far", 40.0)
+
+        self.assertEqual([], wheel.advance(2.0))
+        self.assertEqual([("soon", 2.5)], wheel.advance(3.0))
+        self.assertEqual([("later", 9.0)], wheel.advance(39.5))
+        self.assertEqual([("far", 40.0)], wheel.advance(40.0))
+        self.assertEqual(0, len(wheel))
+
+    def test_advance_should_match_deadlines_across_levels(self) -> None:
+        rnd = random.Random(7)
+        wheel = TimingWheel(tick=0.5, slots=4, levels=3)
+        deadlines = {"k%d" % i: rnd.uniform(0, 100) for i in range(500)}
+        for key, deadline in deadlines.items():
+            wheel.schedule(key, deadline)
+
+        now = 0.0
+        while now < 101:
+            now += rnd.uniform(0, 3)
+            for key, deadline in wheel.advance(now):
+                self.assertLessEqual(deadline, now)
+                self.assertGreater(deadline, now - 3.5)
+                del deadlines[key]
+
+        self.assertEqual({}, deadlines)
+
+    def test_advance_should_skip_idle_ticks(self) -> None:
+        wheel = TimingWheel(tick=1.0, slots=64, levels=4)
+        wheel.schedule("far", 10_000_000.0)
+        cascade = TimingWheel._cascade
+
+        with mock.patch.object(
+            TimingWheel, "_cascade", autospec=True, side_effect=cascade
+        ) as spy:
+            self.assertEqual([], wheel.advance(9_999_999.0))
+            self.assertEqual([("far", 10_000_000.0)], wheel.advance(10_000_000.0))
+
+        self.assertLess(spy.call_count, 1_000)
+
+
+class TestExpiringDictRepositoryAdapter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    def test_get_one_should_hide_expired_row_before_tick(self) -> None:
+        repo = ExpiringDictRepositoryAdapter(ttl=10, tick=5, clock=self.clock)
+        repo.insert(KeyValueEntity("token", 1), ttl=2.5)
+        repo.insert(KeyValueEntity("session", 2))
+        self.now = 3.0
+
+        self.assertIsNone(repo.get_one("token"))
+        self.assertEqual(["session"], [e.uuid for e in repo.get_all()])
+        self.assertEqual(1, repo.expirations)
+
+    def test_timing_wheel_should_evict_without_reads(self) -> None:
+        repo = ExpiringDictRepositoryAdapter({"a": 1, "b": 2}, ttl=10, clock=self.clock)
+        repo.update(KeyValueEntity("b", 3), ttl=30)
+        self.now = 11.0
+        repo.evict()
+
+        self.assertEqual({"b": 3}, repo._data)
+        self.assertEqual((0, 1), (repo.expirations, repo.evictions))
+
+    def test_writes_should_treat_expired_keys_as_missing(self) -> None:
+        repo = ExpiringDictRepositoryAdapter(ttl=1, tick=10, clock=self.clock)
+        repo.insert(KeyValueEntity("a", 1))
+        self.now = 2.0
+
+        self.assertRaises(KeyError, repo.update, KeyValueEntity("a", 2))
+        repo.insert_many([KeyValueEntity("a", 3)], ttl=5)
+        self.assertEqual(3, repo.get_one("a").value)  # type: ignore
+        self.now = 8.0
+        self.assertEqual(["a"], list(repo.delete_many(["a"]).failed))
+
+    def test_update_without_ttl_should_restart_row_ttl(self) -> None:
+        repo = ExpiringDictRepositoryAdapter(clock=self.clock)
+        repo.insert(KeyValueEntity("a", 1), ttl=10)
+        repo.insert(KeyValueEntity("b", 1), ttl=10)
+        self.now = 5.0
+        repo.update(KeyValueEntity("a", 2))
+        repo.update_many([KeyValueEntity("b", 2)])
+        self.now = 12.0
+
+        self.assertEqual(2, repo.get_one("a").value)  # type: ignore
+        self.assertEqual(2, repo.get_one("b").value)  # type: ignore
+        self.now = 15.0
+        self.assertEqual([], repo.get_all())
+
+    def test_rows_without_ttl_should_never_expire(self) -> None:
+        repo = ExpiringDictRepositoryAdapter({"a": 1}, clock=self.clock)
+        self.now = 1e9
+
+        self.assertIsNotNone(repo.get_one("a"))
+        self.assertRaises(ValueError, repo.insert, KeyValueEntity("b", 1), 0)
+        self.assertIsNone(repo.get_one("b"))
+
+    def test_indexes_should_drop_expired_rows(self) -> None:
+        repo = ExpiringDictRepositoryAdapter(
+            ttl=1, clock=self.clock, indexes={"value": HashIndex(lambda v: v)}
+        )
+        repo.insert(KeyValueEntity("a", 1))
+        repo.insert(KeyValueEntity("b", 1), ttl=10)
+        self.now = 5.0
+
+        self.assertEqual(["b"], [e.uuid for e in repo.find_by("value", 1)])
+        self.assertEqual(["b"], [e.uuid for e in repo.get_page().entities])
+        self.assertEqual(["b"], [e.uuid for e in repo.get_prefix("")])
+
+    def test_pages_should_fill_limit_with_live_rows(self) -> None:
+        repo = ExpiringDictRepositoryAdapter(tick=60, clock=self.clock)
+        for i in range(6):
+            repo.insert(KeyValueEntity("k%d" % i, i), ttl=1 if i % 2 else 100)
+        self.now = 2.0
+
+        page = repo.get_page(limit=2)
+        self.assertEqual(["k0", "k2"], [e.uuid for e in page.entities])
+        page = repo.get_page(after=page.cursor, limit=2)
+        self.assertEqual(["k4"], [e.uuid for e in page.entities])
+        self.assertEqual(["k0", "k2"], [e.uuid for e in repo.get_range(limit=2)])
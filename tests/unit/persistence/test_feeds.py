@@ -0,0 +1,94 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import asyncio
+import threading
+import typing as t
+import unittest
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.exceptions import ResyncRequiredException
+from mediapills.core.persistence.feeds import ChangeFeed
+from mediapills.core.persistence.feeds import ChangeType
+from mediapills.core.persistence.feeds import ObservableRepository
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+
+
+class TestChangeFeed(unittest.TestCase):
+    def test_read_should_return_events_after_sequence(self) -> None:
+        feed = ChangeFeed()
+        for uuid in "abc":
+            feed.publish(ChangeType.INSERT, uuid)
+
+        self.assertEqual(["b", "c"], [e.uuid for e in feed.read(1)])
+        self.assertEqual([2], [e.sequence for e in feed.read(1, limit=1)])
+        self.assertEqual([], feed.read(3))
+
+    def test_read_should_signal_resync_for_dropped_events(self) -> None:
+        feed = ChangeFeed(capacity=2)
+        for uuid in "abc":
+            feed.publish(ChangeType.INSERT, uuid)
+
+        with self.assertRaises(ResyncRequiredException) as ctx:
+            feed.read(0)
+        self.assertEqual(3, ctx.exception.sequence)
+        self.assertEqual(["b", "c"], [e.uuid for e in feed.read(1)])
+
+    def test_watch_should_wait_for_new_events(self) -> None:
+        feed = ChangeFeed()
+        timer = threading.Timer(0.05, feed.publish, (ChangeType.DELETE, "a"))
+        timer.start()
+        events = list(feed.watch(timeout=0.2))
+        timer.join()
+
+        self.assertEqual(
+            [(1, ChangeType.DELETE)], [(e.sequence, e.change) for e in events]
+        )
+
+    def test_watch_async_should_wait_for_new_events(self) -> None:
+        feed = ChangeFeed()
+
+        async def consume() -> t.List[str]:
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.01, feed.publish, ChangeType.INSERT, "a")
+            threading.Timer(0.05, feed.publish, (ChangeType.INSERT, "b")).start()
+            return [e.uuid async for e in feed.watch_async(since=0, timeout=0.2)]
+
+        self.assertEqual(["a", "b"], asyncio.run(consume()))
+
+
+class TestObservableRepository(unittest.TestCase):
+    def test_writes_should_publish_applied_changes_in_order(self) -> None:
+        repo = ObservableRepository(DictRepositoryAdapter())
+        repo.insert(KeyValueEntity("a", 1))
+        repo.update(KeyValueEntity("a", 2))
+        repo.insert_many([KeyValueEntity("a", 3), KeyValueEntity("b", 3)])
+        repo.delete("missing")
+        repo.delete_many(["a", "b"])
+
+        events = repo.feed.read(0)
+        self.assertEqual(
+            [("insert", "a"), ("update", "a"), ("insert", "b")]
+            + [("delete", "a"), ("delete", "b")],
+            [(e.change.value, e.uuid) for e in events],
+        )
+        self.assertEqual(2, events[1].entity.value)  # type: ignore
+        self.assertIsNone(events[-1].entity)
+        self.assertEqual([1, 2, 3, 4, 5], [e.sequence for e in events])
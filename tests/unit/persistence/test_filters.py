@@ -0,0 +1,99 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import unittest
+from unittest.mock import Mock
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.persistence.filters import BloomFilterRepository
+from mediapills.core.persistence.filters import BloomFilterViewRepository
+from mediapills.core.persistence.filters import CountingBloomFilter
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+
+
+class TestCountingBloomFilter(unittest.TestCase):
+    def test_filter_should_have_no_false_negatives(self) -> None:
+        bloom = CountingBloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add("k%d" % i)
+
+        self.assertTrue(all("k%d" % i in bloom for i in range(1000)))
+        self.assertEqual(1000, len(bloom))
+
+    def test_filter_should_keep_configured_error_rate(self) -> None:
+        bloom = CountingBloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add("k%d" % i)
+        false_positives = sum("x%d" % i in bloom for i in range(10000))
+
+        self.assertEqual(9586, bloom.size)
+        self.assertAlmostEqual(0.01, bloom.false_positive_rate, places=3)
+        self.assertLess(false_positives, 200)
+
+    def test_remove_should_forget_key(self) -> None:
+        bloom = CountingBloomFilter(capacity=10)
+        bloom.add("a")
+        bloom.add("b")
+        bloom.remove("a")
+
+        self.assertNotIn("a", bloom)
+        self.assertIn("b", bloom)
+
+    def test_constructor_should_validate_arguments(self) -> None:
+        self.assertRaises(ValueError, CountingBloomFilter, 0)
+        self.assertRaises(ValueError, CountingBloomFilter, 10, 1.0)
+
+
+class TestBloomFilterViewRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.backend = DictRepositoryAdapter({"a": 1, "b": 2})
+        self.backend.lookup = Mock(wraps=self.backend.lookup)  # type: ignore
+        self.backend.lookup_many = Mock(wraps=self.backend.lookup_many)  # type: ignore
+
+    def test_get_one_should_not_touch_backend_for_definite_miss(self) -> None:
+        repo = BloomFilterViewRepository(self.backend, capacity=100)
+
+        self.assertIsNone(repo.get_one("missing"))
+        self.assertEqual(1, repo.get_one("a").value)  # type: ignore
+        self.assertEqual(1, self.backend.lookup.call_count)  # type: ignore
+        self.assertEqual((1, 0), (repo.negatives, repo.false_positives))
+
+    def test_get_many_should_load_only_filter_passes(self) -> None:
+        repo = BloomFilterViewRepository(self.backend, capacity=100)
+
+        self.assertEqual(["b"], list(repo.get_many(["missing", "b"])))
+        self.backend.lookup_many.assert_called_once_with(["b"])  # type: ignore
+        self.assertEqual({}, repo.get_many(["missing"]))
+        self.assertEqual(2, repo.negatives)
+
+
+class TestBloomFilterRepository(unittest.TestCase):
+    def test_writes_should_keep_filter_in_sync(self) -> None:
+        repo = BloomFilterRepository(DictRepositoryAdapter(), capacity=100)
+        repo.insert(KeyValueEntity("a", 1))
+        repo.insert_many([KeyValueEntity("b", 2), KeyValueEntity("c", 3)])
+        repo.delete("a")
+        repo.delete_many(["b"])
+
+        self.assertIsNone(repo.get_one("a"))
+        self.assertIsNone(repo.get_one("b"))
+        self.assertEqual(3, repo.get_one("c").value)  # type: ignore
+        self.assertEqual(2, repo.negatives)
+        self.assertEqual(1, len(repo.filter))
@@ -0,0 +1,80 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import unittest
+
+from mediapills.core.persistence.indexes import HashIndex
+from mediapills.core.persistence.indexes import SortedIndex
+from mediapills.core.persistence.indexes import SortedKeyIndex
+
+
+class TestSortedKeyIndex(unittest.TestCase):
+    def test_add_and_discard_should_keep_keys_sorted(self) -> None:
+        index = SortedKeyIndex(["b", "d"])
+        index.add("c")
+        index.add("a")
+        index.add("c")
+        index.discard("d")
+        index.discard("missing")
+
+        self.assertEqual(["a", "b", "c"], index.after(None, 10))
+
+    def test_bulk_changes_should_rebuild_large_batches(self) -> None:
+        index = SortedKeyIndex()
+        index.update(["k%03d" % i for i in range(200)])
+        index.difference_update(["k%03d" % i for i in range(100, 200)])
+        index.update(["k150"])
+
+        self.assertEqual(101, len(index))
+        self.assertEqual(["k099", "k150"], index.after("k098", 5))
+
+    def test_range_should_return_half_open_range(self) -> None:
+        index = SortedKeyIndex(["a/1", "a/2", "b/1", "b/2", "c"])
+
+        self.assertEqual(["a/2", "b/1"], index.range("a/2", "b/2"))
+        self.assertEqual(["b/1"], index.range("b", limit=1))
+        self.assertEqual(["a/1"], index.range(stop="a/2"))
+        self.assertEqual([], index.range("c", "b"))
+
+
+class TestHashIndex(unittest.TestCase):
+    def test_lookup_should_follow_adds_and_removes(self) -> None:
+        index = HashIndex(lambda value: value.get("city"))
+        index.add("a", {"city": "Kyiv"})
+        index.add("b", {"city": "Kyiv"})
+        index.add("c", {})
+        index.remove("a", {"city": "Kyiv"})
+
+        self.assertEqual(["b"], index.lookup("Kyiv"))
+        self.assertEqual([], index.lookup(None))
+        self.assertEqual([], index.lookup("Lviv"))
+
+
+class TestSortedIndex(unittest.TestCase):
+    def test_range_should_return_keys_in_index_order(self) -> None:
+        index = SortedIndex(lambda value: value)
+        for uuid, age in [("a", 30), ("b", 20), ("c", 40), ("d", 30)]:
+            index.add(uuid, age)
+        index.remove("c", 40)
+
+        self.assertEqual(["a", "d"], index.lookup(30))
+        self.assertEqual(["b", "a", "d"], index.range(None, 31))
+        self.assertEqual(["a", "d"], index.range(25))
+        self.assertEqual([], index.range(31, 40))
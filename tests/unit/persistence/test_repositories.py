@@ -18,13 +18,27 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import sqlite3
 import sys
+import tempfile
+import threading
+import typing as t
 import unittest
 from unittest.mock import Mock
 from unittest.mock import patch
 
+from mediapills.core.domain.batches import EntityBatch
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.domain.queries import by_key
+from mediapills.core.domain.queries import Query
+from mediapills.core.persistence.indexes import HashIndex
+from mediapills.core.persistence.indexes import SortedIndex
+from mediapills.core.persistence.repositories import ConcurrentDictRepositoryAdapter
 from mediapills.core.persistence.repositories import DictRepositoryAdapter
 from mediapills.core.persistence.repositories import EnvironRepository
+from mediapills.core.persistence.repositories import parse_env_value
+from mediapills.core.persistence.repositories import SQLiteRepositoryAdapter
 
 _MODULE_LOCATION_OS_ENVIRON_ = "mediapills.core.persistence.repositories.os.environ"
 
@@ -40,11 +54,85 @@ def test_find_one_should_return_one(self) -> None:
 
         self.assertEqual("val", repo.get_one("key").value)  # type: ignore
 
+    def test_get_many_should_return_existing(self) -> None:
+        repo = DictRepositoryAdapter({"key": "val", "other": "val"})
+        found = repo.get_many(["key", "missing"])
+
+        self.assertEqual(["key"], list(found))
+        self.assertEqual("val", found["key"].value)
+
+    def test_get_one_should_not_scan(self) -> None:
+        repo = DictRepositoryAdapter({"key": "val"})
+        repo.iter_all = Mock()  # type: ignore[method-assign]
+
+        self.assertEqual("val", repo.get_one("key").value)  # type: ignore
+        repo.iter_all.assert_not_called()
+
     def test_find_all_should_return_data(self) -> None:
         repo = DictRepositoryAdapter({"key": "val"})
 
         self.assertEqual(1, len(repo.get_all()))
 
+    def test_find_all_should_apply_limit_and_offset(self) -> None:
+        repo = DictRepositoryAdapter({"k%d" % i: i for i in range(10)})
+        data = repo.get_all(limit=3, offset=4)
+
+        self.assertEqual(["k4", "k5", "k6"], [entity.uuid for entity in data])
+        self.assertEqual(2, len(repo.get_all(offset=8)))
+        self.assertEqual(0, len(repo.get_all(limit=0)))
+
+    def test_iter_all_should_stream_entities(self) -> None:
+        repo = DictRepositoryAdapter({"key": "val", "other": "val"})
+        stream = repo.iter_all()
+
+        self.assertEqual("key", next(stream).uuid)
+        self.assertEqual(["other"], [entity.uuid for entity in stream])
+
+    def test_find_should_select_matching_rows(self) -> None:
+        repo = DictRepositoryAdapter({"a/1": 1, "b/1": 2, "a/2": 3})
+        found = repo.find(Query(prefix="a/", where=lambda v: v > 1, select=str))
+
+        self.assertEqual([("a/2", "3")], [(e.uuid, e.value) for e in found])
+
+    def test_get_prefix_should_seek_in_key_index(self) -> None:
+        repo = DictRepositoryAdapter(
+            {"tenant/1/a": 1, "tenant/2/a": 2, "tenant/1/b": 3, "tenant/10": 4}
+        )
+        repo.insert(KeyValueEntity("tenant/1/c", 5))
+        repo.delete("tenant/1/a")
+
+        self.assertEqual(
+            ["tenant/1/b", "tenant/1/c"], [e.uuid for e in repo.get_prefix("tenant/1/")]
+        )
+        self.assertEqual(["tenant/1/b"], [e.uuid for e in repo.get_prefix("t", 1)])
+        self.assertEqual(
+            [4], [e.value for e in repo.get_range("tenant/10", "tenant/2")]
+        )
+
+    def test_find_should_scan_only_key_range(self) -> None:
+        repo = DictRepositoryAdapter({"a/1": 1, "b/1": 2, "a/2": 3})
+        repo._rows = Mock(side_effect=AssertionError)  # type: ignore
+        found = repo.find(Query(prefix="a/"))
+
+        self.assertEqual(["a/1", "a/2"], [e.uuid for e in found])
+
+    def test_get_page_should_follow_cursor_in_key_order(self) -> None:
+        repo = DictRepositoryAdapter({"k%02d" % i: i for i in range(10, 0, -1)})
+        first = repo.get_page(limit=4)
+        repo.insert(KeyValueEntity(uuid="k00", val=0))
+        repo.delete("k05")
+        second = repo.get_page(after=first.cursor, limit=4)
+        last = repo.get_page(after=second.cursor, limit=4)
+
+        self.assertEqual(["k01", "k02", "k03", "k04"], [e.uuid for e in first.entities])
+        self.assertEqual(
+            ["k06", "k07", "k08", "k09"], [e.uuid for e in second.entities]
+        )
+        self.assertEqual(["k10"], [e.uuid for e in last.entities])
+        self.assertIsNone(last.cursor)
+        with self.assertRaises(ValueError):
+            repo.get_page(limit=0)
+
     def test_insert_should_add(self) -> None:
         repo = DictRepositoryAdapter({})
         record = Mock()
@@ -70,12 +158,202 @@ def test_delete_should_skip(self) -> None:
 
         self.assertFalse(repo.delete("key"))
 
+    def test_get_batch_should_return_columns(self) -> None:
+        repo = DictRepositoryAdapter({"a": 1, "b": 2, "c": 3})
+        batch = repo.get_batch(limit=2, offset=1)
+
+        self.assertEqual((["b", "c"], [2, 3]), (batch.uuids, batch.values))
+
+    def test_bulk_writes_should_accept_batch(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter({"a": 1})
+        inserted = repo.insert_many(EntityBatch(["a", "b"], [2, 2]))
+        updated = repo.update_many(EntityBatch(["b"], [3]))
+
+        self.assertEqual((["b"], ["a"]), (inserted.applied, list(inserted.failed)))
+        self.assertEqual(["b"], updated.applied)
+        self.assertEqual({"a": 1, "b": 3}, {e.uuid: e.value for e in repo.get_all()})
+
+    def test_insert_many_should_report_conflicts(self) -> None:
+        repo = DictRepositoryAdapter({"key": "val"})
+        result = repo.insert_many(
+            [KeyValueEntity(uuid="key", val="new"), KeyValueEntity(uuid="a", val=1)]
+        )
+
+        self.assertEqual(["a"], result.applied)
+        self.assertEqual(["key"], list(result.failed))
+        self.assertIsInstance(result.failed["key"], KeyError)
+        self.assertEqual("val", repo.get_one("key").value)  # type: ignore
+
+    def test_update_many_should_report_missing(self) -> None:
+        repo = DictRepositoryAdapter({"key": "val"})
+        result = repo.update_many(
+            [KeyValueEntity(uuid="key", val="new"), KeyValueEntity(uuid="a", val=1)]
+        )
+
+        self.assertEqual(["key"], result.applied)
+        self.assertEqual(["a"], list(result.failed))
+        self.assertEqual("new", repo.get_one("key").value)  # type: ignore
+        self.assertIsNone(repo.get_one("a"))
+
+    def test_update_fields_many_should_write_only_values(self) -> None:
+        repo = DictRepositoryAdapter({"key": "val", "other": "val"})
+        repo.update = Mock(wraps=repo.update)  # type: ignore
+        result = repo.update_fields_many(
+            {"key": {"value": "new"}, "other": {"updated_at": 1}, "a": {}}
+        )
+
+        self.assertEqual(["key", "other"], result.applied)
+        self.assertEqual(["a"], list(result.failed))
+        self.assertEqual("new", repo.get_one("key").value)  # type: ignore
+        self.assertEqual("val", repo.get_one("other").value)  # type: ignore
+        self.assertTrue(repo.update_fields("other", {"value": "new"}))
+        self.assertFalse(repo.update_fields("a", {"value": 1}))
+        repo.update.assert_not_called()  # type: ignore
+
+    def test_delete_many_should_report_missing(self) -> None:
+        repo = DictRepositoryAdapter({"key": "val", "other": "val"})
+        result = repo.delete_many(["key", "missing", "key"])
+
+        self.assertEqual(["key"], result.applied)
+        self.assertEqual(["missing"], list(result.failed))
+        self.assertEqual(["other"], [entity.uuid for entity in repo.get_all()])
+
+    def test_find_by_should_follow_writes(self) -> None:
+        repo = DictRepositoryAdapter(
+            {"a": {"city": "Kyiv", "age": 30}},
+            indexes={
+                "city": HashIndex(lambda value: value["city"]),
+                "age": SortedIndex(lambda value: value["age"]),
+            },
+        )
+        repo.insert(KeyValueEntity("b", {"city": "Lviv", "age": 20}))
+        repo.insert_many([KeyValueEntity("c", {"city": "Kyiv", "age": 40})])
+        repo.update(KeyValueEntity("a", {"city": "Lviv", "age": 35}))
+        repo.update_many([KeyValueEntity("b", {"city": "Odesa", "age": 25})])
+
+        self.assertEqual(["c"], [e.uuid for e in repo.find_by("city", "Kyiv")])
+        self.assertEqual(["a"], [e.uuid for e in repo.find_by("city", "Lviv")])
+        self.assertEqual(["b", "a"], [e.uuid for e in repo.find_range("age", 21, 40)])
+
+        repo.delete("c")
+        repo.delete_many(["a"])
+
+        self.assertEqual([], repo.find_by("city", "Kyiv"))
+        self.assertEqual(["b"], [e.uuid for e in repo.find_range("age")])
+
+    def test_find_range_should_require_sorted_index(self) -> None:
+        repo = DictRepositoryAdapter(indexes={"value": HashIndex(lambda value: value)})
+
+        self.assertRaises(TypeError, repo.find_range, "value", 0, 1)
+        self.assertRaises(KeyError, repo.find_by, "missing", 0)
+
+
+class TestConcurrentDictRepositoryAdapter(unittest.TestCase):
+    def run_threads(self, count: int, target: t.Callable[[int], None]) -> None:
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_insert_race_should_succeed_once_per_key(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter(stripes=4)
+        wins: t.List[str] = []
+
+        def insert(worker: int) -> None:
+            for i in range(500):
+                try:
+                    repo.insert(KeyValueEntity(uuid="k%d" % i, val=worker))
+                except KeyError:
+                    continue
+                wins.append("k%d" % i)
+
+        self.run_threads(8, insert)
+
+        self.assertEqual(500, len(wins))
+        self.assertEqual(500, len(set(wins)))
+
+    def test_scans_should_not_fail_during_writes(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter({"k%d" % i: i for i in range(100)})
+        sizes: t.List[int] = []
+
+        def work(worker: int) -> None:
+            for i in range(200):
+                if worker % 2:
+                    repo.insert_many([KeyValueEntity("w%d-%d" % (worker, i), i)])
+                    repo.delete_many(["w%d-%d" % (worker, i)])
+                else:
+                    sizes.append(len(repo.get_all()))
+                    sizes.append(len(list(repo.find(Query(where=bool)))))
+                    sizes.append(len(repo.get_batch()))
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            self.run_threads(4, work)
+        finally:
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(1200, len(sizes))
+        self.assertEqual(100, len(repo.get_all()))
+
+    def test_get_page_should_see_concurrent_writes(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter({"b": 1})
+        repo.get_page()
+        repo.insert_many([KeyValueEntity("a", 0), KeyValueEntity("c", 2)])
+
+        self.assertEqual(["a", "b", "c"], [e.uuid for e in repo.get_page().entities])
+
+    def test_find_by_should_see_concurrent_writes(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter(
+            stripes=4, indexes={"parity": HashIndex(lambda value: value % 2)}
+        )
+
+        def insert(worker: int) -> None:
+            repo.insert_many(
+                [KeyValueEntity("w%d-%d" % (worker, i), i) for i in range(100)]
+            )
+
+        self.run_threads(4, insert)
+
+        self.assertEqual(200, len(repo.find_by("parity", 0)))
+
+    def test_get_prefix_should_see_concurrent_writes(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter({"a/1": 1})
+        repo.get_prefix("a/")
+        repo.insert_many([KeyValueEntity("a/2", 2), KeyValueEntity("b/1", 3)])
+
+        self.assertEqual(["a/1", "a/2"], [e.uuid for e in repo.get_prefix("a/")])
+
+    def test_scans_should_not_wait_for_writers(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter({"a": 1, "b": 2}, stripes=2)
+        repo._locks = [Mock(wraps=lock) for lock in repo._locks]
+
+        self.assertEqual(2, len(repo.get_all()))
+        self.assertEqual(2, len(list(repo.find(Query()))))
+        self.assertEqual(2, len(repo.get_batch()))
+        for lock in repo._locks:
+            lock.acquire.assert_not_called()
+
+    def test_lookup_should_read_without_locking(self) -> None:
+        repo = ConcurrentDictRepositoryAdapter({"key": None})
+
+        self.assertIsNotNone(repo.get_one("key"))
+        self.assertEqual(["key"], list(repo.get_many(["key", "missing"])))
+
 
 class TestEnvironRepository(unittest.TestCase):
     MOCK_ENVIRON = {"key": "value"}
     MOCK_ENVIRON_LOWER_CASE = {"lower_case_key": "lower_case_value"}
     MOCK_ENVIRON_UPPER_CASE = {"UPPER_CASE_KEY": "upper_case_value"}
 
+    @patch(_MODULE_LOCATION_OS_ENVIRON_, {"APP_B": "2", "APP_A": "1", "HOME": "/root"})
+    def test_get_prefix_should_return_names_in_order(self) -> None:
+        repo = EnvironRepository()
+
+        self.assertEqual(["APP_A", "APP_B"], [e.uuid for e in repo.get_prefix("APP_")])
+        self.assertEqual(["HOME"], [e.uuid for e in repo.get_range("B", limit=1)])
+
     @patch(_MODULE_LOCATION_OS_ENVIRON_, MOCK_ENVIRON)
     def test_find_one_should_return_one(self) -> None:
         repo = EnvironRepository()
@@ -95,6 +373,14 @@ def test_find_all_should_return_all(self) -> None:
         self.assertEqual(1, len(data))
         self.assertEqual(key, data[0].uuid)
 
+    @patch(_MODULE_LOCATION_OS_ENVIRON_, {"a": "1", "b": "2", "c": "3"})
+    def test_find_all_should_apply_limit_and_offset(self) -> None:
+        repo = EnvironRepository()
+
+        self.assertEqual(["2"], [entity.value for entity in repo.get_all(1, 1)])
+        self.assertEqual(3, len(list(repo.iter_all())))
+        self.assertEqual(["b"], [e.uuid for e in repo.find(Query(where="2".__eq__))])
+
     def test_find_one_wrong_key_should_return_none(self) -> None:
         repo = EnvironRepository()
         val = repo.get_one("wrong_key")
@@ -122,3 +408,200 @@ def test_get_one_should_handle_upper_case_sensitivity(self) -> None:
         self.assertIsNotNone(obj)
         self.assertEqual("upper_case_value", obj.value)  # type: ignore
         self.assertIsNone(repo.get_one("upper_case_key"))
+
+
+class TestCachedEnvironRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.names = ["MEDIAPILLS_TEST_PORT", "MEDIAPILLS_TEST_DEBUG"]
+
+    def tearDown(self) -> None:
+        for name in self.names:
+            os.environ.pop(name, None)
+
+    def test_get_all_should_reuse_snapshot_until_environ_changes(self) -> None:
+        repo = EnvironRepository()
+        repo.get_all()
+        snapshot = repo._snapshot
+        repo.get_all()
+
+        self.assertIs(snapshot, repo._snapshot)
+        os.environ["MEDIAPILLS_TEST_PORT"] = "8080"
+        self.assertIn("MEDIAPILLS_TEST_PORT", [e.uuid for e in repo.get_all()])
+        del os.environ["MEDIAPILLS_TEST_PORT"]
+        self.assertEqual([], repo.get_prefix("MEDIAPILLS_TEST_"))
+
+    def test_view_should_convert_values_once(self) -> None:
+        os.environ.update(
+            {"MEDIAPILLS_TEST_PORT": "8080", "MEDIAPILLS_TEST_DEBUG": "on"}
+        )
+        repo = EnvironRepository()
+        view = repo.view("MEDIAPILLS_TEST_")
+
+        self.assertEqual({"PORT": "8080", "DEBUG": "on"}, dict(view.values))
+        self.assertIs(view, repo.view("MEDIAPILLS_TEST_"))
+        with self.assertRaises(TypeError):
+            view.values["PORT"] = 1  # type: ignore
+        self.assertEqual(8080, repo.view("MEDIAPILLS_TEST_", {"PORT": int})["PORT"])
+        parsed = repo.view("MEDIAPILLS_TEST_", convert=parse_env_value)
+        self.assertEqual({"PORT": 8080, "DEBUG": True}, dict(parsed.values))
+
+        os.environ["MEDIAPILLS_TEST_PORT"] = "9090"
+        self.assertEqual("8080", view["PORT"])
+        self.assertEqual("9090", repo.view("MEDIAPILLS_TEST_")["PORT"])
+
+    def test_snapshot_should_not_patch_os_environ(self) -> None:
+        environ_type = type(os.environ)
+        repo = EnvironRepository()
+        os.environ["MEDIAPILLS_TEST_PORT"] = "8080"
+
+        self.assertEqual("8080", repo.view("MEDIAPILLS_TEST_")["PORT"])
+        self.assertIs(environ_type, type(os.environ))
+
+    def test_parse_env_value_should_guess_type(self) -> None:
+        self.assertEqual(
+            [True, False, 1, -2, 0.5, 1e3, "text", ""],
+            [
+                parse_env_value(v)
+                for v in ["Yes", "off", "1", "-2", "0.5", "1e3", "text", ""]
+            ],
+        )
+
+    def test_parse_env_value_should_keep_ambiguous_numbers_as_text(self) -> None:
+        values = ["007", "02134", "1_000", "nan", "inf", "-Infinity", " 1", "0x10"]
+
+        self.assertEqual(values, [parse_env_value(v) for v in values])
+
+
+class TestSQLiteRepositoryAdapter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "db.sqlite")
+        self.repo = SQLiteRepositoryAdapter(self.path)
+
+    def tearDown(self) -> None:
+        self.repo.close()
+        self.tmp.cleanup()
+
+    def test_insert_should_persist_across_instances(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="key", val={"a": [1, 2]}))
+        other = SQLiteRepositoryAdapter(self.path)
+        self.addCleanup(other.close)
+
+        self.assertEqual({"a": [1, 2]}, other.get_one("key").value)  # type: ignore
+
+    def test_insert_should_raise_on_conflict(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="key", val=1))
+
+        with self.assertRaises(KeyError):
+            self.repo.insert(KeyValueEntity(uuid="key", val=2))
+
+    def test_update_and_delete_should_handle_missing(self) -> None:
+        with self.assertRaises(KeyError):
+            self.repo.update(KeyValueEntity(uuid="key", val=2))
+
+        self.assertFalse(self.repo.delete("key"))
+
+    def test_update_should_replace(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="key", val=1))
+        self.repo.update(KeyValueEntity(uuid="key", val=2))
+
+        self.assertEqual(2, self.repo.get_one("key").value)  # type: ignore
+        self.assertTrue(self.repo.delete("key"))
+        self.assertIsNone(self.repo.get_one("key"))
+
+    def test_get_all_should_paginate_in_key_order(self) -> None:
+        self.repo.insert_many(KeyValueEntity("k%02d" % i, i) for i in range(20))
+        data = self.repo.get_all(limit=3, offset=5)
+
+        self.assertEqual(["k05", "k06", "k07"], [entity.uuid for entity in data])
+        self.assertEqual(20, len(self.repo.get_all()))
+
+    def test_bulk_writes_should_report_failures(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=1))
+        inserted = self.repo.insert_many(
+            [KeyValueEntity("a", 2), KeyValueEntity("b", 2)]
+        )
+        updated = self.repo.update_many(
+            [KeyValueEntity("b", 3), KeyValueEntity("c", 3)]
+        )
+        deleted = self.repo.delete_many(["a", "c"])
+
+        self.assertEqual((["b"], ["a"]), (inserted.applied, list(inserted.failed)))
+        self.assertEqual((["b"], ["c"]), (updated.applied, list(updated.failed)))
+        self.assertEqual((["a"], ["c"]), (deleted.applied, list(deleted.failed)))
+        self.assertEqual(
+            {"b": 3}, {k: v.value for k, v in self.repo.get_many(["a", "b"]).items()}
+        )
+
+    def test_bulk_insert_race_should_succeed_once_per_key(self) -> None:
+        wins: t.List[str] = []
+        errors: t.List[Exception] = []
+
+        def insert() -> None:
+            try:
+                for i in range(50):
+                    keys = ["k%d-%d" % (i, j) for j in range(10)]
+                    result = self.repo.insert_many(KeyValueEntity(k, i) for k in keys)
+                    wins.extend(result.applied)
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=insert) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(500, len(wins))
+        self.assertEqual(500, len(set(wins)))
+
+    def test_bulk_writes_should_report_integrity_errors_as_failures(self) -> None:
+        path = os.path.join(self.tmp.name, "checked.sqlite")
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE entities (uuid TEXT PRIMARY KEY CHECK (length(uuid) < 4),"
+                " value BLOB) WITHOUT ROWID"
+            )
+        conn.close()
+        repo = SQLiteRepositoryAdapter(path)
+        self.addCleanup(repo.close)
+        result = repo.insert_many([KeyValueEntity("a", 1), KeyValueEntity("long", 2)])
+
+        self.assertEqual([], result.applied)
+        self.assertEqual(["a", "long"], list(result.failed))
+        self.assertIsInstance(result.failed["a"], sqlite3.IntegrityError)
+        self.assertEqual([], repo.get_all())
+
+    def test_find_should_push_key_range_and_order_down(self) -> None:
+        self.repo.insert_many(KeyValueEntity("k%02d" % i, i) for i in range(20))
+        query = Query(prefix="k1", order_by=by_key, reverse=True, limit=3)
+        filtered = Query(
+            start="k05", where=lambda v: v % 5 == 0, order_by=lambda k, v: -v
+        )
+
+        self.assertEqual(["k19", "k18", "k17"], [e.uuid for e in self.repo.find(query)])
+        self.assertEqual([15, 10, 5], [e.value for e in self.repo.find(filtered)])
+
+    def test_get_prefix_should_push_key_range_down(self) -> None:
+        self.repo.insert_many(KeyValueEntity("k%02d" % i, i) for i in range(20))
+
+        self.assertEqual([10, 11], [e.value for e in self.repo.get_prefix("k1", 2)])
+
+    def test_get_page_should_seek_by_primary_key(self) -> None:
+        self.repo.insert_many(KeyValueEntity("k%02d" % i, i) for i in range(5))
+        first = self.repo.get_page(limit=3)
+        second = self.repo.get_page(after=first.cursor, limit=3)
+
+        self.assertEqual(["k00", "k01", "k02"], [e.uuid for e in first.entities])
+        self.assertEqual(["k03", "k04"], [e.uuid for e in second.entities])
+        self.assertIsNone(second.cursor)
+
+    def test_threads_should_share_database(self) -> None:
+        thread = threading.Thread(
+            target=self.repo.insert, args=(KeyValueEntity(uuid="key", val=1),)
+        )
+        thread.start()
+        thread.join()
+
+        self.assertEqual(1, self.repo.get_one("key").value)  # type: ignore
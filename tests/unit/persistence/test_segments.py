@@ -0,0 +1,123 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import tempfile
+import unittest
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.persistence.segments import LogStructuredRepositoryAdapter
+
+
+class TestLogStructuredRepositoryAdapter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "data.log")
+        self.repo = LogStructuredRepositoryAdapter(self.path)
+
+    def tearDown(self) -> None:
+        self.repo.close()
+        self.tmp.cleanup()
+
+    def reopen(self) -> LogStructuredRepositoryAdapter:
+        self.repo.close()
+        self.repo = LogStructuredRepositoryAdapter(self.path)
+        return self.repo
+
+    def test_writes_should_append_and_read_back(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=[1, 2]))
+        self.repo.update(KeyValueEntity(uuid="a", val=b"x" * 100))
+        self.repo.insert(KeyValueEntity(uuid="b", val="b"))
+
+        self.assertEqual(b"x" * 100, self.repo.get_one("a").value)  # type: ignore
+        self.assertEqual(["a", "b"], [entity.uuid for entity in self.repo.get_all()])
+        self.assertGreater(self.repo.dead_bytes, 0)
+
+    def test_iter_all_should_scan_key_snapshot_during_writes(self) -> None:
+        self.repo.insert_many(KeyValueEntity(uuid="k%d" % i, val=i) for i in range(3))
+        uuids = []
+        for entity in self.repo.iter_all():
+            uuids.append(entity.uuid)
+            self.repo.insert(KeyValueEntity(uuid="n%s" % entity.uuid, val=0))
+            self.repo.delete("k2")
+
+        self.assertEqual(["k0", "k1"], uuids)
+
+    def test_insert_update_delete_should_validate_keys(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=1))
+
+        with self.assertRaises(KeyError):
+            self.repo.insert(KeyValueEntity(uuid="a", val=1))
+        with self.assertRaises(KeyError):
+            self.repo.update(KeyValueEntity(uuid="b", val=1))
+        self.assertTrue(self.repo.delete("a"))
+        self.assertFalse(self.repo.delete("a"))
+        self.assertIsNone(self.repo.get_one("a"))
+
+    def test_reopen_should_rebuild_index_from_hint_and_tail(self) -> None:
+        self.repo.insert_many(KeyValueEntity("k%d" % i, i) for i in range(10))
+        self.repo.close()
+        self.assertTrue(os.path.exists(self.path + ".hint"))
+        self.repo = LogStructuredRepositoryAdapter(self.path)
+        self.repo.delete_many(["k0", "k1"])
+        self.repo.update_many([KeyValueEntity("k2", "two")])
+        self.repo._file.close()  # simulate crash without writing hint
+        self.repo = LogStructuredRepositoryAdapter(self.path)
+
+        self.assertEqual(8, len(self.repo.get_all()))
+        self.assertEqual("two", self.repo.get_one("k2").value)  # type: ignore
+
+    def test_reopen_should_drop_torn_tail_record(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=1))
+        self.repo.close()
+        with open(self.path, "ab") as f:
+            f.write(b"\x00\x05\x00")
+        self.repo = LogStructuredRepositoryAdapter(self.path)
+
+        self.assertEqual(1, self.repo.get_one("a").value)  # type: ignore
+        self.repo.insert(KeyValueEntity(uuid="b", val=2))
+        self.assertEqual(2, self.reopen().get_one("b").value)  # type: ignore
+
+    def test_compact_should_drop_dead_records(self) -> None:
+        for i in range(20):
+            self.repo.insert(KeyValueEntity(uuid="k%d" % i, val=i))
+            self.repo.update(KeyValueEntity(uuid="k%d" % i, val=i * 2))
+        self.repo.delete("k0")
+        size = self.repo.size
+        self.repo.compact()
+
+        self.assertLess(self.repo.size, size)
+        self.assertEqual(0, self.repo.dead_bytes)
+        self.assertEqual(38, self.reopen().get_one("k19").value)  # type: ignore
+        self.assertEqual(19, len(self.repo.get_all()))
+
+    def test_auto_compact_should_run_in_background(self) -> None:
+        self.repo.close()
+        self.repo = LogStructuredRepositoryAdapter(
+            self.path, compact_ratio=0.5, compact_min_size=0
+        )
+        for i in range(50):
+            self.repo.insert(KeyValueEntity(uuid="k", val=i))
+            self.repo.delete("k")
+        self.repo.insert(KeyValueEntity(uuid="k", val="last"))
+        self.reopen()
+
+        self.assertLess(self.repo.size, 500)
+        self.assertEqual("last", self.repo.get_one("k").value)  # type: ignore
@@ -0,0 +1,129 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import unittest
+from unittest.mock import Mock
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+from mediapills.core.persistence.shards import ConsistentHashRing
+from mediapills.core.persistence.shards import ShardedRepository
+
+
+class TestConsistentHashRing(unittest.TestCase):
+    def test_get_should_be_stable_and_spread_keys(self) -> None:
+        ring = ConsistentHashRing(["a", "b", "c"])
+        owners = [ring.get("k%d" % i) for i in range(3000)]
+
+        self.assertEqual(owners, [ring.get("k%d" % i) for i in range(3000)])
+        for node in ("a", "b", "c"):
+            self.assertGreater(owners.count(node), 600)
+
+    def test_add_should_move_only_keys_of_new_node(self) -> None:
+        ring = ConsistentHashRing(["a", "b", "c"])
+        before = {"k%d" % i: ring.get("k%d" % i) for i in range(3000)}
+        ring.add("d")
+        moved = [k for k, node in before.items() if ring.get(k) != node]
+
+        self.assertTrue(all(ring.get(k) == "d" for k in moved))
+        self.assertLess(len(moved), 1200)
+
+    def test_remove_should_reassign_keys(self) -> None:
+        ring = ConsistentHashRing(["a", "b"])
+        ring.remove("a")
+
+        self.assertEqual({"b"}, ring.nodes)
+        self.assertEqual("b", ring.get("key"))
+        with self.assertRaises(LookupError):
+            ConsistentHashRing().get("key")
+
+
+class TestShardedRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.shards = {name: DictRepositoryAdapter() for name in ("a", "b", "c")}
+        self.repo = ShardedRepository(self.shards)
+        self.repo.insert_many(KeyValueEntity("k%d" % i, i) for i in range(100))
+
+    def test_insert_should_route_to_one_shard(self) -> None:
+        sizes = [len(shard.get_all()) for shard in self.shards.values()]
+
+        self.assertEqual(100, sum(sizes))
+        self.assertTrue(all(sizes))
+        self.assertEqual(7, self.repo.get_one("k7").value)  # type: ignore
+
+    def test_get_many_should_call_each_shard_once(self) -> None:
+        for shard in self.shards.values():
+            shard.get_many = Mock(wraps=shard.get_many)  # type: ignore
+        found = self.repo.get_many("k%d" % i for i in range(50))
+
+        self.assertEqual(50, len(found))
+        for shard in self.shards.values():
+            shard.get_many.assert_called_once()  # type: ignore
+
+    def test_get_all_should_paginate_across_shards(self) -> None:
+        everything = [entity.uuid for entity in self.repo.get_all()]
+        pages = [self.repo.get_all(limit=30, offset=o) for o in range(0, 100, 30)]
+
+        self.assertEqual(everything, [e.uuid for page in pages for e in page])
+        self.assertEqual(100, len(set(everything)))
+
+    def test_get_page_should_merge_shard_pages(self) -> None:
+        uuids = []
+        cursor = None
+        for _ in range(10):
+            page = self.repo.get_page(after=cursor, limit=15)
+            uuids.extend(entity.uuid for entity in page.entities)
+            cursor = page.cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(sorted("k%d" % i for i in range(100)), uuids)
+
+    def test_bulk_writes_should_merge_results(self) -> None:
+        result = self.repo.delete_many(["k1", "k2", "missing"])
+        updated = self.repo.update_many([KeyValueEntity("k3", "x")])
+
+        self.assertEqual(["missing"], list(result.failed))
+        self.assertEqual(["k3"], updated.applied)
+        self.assertTrue(self.repo.delete("k3"))
+        self.assertEqual(97, len(self.repo.get_all()))
+
+    def test_add_shard_should_move_owned_keys(self) -> None:
+        moved = self.repo.add_shard("d", DictRepositoryAdapter()).applied
+
+        self.assertEqual(len(moved), len(self.repo.shards["d"].get_all()))
+        self.assertGreater(len(moved), 0)
+        self.assertEqual(100, len(self.repo.get_all()))
+        self.assertEqual(42, self.repo.get_one("k42").value)  # type: ignore
+
+    def test_add_shard_should_overwrite_stale_rows_of_new_shard(self) -> None:
+        stale = DictRepositoryAdapter({"k%d" % i: "stale" for i in range(100)})
+        result = self.repo.add_shard("d", stale)
+        moved = sorted(result.applied)
+
+        self.assertGreater(len(moved), 0)
+        self.assertEqual({}, result.failed)
+        self.assertEqual(
+            [int(uuid[1:]) for uuid in moved],
+            [self.repo.get_one(uuid).value for uuid in moved],  # type: ignore
+        )
+        for name in "abc":
+            shard = self.repo.shards[name]
+            self.assertEqual({}, shard.get_many(moved))
@@ -0,0 +1,194 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import multiprocessing
+import os
+import sys
+import typing as t
+import unittest
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+from unittest.mock import patch
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.persistence import shared
+from mediapills.core.persistence.shared import _MAGIC
+from mediapills.core.persistence.shared import _VERSION
+from mediapills.core.persistence.shared import SharedMemoryRepositoryAdapter
+
+
+def read_in_child(name: str, uuid: str, queue: t.Any) -> None:
+    repo = SharedMemoryRepositoryAdapter(name=name, create=False)
+    entity = repo.get_one(uuid)
+    queue.put(None if entity is None else entity.value)  # type: ignore[attr-defined]
+    repo.close()
+
+
+def insert_in_child(name: str, lock: t.Any, uuid: str) -> None:
+    repo = SharedMemoryRepositoryAdapter(name=name, create=False, lock=lock)
+    repo.insert(KeyValueEntity(uuid=uuid, val=uuid))
+    repo.close()
+
+
+class TestSharedMemoryRepositoryAdapter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.repo = SharedMemoryRepositoryAdapter(capacity=16, data_size=4096)
+
+    def tearDown(self) -> None:
+        self.repo.close()
+        self.repo.unlink()
+
+    def test_insert_update_delete_should_manage_rows(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val={"x": 1}))
+        self.repo.insert(KeyValueEntity(uuid="b", val=2))
+        self.repo.update(KeyValueEntity(uuid="a", val="new"))
+
+        self.assertEqual("new", self.repo.get_one("a").value)  # type: ignore
+        self.assertTrue(self.repo.delete("b"))
+        self.assertFalse(self.repo.delete("b"))
+        self.assertIsNone(self.repo.get_one("b"))
+        self.assertEqual(["a"], [entity.uuid for entity in self.repo.get_all()])
+        self.assertEqual(1, len(self.repo))
+
+    def test_insert_and_update_should_validate_keys(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=1))
+
+        with self.assertRaises(KeyError):
+            self.repo.insert(KeyValueEntity(uuid="a", val=1))
+        with self.assertRaises(KeyError):
+            self.repo.update(KeyValueEntity(uuid="b", val=1))
+
+    def test_insert_should_reuse_deleted_slots_and_report_full_table(self) -> None:
+        for i in range(15):
+            self.repo.insert(KeyValueEntity(uuid="k%d" % i, val=i))
+        self.repo.delete("k3")
+        self.repo.insert(KeyValueEntity(uuid="k3", val="again"))
+
+        with self.assertRaises(MemoryError):
+            self.repo.insert(KeyValueEntity(uuid="k99", val=0))
+        self.assertEqual(15, len(self.repo.get_all(limit=20)))
+        self.assertEqual("again", self.repo.get_one("k3").value)  # type: ignore
+
+    def test_insert_should_report_full_data_region(self) -> None:
+        with self.assertRaises(MemoryError):
+            self.repo.insert(KeyValueEntity(uuid="big", val=b"x" * 5000))
+
+    def test_get_buffer_should_expose_value_bytes(self) -> None:
+        repo = SharedMemoryRepositoryAdapter(
+            capacity=4, data_size=64, dumps=bytes, loads=bytes
+        )
+        self.addCleanup(repo.unlink)
+        self.addCleanup(repo.close)
+        repo.insert(KeyValueEntity(uuid="a", val=b"raw"))
+        with repo.get_buffer("a") as view:  # type: ignore[union-attr]
+            self.assertIsInstance(view, memoryview)
+            self.assertEqual(b"raw", view)
+
+    def test_attach_should_share_rows_between_processes(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=[1, 2, 3]))
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(
+            target=read_in_child, args=(self.repo.name, "a", queue)
+        )
+        process.start()
+        value = queue.get(timeout=30)
+        process.join()
+
+        self.assertEqual([1, 2, 3], value)
+        self.assertEqual(0, process.exitcode)
+
+    def test_attached_writers_should_share_creator_lock(self) -> None:
+        processes = [
+            multiprocessing.Process(
+                target=insert_in_child, args=(self.repo.name, self.repo.lock, uuid)
+            )
+            for uuid in ("a", "b")
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=30)
+
+        self.assertEqual([0, 0], [process.exitcode for process in processes])
+        self.assertEqual(["a", "b"], sorted(e.uuid for e in self.repo.get_all()))
+
+    def test_attach_without_lock_should_be_read_only(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=1))
+        repo = SharedMemoryRepositoryAdapter(self.repo.name, create=False)
+        self.addCleanup(repo.close)
+
+        self.assertEqual(1, repo.get_one("a").value)  # type: ignore
+        with self.assertRaises(RuntimeError):
+            repo.insert(KeyValueEntity(uuid="b", val=2))
+        with self.assertRaises(RuntimeError):
+            repo.delete("a")
+
+    def test_reads_should_give_up_on_unfinished_write(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=1))
+        _VERSION.pack_into(self.repo._buf, len(_MAGIC), 1)
+
+        with patch.object(shared, "_READ_TIMEOUT", 0.05):
+            with self.assertRaises(TimeoutError):
+                self.repo.get_one("a")
+            with self.assertRaises(TimeoutError):
+                self.repo.get_all()
+        _VERSION.pack_into(self.repo._buf, len(_MAGIC), 2)
+        self.assertEqual(["a"], [e.uuid for e in self.repo.get_all()])
+
+    @unittest.skipUnless(
+        hasattr(os, "fork") and sys.version_info < (3, 13),
+        "attaching unregisters from the resource tracker before Python 3.13",
+    )
+    def test_forked_child_should_keep_creator_tracker_registration(self) -> None:
+        self.repo.insert(KeyValueEntity(uuid="a", val=1))
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                with patch.object(resource_tracker, "unregister") as unregister:
+                    repo = SharedMemoryRepositoryAdapter(self.repo.name, create=False)
+                    if repo.get_one("a").value == 1 and not unregister.called:
+                        code = 0
+                    repo.close()
+            finally:
+                os._exit(code)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(0, os.waitstatus_to_exitcode(status))
+
+    @unittest.skipUnless(
+        sys.version_info < (3, 13),
+        "attaching unregisters from the resource tracker before Python 3.13",
+    )
+    def test_attach_should_unregister_in_unrelated_process(self) -> None:
+        with patch.object(resource_tracker, "unregister") as unregister:
+            repo = SharedMemoryRepositoryAdapter(self.repo.name, create=False)
+            repo.close()
+
+        unregister.assert_called_once()
+
+    def test_attach_should_reject_foreign_segment(self) -> None:
+        segment = shared_memory.SharedMemory(create=True, size=64)
+        self.addCleanup(segment.unlink)
+        self.addCleanup(segment.close)
+
+        with self.assertRaises(ValueError):
+            SharedMemoryRepositoryAdapter(name=segment.name, create=False)
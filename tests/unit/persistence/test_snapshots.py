@@ -0,0 +1,88 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import tempfile
+import unittest
+
+from mediapills.core.persistence.repositories import DictRepositoryAdapter
+from mediapills.core.persistence.snapshots import dump
+from mediapills.core.persistence.snapshots import load
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "repo.snap")
+        self.data = {
+            "blob": b"\x00" * 4096,
+            "list": [1, "two", 3.0],
+            "buffer": bytearray(b"mutable"),
+            "none": None,
+            "été": "unicode key",
+        }
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_load_should_restore_dumped_rows(self) -> None:
+        self.assertEqual(5, dump(DictRepositoryAdapter(dict(self.data)), self.path))
+        snapshot = load(self.path)
+        try:
+            self.assertEqual(5, len(snapshot))
+            self.assertEqual(self.data, snapshot.to_dict())
+            row = snapshot.get_one("list")
+            self.assertEqual([1, "two", 3.0], row.value)  # type: ignore
+            self.assertIsNone(snapshot.get_one("missing"))
+            self.assertEqual(sorted(self.data), [e.uuid for e in snapshot.iter_all()])
+            self.assertEqual(["list"], [e.uuid for e in snapshot.get_all(1, 2)])
+        finally:
+            snapshot.close()
+
+    def test_get_buffer_should_view_raw_bytes_without_copy(self) -> None:
+        dump(DictRepositoryAdapter(dict(self.data)), self.path)
+        snapshot = load(self.path)
+        try:
+            with snapshot.get_buffer("blob") as view:  # type: ignore
+                self.assertTrue(view.readonly)
+                self.assertEqual(4096, view.nbytes)
+            self.assertIsNone(snapshot.get_buffer("list"))
+        finally:
+            snapshot.close()
+
+    def test_get_page_should_seek_in_key_index(self) -> None:
+        repo = DictRepositoryAdapter({"k%02d" % i: i for i in range(25)})
+        dump(repo, self.path)
+        snapshot = load(self.path)
+        try:
+            first = snapshot.get_page(limit=10)
+            second = snapshot.get_page(after=first.cursor, limit=20)
+
+            self.assertEqual("k10", second.entities[0].uuid)
+            self.assertEqual(15, len(second.entities))
+            self.assertIsNone(second.cursor)
+        finally:
+            snapshot.close()
+
+    def test_load_should_reject_other_files(self) -> None:
+        with open(self.path, "wb") as file:
+            file.write(b"x" * 64)
+
+        self.assertRaises(ValueError, load, self.path)
@@ -0,0 +1,136 @@
+# Copyright (c) 2021-2021 Mediapills Core.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import random
+import threading
+import typing as t
+import unittest
+from unittest.mock import patch
+
+from mediapills.core.domain.entities import KeyValueEntity
+from mediapills.core.persistence.tries import HashArrayMappedTrie
+from mediapills.core.persistence.tries import TrieRepositoryAdapter
+
+
+class TestHashArrayMappedTrie(unittest.TestCase):
+    def check_against_dict(self) -> None:
+        rnd = random.Random(3)
+        trie = HashArrayMappedTrie()
+        expected: t.Dict[str, int] = {}
+        for i in range(3000):
+            key = "k%d" % rnd.randrange(500)
+            if rnd.random() < 0.4:
+                trie = trie.delete(key)
+                expected.pop(key, None)
+            else:
+                trie = trie.set(key, i)
+                expected[key] = i
+
+        self.assertEqual(len(expected), len(trie))
+        self.assertEqual(expected, dict(trie.items()))
+        self.assertTrue(all(trie.get(k) == v for k, v in expected.items()))
+        self.assertNotIn("missing", trie)
+
+    def test_trie_should_behave_like_dict(self) -> None:
+        self.check_against_dict()
+
+    def test_trie_should_handle_hash_collisions(self) -> None:
+        with patch("mediapills.core.persistence.tries._hash", lambda k: len(k) * 33):
+            self.check_against_dict()
+
+    def test_set_should_keep_previous_version(self) -> None:
+        first = HashArrayMappedTrie({"a": 1})
+        second = first.set("a", 2).set("b", 3)
+
+        self.assertEqual({"a": 1}, dict(first.items()))
+        self.assertEqual({"a": 2, "b": 3}, dict(second.items()))
+        self.assertIs(second, second.delete("missing"))
+
+
+class TestTrieRepositoryAdapter(unittest.TestCase):
+    def test_snapshot_should_not_see_later_writes(self) -> None:
+        repo = TrieRepositoryAdapter({"a": 1, "b": 2})
+        snapshot = repo.snapshot()
+        repo.update(KeyValueEntity("a", 10))
+        repo.delete("b")
+        repo.insert(KeyValueEntity("c", 3))
+
+        self.assertEqual(
+            {"a": 1, "b": 2}, {e.uuid: e.value for e in snapshot.get_all()}
+        )
+        self.assertEqual({"a": 10, "c": 3}, {e.uuid: e.value for e in repo.get_all()})
+        self.assertFalse(hasattr(snapshot, "insert"))
+
+    def test_transaction_should_roll_back_failed_batch(self) -> None:
+        repo = TrieRepositoryAdapter({"a": 1})
+
+        with self.assertRaises(KeyError):
+            with repo.transaction():
+                repo.insert_many([KeyValueEntity("b", 2)])
+                repo.insert(KeyValueEntity("a", 3))
+
+        self.assertEqual(["a"], [e.uuid for e in repo.get_all()])
+        self.assertEqual(1, repo.get_one("a").value)  # type: ignore
+
+    def test_transaction_rollback_should_keep_writes_of_other_threads(self) -> None:
+        repo = TrieRepositoryAdapter({"a": 1})
+        writer = threading.Thread(target=repo.insert, args=(KeyValueEntity("c", 3),))
+
+        with self.assertRaises(KeyError):
+            with repo.transaction():
+                repo.insert(KeyValueEntity("b", 2))
+                writer.start()
+                writer.join(timeout=0.1)
+                self.assertTrue(writer.is_alive())
+                repo.insert(KeyValueEntity("a", 3))
+        writer.join()
+
+        self.assertEqual({"a": 1, "c": 3}, {e.uuid: e.value for e in repo.get_all()})
+
+    def test_bulk_writes_should_report_failures(self) -> None:
+        repo = TrieRepositoryAdapter({"a": 1})
+        inserted = repo.insert_many([KeyValueEntity("a", 2), KeyValueEntity("b", 2)])
+        updated = repo.update_many([KeyValueEntity("b", 3), KeyValueEntity("c", 3)])
+        deleted = repo.delete_many(["a", "a", "missing"])
+
+        self.assertEqual((["b"], ["a"]), (inserted.applied, list(inserted.failed)))
+        self.assertEqual((["b"], ["c"]), (updated.applied, list(updated.failed)))
+        self.assertEqual((["a"], ["missing"]), (deleted.applied, list(deleted.failed)))
+        self.assertEqual({"b": 3}, {e.uuid: e.value for e in repo.get_all()})
+
+    def test_snapshots_should_stay_consistent_during_writes(self) -> None:
+        repo = TrieRepositoryAdapter({"k%d" % i: 0 for i in range(100)})
+        distinct: t.List[int] = []
+
+        def read() -> None:
+            distinct.append(len({e.value for e in repo.snapshot().iter_all()}))
+
+        def write() -> None:
+            for i in range(1, 200):
+                repo.update_many([KeyValueEntity("k%d" % j, i) for j in range(100)])
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while writer.is_alive():
+            read()
+        writer.join()
+        read()
+
+        self.assertEqual({1}, set(distinct))